@@ -0,0 +1,255 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+from RPG_Pad_Engine import DEFAULT_RULES_DIR, GenerationEngine, RulesetError, read_script
+
+# --- RPG Pad Pro benchmark suite ---
+# Runs the bundled scripts headlessly with fixed seeds and reports throughput,
+# per-generation latency, peak memory and where the time goes, e.g.:
+#   python RPG_Pad_Bench.py                      (print results)
+#   python RPG_Pad_Bench.py --save-baseline      (record bench_baseline.json)
+#   python RPG_Pad_Bench.py --compare            (flag regressions against it)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BASE_DIR, "bench_baseline.json")
+BENCH_SCRIPTS = [
+    "Mob Treasure Generator.txt",
+    "Name_Generator.txt",
+    "Tavern_Menu.txt",
+    "Tavern_Menu_Table.txt",
+    "IpsumLoremGenerator.txt",
+    "sample_table_script.txt",
+]
+MASTER_SEED = 12345
+
+# The compiled renderer calls the math building blocks directly rather than
+# going through math_evaluator, so math time is the sum over all of them.
+TIMED_GROUPS = {
+    'resolve_table_tags': ['resolve_table_tags'],
+    'math_evaluator': ['math_evaluator', 'evaluate_math_function', 'resolve_simple_math',
+                       'roll_dice_expression', 'roll_range', 'evaluate_arithmetic'],
+}
+
+class CallTimer:
+    """
+    Adds up the time spent in a group of ruleset functions. Calls nested
+    inside another call of the same group (e.g. math_evaluator calling itself
+    through a math function) are counted, but their time only once.
+    """
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.depth = 0
+
+    def wrap(self, func):
+        def timed(*args, **kwargs):
+            self.calls += 1
+            if self.depth:
+                return func(*args, **kwargs)
+            self.depth += 1
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.seconds += time.perf_counter() - start
+                self.depth -= 1
+        return timed
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+class ScriptBench:
+    """
+    One script's engine, parsed tables and measurements. The clean timing
+    passes of all the scripts are interleaved by bench_scripts(), so a spell
+    of machine noise doesn't land on every pass of one script.
+    """
+    def __init__(self, ruleset_name, rules_dir, script_path, runs, parse_repeats):
+        # A freshly loaded engine per script so the ruleset's caches start cold for the parse timing
+        self.engine = GenerationEngine.from_ruleset(ruleset_name, rules_dir, reload=True)
+        self.runs = runs
+        funcs = self.engine.ruleset_funcs
+        script = read_script(script_path)
+
+        parse_tables = funcs['parse_tables']
+        start = time.perf_counter()
+        self.tables = parse_tables(script)
+        self.parse_cold = time.perf_counter() - start
+
+        self.parse_warm = []
+        for _ in range(parse_repeats):
+            start = time.perf_counter()
+            parse_tables(script)
+            self.parse_warm.append(time.perf_counter() - start)
+
+        self.start_table = self.engine.resolve_start_table(self.tables)
+        self.total = None
+        self.latencies = []
+
+    def generate_all(self):
+        for run_index in range(self.runs):
+            self.engine.generate_seeded_one(self.tables, self.start_table, MASTER_SEED, run_index)
+
+    def timed_pass(self):
+        """
+        Times one clean pass, with nothing wrapped. The fastest pass is kept,
+        as timeit does, since a slower one means the machine was busy.
+        """
+        latencies = []
+        total_start = time.perf_counter()
+        for run_index in range(self.runs):
+            start = time.perf_counter()
+            self.engine.generate_seeded_one(self.tables, self.start_table, MASTER_SEED, run_index)
+            latencies.append(time.perf_counter() - start)
+        total = time.perf_counter() - total_start
+        if self.total is None or total < self.total:
+            self.total = total
+            self.latencies = latencies
+
+    def results(self, measure_memory):
+        funcs = self.engine.ruleset_funcs
+
+        # The CORE ENGINE functions are timed in a separate pass, by swapping
+        # timing wrappers into the helpers, since the wrappers slow every call down
+        originals = {}
+        timers = {}
+        for group, names in TIMED_GROUPS.items():
+            timers[group] = CallTimer()
+            for name in names:
+                if name in funcs:
+                    originals[name] = funcs[name]
+                    funcs[name] = timers[group].wrap(funcs[name])
+        try:
+            self.generate_all()
+        finally:
+            funcs.update(originals)
+
+        # Memory is measured in a pass of its own, since tracemalloc slows everything down
+        peak_kib = None
+        if measure_memory:
+            tracemalloc.start()
+            self.generate_all()
+            peak_kib = tracemalloc.get_traced_memory()[1] / 1024
+            tracemalloc.stop()
+
+        latencies = sorted(self.latencies)
+        total = self.total
+        return {
+            "runs": self.runs,
+            "start_table": self.start_table,
+            "gens_per_sec": self.runs / total if total else 0.0,
+            "p50_ms": percentile(latencies, 0.50) * 1000,
+            "p99_ms": percentile(latencies, 0.99) * 1000,
+            "mean_ms": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+            "peak_kib": peak_kib,
+            "parse_tables_cold_ms": self.parse_cold * 1000,
+            "parse_tables_warm_ms": statistics.median(self.parse_warm) * 1000 if self.parse_warm else None,
+            "resolve_table_tags_ms": timers['resolve_table_tags'].seconds * 1000,
+            "resolve_table_tags_calls": timers['resolve_table_tags'].calls,
+            "math_evaluator_ms": timers['math_evaluator'].seconds * 1000,
+            "math_evaluator_calls": timers['math_evaluator'].calls,
+        }
+
+def bench_scripts(ruleset_name, rules_dir, script_paths, runs, parse_repeats, measure_memory, repeats=3):
+    """Benchmarks each script, returning {script file name: results}."""
+    benches = {os.path.basename(path): ScriptBench(ruleset_name, rules_dir, path, runs, parse_repeats) for path in script_paths}
+    # Throughput and latency come from the fastest of the clean passes, which
+    # go round the scripts in turn
+    for _ in range(max(1, repeats)):
+        for bench in benches.values():
+            bench.timed_pass()
+    return {name: bench.results(measure_memory) for name, bench in benches.items()}
+
+def print_report(results, baseline=None):
+    header = f"{'Script':<28}{'gens/s':>10}{'p50 ms':>9}{'p99 ms':>9}{'peak KiB':>10}{'parse ms':>10}{'resolve ms':>11}{'math ms':>9}"
+    print(header)
+    print("-" * len(header))
+    for name, r in results.items():
+        peak = f"{r['peak_kib']:.0f}" if r['peak_kib'] is not None else "-"
+        print(f"{name[:27]:<28}{r['gens_per_sec']:>10.1f}{r['p50_ms']:>9.2f}{r['p99_ms']:>9.2f}{peak:>10}"
+              f"{r['parse_tables_cold_ms']:>10.2f}{r['resolve_table_tags_ms']:>11.1f}{r['math_evaluator_ms']:>9.1f}")
+        if baseline and name in baseline:
+            old = baseline[name]
+            change = (r['gens_per_sec'] / old['gens_per_sec'] - 1) * 100 if old['gens_per_sec'] else 0.0
+            print(f"{'  vs baseline':<28}{change:>+9.1f}%{old['p50_ms']:>9.2f}{old['p99_ms']:>9.2f}")
+
+def find_regressions(results, baseline, tolerance):
+    """Returns the scripts whose throughput dropped by more than tolerance (a fraction) against the baseline."""
+    regressions = []
+    for name, r in results.items():
+        old = baseline.get(name)
+        if old and old['gens_per_sec'] and r['gens_per_sec'] < old['gens_per_sec'] * (1 - tolerance):
+            regressions.append(name)
+    return regressions
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark the bundled RPG Pad Pro scripts.")
+    parser.add_argument("scripts", nargs="*", help="Scripts to run (default: the bundled generator scripts).")
+    parser.add_argument("-r", "--ruleset", default="Core v4", help="Ruleset to benchmark (default: %(default)s).")
+    parser.add_argument("--rules-dir", default=DEFAULT_RULES_DIR, help="Directory holding the ruleset folders.")
+    parser.add_argument("-n", "--runs", type=int, default=200, help="Generations per script (default: %(default)s).")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed passes over the scripts; the fastest of each is kept (default: %(default)s).")
+    parser.add_argument("--parse-repeats", type=int, default=20, help="Warm parse_tables repeats (default: %(default)s).")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc peak memory pass.")
+    parser.add_argument("--json", help="Also write the results to this JSON file.")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON file (default: bench_baseline.json).")
+    parser.add_argument("--save-baseline", action="store_true", help="Write the results as the new baseline.")
+    parser.add_argument("--compare", action="store_true", help="Compare against the baseline and exit 1 on a regression.")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed gens/sec drop for --compare (default: %(default)s).")
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    scripts = args.scripts or [os.path.join(BASE_DIR, name) for name in BENCH_SCRIPTS]
+
+    try:
+        results = bench_scripts(args.ruleset, args.rules_dir, scripts, args.runs, args.parse_repeats, not args.no_memory, args.repeats)
+    except RulesetError as e:
+        print(f"Ruleset Error: {e}", file=sys.stderr)
+        return 2
+
+    baseline = None
+    if args.compare:
+        try:
+            with open(args.baseline, "r", encoding="utf-8") as f:
+                baseline = json.load(f)["results"]
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Could not read baseline '{args.baseline}': {e}", file=sys.stderr)
+            return 2
+
+    print_report(results, baseline)
+
+    document = {
+        "ruleset": args.ruleset,
+        "master_seed": MASTER_SEED,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(document, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(document, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+
+    if baseline is not None:
+        regressions = find_regressions(results, baseline, args.tolerance)
+        if regressions:
+            print(f"Regression (> {args.tolerance:.0%} slower): {', '.join(regressions)}", file=sys.stderr)
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
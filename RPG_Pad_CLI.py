@@ -0,0 +1,181 @@
+import argparse
+import os
+import random
+import sqlite3
+import sys
+
+from RPG_Pad_Engine import (COMMON_A_AN_EXCEPTIONS, DEFAULT_DISTRIBUTION_SAMPLES, DEFAULT_RULES_DIR, DEFAULT_UNIQUE_RETRIES, GenerationEngine,
+                            RulesetError, UniqueStats, read_script, unique_results)
+from RPG_Pad_Output import SINKS, stream_results
+from RPG_Pad_Profile import GenerationProfiler, write_collapsed_file
+from RPG_Pad_Store import ResultDatabase
+
+# --- RPG Pad Pro command line ---
+# Runs a script headlessly, e.g.:
+#   python RPG_Pad_CLI.py "Mob Treasure Generator.txt" -n 100 -o treasure.txt
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Run an RPG Pad Pro script without the GUI.")
+    parser.add_argument("script", help="Path to the script file to run.")
+    parser.add_argument("-r", "--ruleset", default="Core v4", help="Ruleset folder name inside the Rules directory (default: %(default)s).")
+    parser.add_argument("--rules-dir", default=DEFAULT_RULES_DIR, help="Directory holding the ruleset folders.")
+    parser.add_argument("-t", "--table", help="Start table (default: the first table in the script).")
+    parser.add_argument("-n", "--runs", type=int, default=5, help="Number of generations to run (default: %(default)s).")
+    parser.add_argument("-o", "--output", help="Write results to this file instead of stdout.")
+    parser.add_argument("-f", "--format", choices=sorted(SINKS), default="text", help="Output format (default: %(default)s).")
+    parser.add_argument("-s", "--seed", type=int, help="Master seed for repeatable output. Each run gets its own seed derived from it.")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="Number of worker processes (default: %(default)s, 0 = one per CPU core). Output does not depend on this.")
+    parser.add_argument("--fast-dice", action="store_true", help="Roll big dice pools from their sum distribution (or NumPy). Faster, but seeded output differs from the default rolls.")
+    parser.add_argument("--a-an-exceptions", nargs="?", const="", metavar="FILE",
+                        help="Use a/an exceptions like 'an hour' and 'a unicorn' when resolving \\a: the built-in list, or one phrase per line from FILE.")
+    parser.add_argument("-u", "--unique", action="store_true", help="Only output distinct results: -n is the number of distinct results wanted. The repeat rate is reported on stderr.")
+    parser.add_argument("--max-retries", type=int, default=DEFAULT_UNIQUE_RETRIES, help="With --unique, give up after this many repeats in a row (default: %(default)s).")
+    parser.add_argument("--db", metavar="FILE", help="Also record every run in this SQLite result database (see RPG_Pad_Store.py to export it).")
+    parser.add_argument("--analyze", action="store_true", help="Check the script's table calls (cycles, undefined and unreachable tables, expected rolls and output length) and exit.")
+    parser.add_argument("--distribution", action="store_true", help="Print the probability of each output of the start table and exit. Exact when possible, otherwise estimated from seeded runs with 95%% confidence intervals.")
+    parser.add_argument("--samples", type=int, default=DEFAULT_DISTRIBUTION_SAMPLES, help="With --distribution, the most runs to sample when it can't be exact (default: %(default)s).")
+    parser.add_argument("--top", type=int, default=50, help="With --distribution, how many outputs to show (default: %(default)s).")
+    parser.add_argument("--profile", metavar="FILE", help="Profile the runs: print a report on stderr and write the call stacks to FILE in collapsed flame graph format. Runs in one process.")
+    parser.add_argument("--list-tables", action="store_true", help="List the tables in the script and exit.")
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    try:
+        engine = GenerationEngine.from_ruleset(args.ruleset, args.rules_dir)
+    except RulesetError as e:
+        print(f"Ruleset Error: {e}", file=sys.stderr)
+        return 2
+
+    try:
+        script = read_script(args.script)
+    except OSError as e:
+        print(f"Could not read script '{args.script}': {e}", file=sys.stderr)
+        return 2
+
+    tables = engine.parse_script(script)
+    if not tables:
+        print("No tables found in script.", file=sys.stderr)
+        return 1
+
+    if args.list_tables:
+        for name in tables:
+            print(name)
+        return 0
+
+    if args.table is not None and args.table not in tables:
+        print(f"Table '{args.table}' not found in script.", file=sys.stderr)
+        return 1
+    start_table = engine.resolve_start_table(tables, args.table)
+
+    # Before --distribution, so it reports what these options generate
+    if args.fast_dice:
+        try:
+            engine.use_fast_dice()
+        except RulesetError as e:
+            print(f"Ruleset Error: {e}", file=sys.stderr)
+            return 2
+
+    if args.a_an_exceptions is not None:
+        if args.a_an_exceptions:
+            try:
+                exceptions = [line.strip() for line in read_script(args.a_an_exceptions).splitlines() if line.strip()]
+            except OSError as e:
+                print(f"Could not read a/an exceptions '{args.a_an_exceptions}': {e}", file=sys.stderr)
+                return 2
+        else:
+            exceptions = COMMON_A_AN_EXCEPTIONS
+        try:
+            engine.set_a_an_exceptions(exceptions)
+        except ValueError as e:
+            print(f"Invalid a/an exceptions: {e}", file=sys.stderr)
+            return 1
+
+    if args.analyze:
+        try:
+            analysis = engine.analyze(tables, start_table)
+        except RulesetError as e:
+            print(f"Ruleset Error: {e}", file=sys.stderr)
+            return 2
+        print(analysis.format())
+        return 0
+
+    if args.distribution:
+        if args.samples < 1:
+            print("--samples must be one or more.", file=sys.stderr)
+            return 1
+        distribution = engine.output_distribution(tables, start_table, samples=args.samples,
+                                                  seed=args.seed if args.seed is not None else 0)
+        print(distribution.format(args.top))
+        return 0
+
+    if args.runs < 0:
+        print("--runs must be zero or more.", file=sys.stderr)
+        return 1
+    if args.max_retries < 0:
+        print("--max-retries must be zero or more.", file=sys.stderr)
+        return 1
+    if args.jobs < 0:
+        print("--jobs must be zero (one per CPU core) or more.", file=sys.stderr)
+        return 1
+
+    workers = args.jobs or os.cpu_count() or 1
+    # Worker processes can't be profiled; the output is the same either way
+    profiler = None
+    if args.profile:
+        profiler = GenerationProfiler()
+        workers = 1
+
+    database = None
+    master_seed = args.seed
+    if args.db:
+        try:
+            database = ResultDatabase(args.db)
+        except sqlite3.Error as e:
+            print(f"Could not open database '{args.db}': {e}", file=sys.stderr)
+            return 2
+        # Runs are filed under their master seed, so pick one now if none was given
+        if master_seed is None:
+            master_seed = random.SystemRandom().getrandbits(64)
+
+    # In unique mode repeats are rolled again, up to max_retries in a row per result
+    num_runs = args.runs * (args.max_retries + 1) if args.unique else args.runs
+    unique_stats = UniqueStats()
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    # Unique mode usually needs far fewer runs than it allows for, so the workers are fed a window at a time
+    batch = engine.generate_batch(script, start_table, num_runs, master_seed, workers, raw=database is not None,
+                                  window=max(args.runs, 1) if args.unique else None)
+    try:
+        results = batch
+        if database is not None:
+            results = database.record(results, script, start_table, master_seed, engine.resolve_a_an, args.fast_dice)
+        if args.unique:
+            results = unique_results(results, args.runs, args.max_retries, stats=unique_stats)
+        if profiler is not None:
+            with profiler:
+                stream_results(results, SINKS[args.format](out))
+        else:
+            stream_results(results, SINKS[args.format](out))
+    finally:
+        # Stops any worker processes still rolling runs that unique mode didn't need
+        batch.close()
+        if out is not sys.stdout:
+            out.close()
+        if database is not None:
+            database.close()
+
+    if args.unique:
+        print(unique_stats.summary(), file=sys.stderr)
+    if profiler is not None:
+        print(profiler.format(), file=sys.stderr)
+        try:
+            write_collapsed_file(profiler, args.profile)
+        except OSError as e:
+            print(f"Could not write profile '{args.profile}': {e}", file=sys.stderr)
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
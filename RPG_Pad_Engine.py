@@ -0,0 +1,829 @@
+import hashlib
+import importlib.machinery
+import importlib.util
+import json
+import marshal
+import math
+import multiprocessing
+import os
+import time
+import random
+import re
+import sys
+
+# --- RPG Pad Pro headless engine ---
+# Everything needed to load a ruleset, parse a script and run generations,
+# with no GUI dependencies. RPG_Pad_Pro.py drives this from its window and
+# RPG_Pad_CLI.py drives it from the command line.
+
+CORE_ENGINE_FUNCS = ['parse_tables', 'roll_on_table', 'resolve_table_tags', 'math_evaluator', 'case_converter', 'list_sorter']
+
+DEFAULT_RULES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Rules")
+
+class RulesetError(Exception):
+    """Raised when a ruleset cannot be loaded or is missing core functions."""
+
+# --- FILE SYSTEM & LOADING LOGIC ---
+
+def list_rulesets(rules_dir=DEFAULT_RULES_DIR):
+    """Returns the names of the ruleset folders inside rules_dir."""
+    return [entry.name for entry in os.scandir(rules_dir) if entry.is_dir()]
+
+# Loaded rulesets by folder, with the (file, mtime, size) stamps they were
+# loaded from. Loading a folder whose files haven't changed since is free.
+_RULESET_CACHE = {}
+RULESET_INDEX_FILE = "ruleset_index.json"
+RULESET_INDEX_VERSION = 1
+
+class RuleFileLoader(importlib.machinery.SourceFileLoader):
+    """
+    Loads a .rule file as Python source. Python only caches bytecode for .py
+    files, so the compiled code is kept in the ruleset's __pycache__ folder as
+    <name>.rule.<cache tag>.pyc and reused while the source is unchanged.
+    """
+    def get_code(self, fullname):
+        source_path = self.get_filename(fullname)
+        stat = os.stat(source_path)
+        cache_path = rule_bytecode_path(source_path)
+        header = importlib.util.MAGIC_NUMBER + (0).to_bytes(4, "little") \
+            + (int(stat.st_mtime) & 0xFFFFFFFF).to_bytes(4, "little") + (stat.st_size & 0xFFFFFFFF).to_bytes(4, "little")
+        try:
+            with open(cache_path, "rb") as f:
+                data = f.read()
+            if data[:16] == header:
+                return marshal.loads(data[16:])
+        except (OSError, ValueError, EOFError, TypeError):
+            pass
+
+        code = self.source_to_code(self.get_data(source_path), source_path)
+        if not sys.dont_write_bytecode:
+            try:
+                os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+                temp_path = f"{cache_path}.{os.getpid()}.tmp"
+                with open(temp_path, "wb") as f:
+                    f.write(header + marshal.dumps(code))
+                os.replace(temp_path, cache_path)
+            except OSError:
+                pass
+        return code
+
+def rule_bytecode_path(file_path):
+    """Returns where the compiled bytecode of a .rule file is cached."""
+    folder, name = os.path.split(file_path)
+    return os.path.join(folder, "__pycache__", f"{name}.{sys.implementation.cache_tag}.pyc")
+
+def forget_other_ruleset_modules(folder):
+    """
+    Ruleset .py files can import each other by name (the template compiler
+    takes its tag patterns from math_rules, for example). Drops modules of
+    the same file names imported from another folder, so those imports find
+    this ruleset's own files rather than another ruleset's.
+    """
+    folder = os.path.abspath(folder)
+    for item in os.listdir(folder):
+        if not item.endswith('.py'):
+            continue
+        module = sys.modules.get(item[:-3])
+        module_file = getattr(module, '__file__', None)
+        if module_file and os.path.basename(module_file) == item and os.path.dirname(os.path.abspath(module_file)) != folder:
+            del sys.modules[item[:-3]]
+
+def load_module_from_path(file_path, module_name):
+    """Executes one ruleset file as a module. Errors are raised to the caller."""
+    loader = RuleFileLoader(module_name, file_path) if file_path.endswith('.rule') else None
+    spec = importlib.util.spec_from_file_location(module_name, file_path, loader=loader)
+    if spec is None:
+        raise RulesetError(f"Not a loadable Python file: {file_path}")
+    module = importlib.util.module_from_spec(spec)
+    forget_other_ruleset_modules(os.path.dirname(file_path))
+    sys.path.append(os.path.dirname(file_path))
+    try:
+        spec.loader.exec_module(module)
+        return module
+    finally:
+        sys.path.pop()
+
+def module_callables(module):
+    """Returns the public callables of a loaded ruleset module, by name."""
+    funcs = {}
+    for attr_name in dir(module):
+        attr = getattr(module, attr_name)
+        if callable(attr) and not attr_name.startswith("__"):
+            funcs[attr_name] = attr
+    return funcs
+
+class RulesetModules:
+    """Loads each file of one ruleset folder at most once, on demand."""
+    def __init__(self):
+        self.loaded = {}
+
+    def load(self, file_path):
+        """Returns the public callables of one ruleset file, loading it the first time."""
+        funcs = self.loaded.get(file_path)
+        if funcs is None:
+            module_name = os.path.basename(file_path).split('.')[0]
+            funcs = self.loaded[file_path] = module_callables(load_module_from_path(file_path, module_name))
+        return funcs
+
+class LazyRuleset(dict):
+    """
+    The ruleset functions dict (also passed around as 'helpers'). Files that
+    loaded cleanly before are only executed when one of their names is first
+    looked up, so a script that never sorts never loads the list rules.
+    Iterating gives every name without loading anything; items() and
+    values() load the whole ruleset first.
+    """
+    def __init__(self, modules):
+        super().__init__()
+        self.modules = modules
+        self.pending = {}   # name -> file that provides it, not loaded yet
+
+    def defer(self, names, file_path):
+        # A later file replaces the names of an earlier one, as if loaded in order
+        for name in names:
+            dict.pop(self, name, None)
+            self.pending[name] = file_path
+
+    def add_loaded(self, funcs):
+        for name, func in funcs.items():
+            self.pending.pop(name, None)
+            dict.__setitem__(self, name, func)
+
+    def load_file(self, file_path):
+        try:
+            funcs = self.modules.load(file_path)
+        except Exception as e:
+            raise RulesetError(f"Error loading rule file '{file_path}': {e}") from e
+        for name, func in funcs.items():
+            if self.pending.get(name) == file_path:
+                del self.pending[name]
+                dict.__setitem__(self, name, func)
+
+    def load_all(self):
+        for file_path in list(dict.fromkeys(self.pending.values())):
+            self.load_file(file_path)
+
+    def __missing__(self, name):
+        file_path = self.pending.get(name)
+        if file_path is None:
+            raise KeyError(name)
+        self.load_file(file_path)
+        return dict.__getitem__(self, name)
+
+    def get(self, name, default=None):
+        try:
+            return self[name]
+        except KeyError:
+            return default
+
+    def __contains__(self, name):
+        return dict.__contains__(self, name) or name in self.pending
+
+    def __setitem__(self, name, value):
+        self.pending.pop(name, None)
+        dict.__setitem__(self, name, value)
+
+    def __delitem__(self, name):
+        if self.pending.pop(name, None) is None:
+            dict.__delitem__(self, name)
+
+    def update(self, *args, **kwargs):
+        for name, value in dict(*args, **kwargs).items():
+            self[name] = value
+
+    def setdefault(self, name, default=None):
+        if name not in self:
+            self[name] = default
+        return self[name]
+
+    def pop(self, name, *default):
+        if name in self.pending:
+            self[name]
+        return dict.pop(self, name, *default)
+
+    def __iter__(self):
+        return iter(list(dict.keys(self)) + list(self.pending))
+
+    def keys(self):
+        return list(self)
+
+    def __len__(self):
+        return dict.__len__(self) + len(self.pending)
+
+    def items(self):
+        self.load_all()
+        return dict.items(self)
+
+    def values(self):
+        self.load_all()
+        return dict.values(self)
+
+    def copy(self):
+        """A separate helpers dict over the same loaded modules."""
+        twin = LazyRuleset(self.modules)
+        dict.update(twin, dict.items(self))
+        twin.pending = dict(self.pending)
+        return twin
+
+def ruleset_file_stamps(ruleset_path):
+    """Returns (file name, file path, (mtime_ns, size)) for each .py/.rule file, in load order."""
+    files = []
+    for item in os.listdir(ruleset_path):
+        file_path = os.path.join(ruleset_path, item)
+        if (item.endswith('.py') or item.endswith('.rule')) and os.path.isfile(file_path):
+            stat = os.stat(file_path)
+            files.append((item, file_path, (stat.st_mtime_ns, stat.st_size)))
+    return files
+
+def _read_ruleset_index(ruleset_path):
+    # Which names each file provided the last time it loaded cleanly
+    try:
+        with open(os.path.join(ruleset_path, "__pycache__", RULESET_INDEX_FILE), "r", encoding="utf-8") as f:
+            index = json.load(f)
+        if index.get("version") == RULESET_INDEX_VERSION:
+            return index["files"]
+    except (OSError, ValueError, KeyError, AttributeError):
+        pass
+    return {}
+
+def _write_ruleset_index(ruleset_path, files):
+    if sys.dont_write_bytecode:
+        return
+    cache_dir = os.path.join(ruleset_path, "__pycache__")
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        temp_path = os.path.join(cache_dir, f"{RULESET_INDEX_FILE}.{os.getpid()}.tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": RULESET_INDEX_VERSION, "files": files}, f)
+        os.replace(temp_path, os.path.join(cache_dir, RULESET_INDEX_FILE))
+    except OSError:
+        pass
+
+def load_ruleset(ruleset_path, reload=False, lazy=True):
+    """
+    Loads every .py/.rule file in a ruleset folder and collects their public
+    callables into one dict. Returns (ruleset_funcs, errors), where errors is
+    a list of (file_path, exception) for the files that failed to load.
+
+    A folder loaded before in this process, with no file changed since, is
+    returned from the cache (as a fresh helpers dict over the same modules)
+    unless reload is set. With lazy, files that loaded cleanly last time are
+    only executed once one of their names is needed.
+    """
+    ruleset_path = os.path.abspath(ruleset_path)
+    files = ruleset_file_stamps(ruleset_path)
+    stamps = [(item, stamp) for item, _, stamp in files]
+
+    cached = _RULESET_CACHE.get(ruleset_path)
+    if cached is not None and cached[0] == stamps and not reload:
+        return cached[1].copy(), []
+
+    index = _read_ruleset_index(ruleset_path)
+    new_index = {}
+    ruleset_funcs = LazyRuleset(RulesetModules())
+    errors = []
+
+    for item, file_path, stamp in files:
+        entry = index.get(item)
+        if lazy and entry is not None and entry.get("stamp") == list(stamp):
+            ruleset_funcs.defer(entry["names"], file_path)
+            new_index[item] = entry
+            continue
+        try:
+            funcs = ruleset_funcs.modules.load(file_path)
+        except Exception as e:
+            errors.append((file_path, e))
+            continue
+        ruleset_funcs.add_loaded(funcs)
+        new_index[item] = {"stamp": list(stamp), "names": list(funcs)}
+
+    if new_index != index:
+        _write_ruleset_index(ruleset_path, new_index)
+    if not errors:
+        _RULESET_CACHE[ruleset_path] = (stamps, ruleset_funcs)
+    return ruleset_funcs.copy(), errors
+
+def missing_core_funcs(ruleset_funcs):
+    """Returns the CORE ENGINE functions the ruleset does not provide."""
+    return [func for func in CORE_ENGINE_FUNCS if func not in ruleset_funcs]
+
+def read_script(file_path):
+    """Reads a script file. Older scripts are often Latin-1 rather than UTF-8."""
+    try:
+        with open(file_path, "r", encoding="utf-8") as f:
+            return f.read()
+    except UnicodeDecodeError:
+        with open(file_path, "r", encoding="latin-1") as f:
+            return f.read()
+
+# --- A/An Modifier Resolver ---
+
+A_AN_MODIFIER = "\\a"
+# Whitespace and HTML tags are skipped to find the word after a '\a'. A '<'
+# with no '>' anywhere after it is skipped on its own.
+A_AN_SKIP = r"(?:\s|<[^>]*>|<)*"
+A_AN_FOLLOWING = re.compile(A_AN_SKIP + r"(?P<first>.?)", re.DOTALL)
+VOWELS = "AEIOUaeiou"
+
+# Words whose sound doesn't follow their first letter. Entries match whole
+# words; one ending in '*' matches any word starting with it ("an hour*"
+# covers "hours" and "hourly").
+COMMON_A_AN_EXCEPTIONS = [
+    "an hour*", "an honest*", "an honor*", "an honour*", "an heir*", "an herb*",
+    "a unicorn*", "a unique*", "a unit*", "a univers*", "a uniform*", "a union*", "a unison",
+    "a use*", "a usual*", "a utensil*", "a utopia*", "a euro*", "a ewe*", "a one", "a once",
+]
+
+class AAnResolver:
+    """
+    Replaces each '\a' with 'a' or 'an' in one pass over the text. The word
+    after a '\a' is found by matching from its position in place, so the text
+    is never copied per modifier. exceptions is an optional list of phrases
+    like "an hour" or "a unicorn", compiled into the same scan.
+    """
+    def __init__(self, exceptions=None):
+        self.exceptions = list(exceptions or [])
+        self.following = A_AN_FOLLOWING
+        self.articles = None
+        if self.exceptions:
+            articles = {}
+            patterns = {}
+            for phrase in self.exceptions:
+                parts = phrase.split(None, 1)
+                if len(parts) != 2 or parts[0].lower() not in ("a", "an"):
+                    raise ValueError(f"Not an a/an exception: '{phrase}'")
+                word = parts[1].strip().lower()
+                if word.endswith("*"):
+                    word = word[:-1]
+                    patterns[word] = re.escape(word)
+                else:
+                    patterns[word] = re.escape(word) + r"\b"
+                articles[word] = parts[0].lower()
+            # Longest first, so "unin*" can override a shorter "uni*"
+            words = sorted(patterns, key=len, reverse=True)
+            self.following = re.compile(
+                A_AN_SKIP + r"(?:(?P<word>(?i:" + "|".join(patterns[w] for w in words) + r"))|(?P<first>.?))", re.DOTALL)
+            self.articles = articles
+
+    def __call__(self, text):
+        if A_AN_MODIFIER not in text:
+            return text
+        following = self.following
+        articles = self.articles
+        pieces = text.split(A_AN_MODIFIER)
+        out = [pieces[0]]
+        position = len(pieces[0])
+        for piece in pieces[1:]:
+            position += 2
+            match = following.match(text, position)
+            if articles is not None and match.group("word"):
+                out.append(articles[match.group("word").lower()])
+            else:
+                first_char = match.group("first")
+                out.append("an" if first_char and first_char in VOWELS else "a")
+            out.append(piece)
+            position += len(piece)
+        return "".join(out)
+
+_default_a_an_resolver = AAnResolver()
+
+def resolve_a_an_modifier(text, exceptions=None):
+    """
+    Replaces the '\\a' modifier with 'a' or 'an' based on the following word.
+    Pass an AAnResolver (or use GenerationEngine.set_a_an_exceptions()) to
+    reuse an exception list across many results.
+    """
+    if exceptions:
+        return AAnResolver(exceptions)(text)
+    return _default_a_an_resolver(text)
+
+# --- Generation ---
+
+# Collisions in a row before unique mode decides the table has run dry
+DEFAULT_UNIQUE_RETRIES = 100
+# Sampling budget when an exact output distribution isn't available
+DEFAULT_DISTRIBUTION_SAMPLES = 100000
+DEFAULT_DISTRIBUTION_SECONDS = 10
+
+class GenerationEngine:
+    """Runs generations from a loaded ruleset. Has no GUI dependencies."""
+
+    def __init__(self, ruleset_funcs, ruleset_path=None):
+        self.ruleset_funcs = ruleset_funcs
+        # Needed by generate_batch() so worker processes can load their own copy.
+        self.ruleset_path = ruleset_path
+        # The last script parsed and its tables, so unchanged scripts aren't re-parsed
+        self.parsed_script = None
+        self.parsed_tables = None
+        # Set by use_fast_dice()
+        self.dice_engine = None
+        # Set by set_a_an_exceptions()
+        self.a_an_exceptions = None
+        self.resolve_a_an = resolve_a_an_modifier
+
+    @classmethod
+    def from_ruleset(cls, ruleset_name, rules_dir=DEFAULT_RULES_DIR, reload=False):
+        """Loads a ruleset folder by name and raises RulesetError if it is unusable."""
+        ruleset_path = os.path.join(rules_dir, ruleset_name)
+        if not os.path.isdir(ruleset_path):
+            raise RulesetError(f"Ruleset '{ruleset_name}' not found in '{rules_dir}'")
+        return cls.from_ruleset_path(ruleset_path, reload)
+
+    @classmethod
+    def from_ruleset_path(cls, ruleset_path, reload=False):
+        """
+        Loads a ruleset folder by path and raises RulesetError if it is unusable.
+        With reload, the files are executed again instead of reusing the modules
+        already loaded in this process.
+        """
+        ruleset_name = os.path.basename(os.path.normpath(ruleset_path))
+        ruleset_funcs, errors = load_ruleset(ruleset_path, reload=reload)
+        if errors:
+            details = "; ".join(f"{os.path.basename(path)}: {e}" for path, e in errors)
+            raise RulesetError(f"Error loading ruleset '{ruleset_name}': {details}")
+        missing = missing_core_funcs(ruleset_funcs)
+        if missing:
+            raise RulesetError(f"The ruleset '{ruleset_name}' is missing CORE ENGINE functions: {', '.join(missing)}")
+        return cls(ruleset_funcs, ruleset_path)
+
+    def use_fast_dice(self, enabled=True):
+        """
+        Rolls {XdY} tags through the ruleset's DiceEngine (NumPy, or the exact
+        sum distribution for big pools) instead of one die at a time. Seeded
+        output differs from the default rolls.
+        """
+        if 'DiceEngine' not in self.ruleset_funcs:
+            raise RulesetError("This ruleset has no DiceEngine for fast dice.")
+        # Kept in this engine's own helpers, so other engines over the same ruleset keep their dice
+        self.dice_engine = self.ruleset_funcs['DiceEngine']() if enabled else None
+        self.ruleset_funcs['dice_engine'] = self.dice_engine
+
+    def set_a_an_exceptions(self, exceptions):
+        """
+        Uses a list of a/an exception phrases (e.g. COMMON_A_AN_EXCEPTIONS, or
+        ["an hour", "a unicorn"]) when resolving '\\a'. None switches back to
+        the plain vowel rule.
+        """
+        self.a_an_exceptions = list(exceptions) if exceptions else None
+        self.resolve_a_an = AAnResolver(self.a_an_exceptions) if exceptions else resolve_a_an_modifier
+
+    def parse_script(self, script):
+        """Parses script text into tables, reusing the last result if the script is unchanged."""
+        if script != self.parsed_script:
+            self.parsed_tables = self.ruleset_funcs['parse_tables'](script)
+            self.parsed_script = script
+            # Fold constant math and find the static entries up front, so the
+            # first generation doesn't pay for it
+            fold_table_constants = self.ruleset_funcs.get('fold_table_constants')
+            if fold_table_constants:
+                fold_table_constants(self.parsed_tables, self.ruleset_funcs)
+        return self.parsed_tables
+
+    def analyze(self, tables, start_table=None):
+        """
+        Returns the ruleset's static analysis of the tables (a TableAnalysis in
+        Core v4): call graph cycles, undefined and unreachable tables, and the
+        expected rolls and output length per start table.
+        """
+        analyze_tables = self.ruleset_funcs.get('analyze_tables')
+        if analyze_tables is None:
+            raise RulesetError("This ruleset has no table analysis.")
+        return analyze_tables(tables, start_table)
+
+    def output_distribution(self, tables, start_table, max_outcomes=None, samples=DEFAULT_DISTRIBUTION_SAMPLES,
+                            max_seconds=DEFAULT_DISTRIBUTION_SECONDS, seed=0, should_stop=None):
+        """
+        Returns the OutputDistribution of one run from start_table. It is exact
+        when the ruleset can work it out (Core v4: no variables, logic or decks,
+        and at most max_outcomes outputs); otherwise it is estimated from up to
+        samples seeded runs (stopping after max_seconds, or once should_stop()
+        returns True), with confidence intervals. The random state is left as
+        it was.
+        """
+        exact = self.ruleset_funcs.get('exact_output_distribution')
+        reason = "this ruleset can't work out exact distributions"
+        if exact is not None:
+            try:
+                if max_outcomes is None:
+                    raw = exact(tables, start_table, self.ruleset_funcs)
+                else:
+                    raw = exact(tables, start_table, self.ruleset_funcs, max_outcomes)
+            except ValueError as e:
+                reason = str(e)
+            else:
+                probabilities = {}
+                for text, probability in raw.items():
+                    text = self.resolve_a_an(text)
+                    probabilities[text] = probabilities.get(text, 0.0) + probability
+                return OutputDistribution(probabilities, exact=True)
+
+        state = random.getstate()
+        counts = {}
+        runs = 0
+        deadline = time.perf_counter() + max_seconds if max_seconds else None
+        try:
+            for run_index in range(samples):
+                result = self.generate_seeded_one(tables, start_table, seed, run_index)
+                counts[result] = counts.get(result, 0) + 1
+                runs += 1
+                if deadline is not None and time.perf_counter() > deadline:
+                    break
+                if should_stop is not None and should_stop():
+                    break
+        finally:
+            random.setstate(state)
+        return OutputDistribution({text: count / runs for text, count in counts.items()} if runs else {},
+                                  exact=False, samples=runs, reason=reason)
+
+    def resolve_start_table(self, tables, start_table=None):
+        """Returns start_table if the script defines it, otherwise the first table (or None)."""
+        if start_table and start_table in tables:
+            return start_table
+        return next(iter(tables), None)
+
+    def generate_one(self, tables, start_table):
+        """Runs one generation from start_table with fresh variables and decks."""
+        return self.resolve_a_an(self.generate_raw_one(tables, start_table))
+
+    def generate_raw_one(self, tables, start_table):
+        """Like generate_one(), but returns the text before '\\a' is resolved."""
+        helpers = self.ruleset_funcs
+
+        # --- INITIALIZE FRESH STATE FOR EACH RUN ---
+        helpers['variables'] = {}
+        helpers['deck_state'] = {}
+
+        base_text = helpers['roll_on_table'](start_table, tables)
+        return helpers['resolve_table_tags'](base_text, tables, helpers)
+
+    def generate(self, tables, start_table, num_runs, should_stop=None):
+        """Yields num_runs results from start_table. Stops early once should_stop() returns True."""
+        for _ in range(num_runs):
+            if should_stop is not None and should_stop():
+                return
+            yield self.generate_one(tables, start_table)
+
+    def generate_unique(self, tables, start_table, num_results, max_retries=DEFAULT_UNIQUE_RETRIES, should_stop=None, stats=None):
+        """
+        Yields up to num_results distinct results from start_table (see
+        unique_results). Pass a UniqueStats to read the collision rate.
+        """
+        attempts = num_results * (max_retries + 1)
+        return unique_results(self.generate(tables, start_table, attempts, should_stop),
+                              num_results, max_retries, new_seen_filter(num_results), stats)
+
+    def generate_seeded_one(self, tables, start_table, master_seed, run_index, raw=False):
+        """
+        Runs generation number run_index with its own seed derived from
+        master_seed. With raw, '\\a' is left unresolved.
+        """
+        run_seed = derive_run_seed(master_seed, run_index)
+        random.seed(run_seed)
+        if self.dice_engine is not None:
+            self.dice_engine.seed(run_seed)
+        if raw:
+            return self.generate_raw_one(tables, start_table)
+        return self.generate_one(tables, start_table)
+
+    def generate_batch(self, script, start_table, num_runs, master_seed=None, workers=1, chunksize=None, raw=False, window=None):
+        """
+        Yields num_runs results in run order, spreading the runs over a pool of
+        worker processes when workers > 1. Every run is seeded from
+        (master_seed, run index) alone, so a given master seed produces the
+        same results whatever the worker count. With raw, the results are
+        yielded before '\\a' is resolved (see resolve_a_an). With window, the
+        pool is only given that many runs at a time (plus the next window while
+        one is being read), so a reader that stops early, like unique mode,
+        doesn't leave the workers rolling runs nobody needs.
+        """
+        if master_seed is None:
+            master_seed = random.SystemRandom().getrandbits(64)
+
+        if workers <= 1 or num_runs <= 1:
+            tables = self.parse_script(script)
+            for run_index in range(num_runs):
+                yield self.generate_seeded_one(tables, start_table, master_seed, run_index, raw)
+            return
+
+        if self.ruleset_path is None:
+            raise RulesetError("Parallel generation needs an engine loaded from a ruleset folder.")
+
+        if chunksize is None:
+            chunksize = max(1, min(64, num_runs // (workers * 4)))
+
+        # Loaded ruleset modules can't be pickled, so each worker loads the
+        # ruleset and parses the script itself once, then only run indexes
+        # and result strings cross the process boundary.
+        with multiprocessing.Pool(workers, initializer=_init_batch_worker,
+                                  initargs=(self.ruleset_path, script, start_table, master_seed,
+                                            self.dice_engine is not None, self.a_an_exceptions, raw)) as pool:
+            if window is None:
+                yield from pool.imap(_run_batch_worker, range(num_runs), chunksize)
+                return
+            window = max(window, chunksize)
+            pending = None
+            for start in range(0, num_runs, window):
+                submitted = pool.imap(_run_batch_worker, range(start, min(start + window, num_runs)), chunksize)
+                if pending is not None:
+                    yield from pending
+                pending = submitted
+            if pending is not None:
+                yield from pending
+
+# --- Output Distributions ---
+
+# z for 95% confidence intervals
+CONFIDENCE_Z = 1.959964
+
+class OutputDistribution:
+    """
+    The probability of each output of a start table: exact, or estimated from
+    samples runs, in which case every probability has a 95% Wilson score
+    interval. reason says why the exact distribution wasn't available.
+    """
+    def __init__(self, probabilities, exact, samples=0, reason=None):
+        self.probabilities = probabilities
+        self.exact = exact
+        self.samples = samples
+        self.reason = reason
+
+    def __len__(self):
+        return len(self.probabilities)
+
+    def interval(self, text):
+        """Returns (low, high) for an output's probability (both equal when exact)."""
+        p = self.probabilities.get(text, 0.0)
+        if self.exact or not self.samples:
+            return p, p
+        n = self.samples
+        z2 = CONFIDENCE_Z * CONFIDENCE_Z
+        centre = (p + z2 / (2 * n)) / (1 + z2 / n)
+        half = CONFIDENCE_Z * math.sqrt(p * (1 - p) / n + z2 / (4 * n * n)) / (1 + z2 / n)
+        return max(0.0, centre - half), min(1.0, centre + half)
+
+    def outcomes(self):
+        """Returns [(text, probability, low, high), ...], most likely first."""
+        ranked = sorted(self.probabilities.items(), key=lambda item: (-item[1], item[0]))
+        return [(text, p) + self.interval(text) for text, p in ranked]
+
+    def format(self, limit=50):
+        """The distribution as readable text, showing at most limit outputs."""
+        if self.exact:
+            lines = [f"Exact distribution: {len(self)} possible outputs"]
+        else:
+            lines = [f"Estimated from {self.samples} runs ({self.reason}): {len(self)} distinct outputs seen",
+                     "Probabilities are shown with 95% confidence intervals."]
+        lines.append("")
+        outcomes = self.outcomes()
+        for text, p, low, high in outcomes[:limit]:
+            shown = text.replace("\n", " ")
+            if self.exact:
+                lines.append(f"  {p:9.4%}  {shown}")
+            else:
+                lines.append(f"  {p:9.4%}  [{low:.4%} - {high:.4%}]  {shown}")
+        if len(outcomes) > limit:
+            rest = sum(p for _, p, _, _ in outcomes[limit:])
+            lines.append(f"  {rest:9.4%}  ({len(outcomes) - limit} more outputs)")
+        return "\n".join(lines)
+
+# --- Parallel Batch Helpers ---
+
+def derive_run_seed(master_seed, run_index):
+    """Derives the seed of one run from the master seed and the run's index."""
+    digest = hashlib.sha256(f"{master_seed}:{run_index}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big")
+
+_batch_worker_state = None
+
+def _init_batch_worker(ruleset_path, script, start_table, master_seed, fast_dice, a_an_exceptions, raw):
+    global _batch_worker_state
+    engine = GenerationEngine.from_ruleset_path(ruleset_path)
+    if fast_dice:
+        engine.use_fast_dice()
+    engine.set_a_an_exceptions(a_an_exceptions)
+    tables = engine.parse_script(script)
+    _batch_worker_state = (engine, tables, start_table, master_seed, raw)
+
+def _run_batch_worker(run_index):
+    engine, tables, start_table, master_seed, raw = _batch_worker_state
+    return engine.generate_seeded_one(tables, start_table, master_seed, run_index, raw)
+
+# --- Unique Results ---
+# Uniqueness mode drops results that were already emitted. Results are
+# remembered by a 64-bit hash, or in a Bloom filter for very large runs, so
+# memory stays small however long the results are.
+
+# Above this many results, unique mode switches to a Bloom filter
+UNIQUE_BLOOM_THRESHOLD = 1_000_000
+
+def result_hash(result):
+    """64-bit BLAKE2b hash of a result, as used by SeenSet."""
+    return int.from_bytes(hashlib.blake2b(result.encode("utf-8"), digest_size=8).digest(), "big")
+
+class SeenSet:
+    """
+    The results seen so far, as a set of 64-bit hashes. Two different results
+    sharing a hash is vanishingly unlikely at the sizes the set is used for.
+    """
+    def __init__(self):
+        self.hashes = set()
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def add(self, result):
+        """Records result and returns True if it had not been seen before."""
+        key = result_hash(result)
+        if key in self.hashes:
+            return False
+        self.hashes.add(key)
+        return True
+
+class BloomFilter:
+    """
+    A Bloom filter sized for capacity results at the given false positive
+    rate (about 1.8 bytes per result at 0.1%). A false positive makes a new
+    result look like a repeat, so unique mode skips it and rolls again; it
+    never lets a real repeat through.
+    """
+    def __init__(self, capacity, error_rate=0.001):
+        capacity = max(1, capacity)
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def add(self, result):
+        """Records result and returns True if it had (probably) not been seen before."""
+        digest = hashlib.blake2b(result.encode("utf-8"), digest_size=16).digest()
+        # Double hashing: k bit positions from two 64-bit halves
+        first = int.from_bytes(digest[:8], "big")
+        step = int.from_bytes(digest[8:], "big") | 1
+        bits = self.bits
+        new = False
+        for i in range(self.hash_count):
+            position = (first + i * step) % self.size
+            mask = 1 << (position & 7)
+            if not bits[position >> 3] & mask:
+                bits[position >> 3] |= mask
+                new = True
+        if new:
+            self.count += 1
+        return new
+
+def new_seen_filter(num_results):
+    """A SeenSet, or a BloomFilter when num_results is above UNIQUE_BLOOM_THRESHOLD."""
+    if num_results > UNIQUE_BLOOM_THRESHOLD:
+        return BloomFilter(num_results)
+    return SeenSet()
+
+class UniqueStats:
+    """Counts kept by unique_results()."""
+    def __init__(self):
+        self.attempts = 0
+        self.unique = 0
+        self.collisions = 0
+        # True if unique_results() gave up after max_retries collisions in a row
+        self.exhausted = False
+
+    @property
+    def collision_rate(self):
+        return self.collisions / self.attempts if self.attempts else 0.0
+
+    def summary(self):
+        text = (f"{self.unique} unique results from {self.attempts} runs, "
+                f"{self.collisions} repeats ({self.collision_rate:.1%})")
+        if self.exhausted:
+            text += "; stopped early, the table is running out of distinct results"
+        return text
+
+def unique_results(results, num_results, max_retries=DEFAULT_UNIQUE_RETRIES, seen=None, stats=None):
+    """
+    Yields the first num_results distinct results from an iterable of results,
+    skipping repeats. Gives up (setting stats.exhausted) after max_retries
+    repeats in a row, which means the table has few distinct outputs left.
+    """
+    if seen is None:
+        seen = new_seen_filter(num_results)
+    if stats is None:
+        stats = UniqueStats()
+    if num_results <= 0:
+        return
+    misses = 0
+    for result in results:
+        stats.attempts += 1
+        if seen.add(result):
+            stats.unique += 1
+            misses = 0
+            yield result
+            if stats.unique >= num_results:
+                return
+        else:
+            stats.collisions += 1
+            misses += 1
+            if misses > max_retries:
+                stats.exhausted = True
+                return
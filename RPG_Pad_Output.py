@@ -0,0 +1,175 @@
+import json
+import tempfile
+from array import array
+
+# --- RPG Pad Pro output sinks ---
+# Each sink writes results to an open file (or pipe) one at a time as they are
+# generated, so memory stays flat no matter how many runs are requested.
+
+HTML_HEADER = """<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <title>Generator Output</title>
+    <style>
+        body { font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; padding: 40px; background-color: #f4f4f4; }
+        .container { background-color: white; padding: 40px; border-radius: 8px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); max-width: 20000px; margin: 0 auto; }
+        .result-block { margin-bottom: 20px; line-height: 1.6; }
+        hr { border: 0; height: 1px; background: #ddd; margin: 30px 0; }
+        table { border-collapse: collapse; width: 100%; margin-top: 10px; margin-bottom: 10px; }
+        td, th { border: 1px solid #ddd; padding: 8px; text-align: left; }
+        tr:nth-child(even) { background-color: #f9f9f9; }
+        th { background-color: #4CAF50; color: white; }
+        h1, h2, h3 { color: #333; }
+        b { color: #444; }
+    </style>
+</head>
+<body>
+    <div class="container">
+"""
+
+HTML_FOOTER = """
+    </div>
+</body>
+</html>
+"""
+
+class OutputSink:
+    """
+    Base sink. Subclasses override begin(), write_result() and end().
+    Use as a context manager so the footer is written even on errors.
+    """
+    def __init__(self, stream):
+        self.stream = stream
+        self.count = 0
+
+    def __enter__(self):
+        self.begin()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end()
+        return False
+
+    def begin(self):
+        pass
+
+    def write(self, result):
+        self.write_result(result)
+        self.count += 1
+
+    def write_result(self, result):
+        raise NotImplementedError
+
+    def end(self):
+        pass
+
+class TextSink(OutputSink):
+    """Plain text, one result per line."""
+    def write_result(self, result):
+        self.stream.write(result)
+        self.stream.write("\n")
+
+class HtmlSink(OutputSink):
+    """A standalone HTML page with an <hr> between results (as used by 'Generate In Browser')."""
+    def begin(self):
+        self.stream.write(HTML_HEADER)
+
+    def write_result(self, result):
+        if self.count:
+            self.stream.write("<hr>")
+        self.stream.write(f"<div class='result-block'>{result}</div>")
+
+    def end(self):
+        self.stream.write(HTML_FOOTER)
+
+class JsonLinesSink(OutputSink):
+    """One JSON object per line: {"run": <index>, "text": <result>}."""
+    def write_result(self, result):
+        self.stream.write(json.dumps({"run": self.count, "text": result}, ensure_ascii=False))
+        self.stream.write("\n")
+
+SINKS = {
+    'text': TextSink,
+    'html': HtmlSink,
+    'jsonl': JsonLinesSink,
+}
+
+def stream_results(results, sink):
+    """Writes each result from an iterable (e.g. engine.generate()) to the sink as it arrives. Returns the count."""
+    with sink:
+        for result in results:
+            sink.write(result)
+    return sink.count
+
+class ResultStore:
+    """
+    Keeps generated results in an append-only temporary file, with an array
+    of where each one starts. Memory use is 8 bytes per result however long
+    the results are, so the GUI can hold a large batch and still show, search
+    and save all of it.
+    """
+    READ_CHUNK = 500
+
+    def __init__(self):
+        self.file = tempfile.TemporaryFile()
+        self.offsets = array('q', [0])
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def append(self, result):
+        """Adds a result and returns its index."""
+        data = result.encode('utf-8')
+        self.file.seek(self.offsets[-1])
+        self.file.write(data)
+        self.offsets.append(self.offsets[-1] + len(data))
+        return len(self.offsets) - 2
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("result index out of range")
+        return self.get_range(index, index + 1)[0]
+
+    def get_range(self, start, stop):
+        """Returns results start to stop - 1 (clamped), read with a single file read."""
+        start = max(0, start)
+        stop = min(stop, len(self))
+        if start >= stop:
+            return []
+        offsets = self.offsets
+        self.file.seek(offsets[start])
+        data = self.file.read(offsets[stop] - offsets[start])
+        base = offsets[start]
+        return [data[offsets[i] - base:offsets[i + 1] - base].decode('utf-8') for i in range(start, stop)]
+
+    def __iter__(self):
+        for start in range(0, len(self), self.READ_CHUNK):
+            yield from self.get_range(start, start + self.READ_CHUNK)
+
+    def find(self, predicate, start=0):
+        """
+        Returns the index of the first result from start onwards (wrapping
+        round to the beginning) for which predicate(result) is true, or -1.
+        """
+        count = len(self)
+        if not count:
+            return -1
+        start %= count
+        for begin, end in ((start, count), (0, start)):
+            for chunk_start in range(begin, end, self.READ_CHUNK):
+                chunk = self.get_range(chunk_start, min(chunk_start + self.READ_CHUNK, end))
+                for offset, result in enumerate(chunk):
+                    if predicate(result):
+                        return chunk_start + offset
+        return -1
+
+    def clear(self):
+        self.file.seek(0)
+        self.file.truncate()
+        self.offsets = array('q', [0])
+
+    def close(self):
+        self.file.close()
@@ -1,12 +1,130 @@
 import tkinter as tk
 from tkinter import messagebox, filedialog, ttk
 import random
-import re
 import os 
-import importlib.util 
-import sys 
 import webbrowser
 import tempfile
+import threading
+import queue
+from bisect import bisect_right
+from RPG_Pad_Engine import GenerationEngine, UniqueStats, list_rulesets, load_ruleset, missing_core_funcs
+from RPG_Pad_Output import SINKS, HtmlSink, ResultStore, stream_results
+from RPG_Pad_Profile import GenerationProfiler, write_collapsed_file
+from RPG_Pad_Render import SEPARATOR_TEXT, flatten_runs, html_to_runs, plain_text, separator_runs, strip_tags
+
+class VirtualOutput:
+    """
+    The Simple Output pane. Every result goes into a ResultStore; the Text
+    widget only holds a window of WINDOW results around the view, rendered
+    again as the user scrolls past either end of it. The scrollbar is driven
+    by hand so that it spans every stored result, not just the rendered ones.
+    """
+    WINDOW = 200
+
+    def __init__(self, parent, **text_options):
+        self.store = ResultStore()
+        self.first = 0
+        # Widget line on which each rendered result (or its separator) starts
+        self.line_starts = []
+        self.shift_job = None
+
+        frame = tk.Frame(parent)
+        frame.pack(fill=tk.BOTH, expand=True)
+        self.scrollbar = tk.Scrollbar(frame, command=self.on_scrollbar)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.text = tk.Text(frame, yscrollcommand=self.on_text_scroll, **text_options)
+        self.text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+    @property
+    def last(self):
+        return self.first + len(self.line_starts)
+
+    def append(self, results):
+        """Stores new results, rendering them too while the window ends at the last result and has room."""
+        start = len(self.store)
+        following = self.last == start
+        for result in results:
+            self.store.append(result)
+        room = self.WINDOW - len(self.line_starts)
+        if following and room > 0:
+            self._render(start, results[:room])
+        else:
+            self.on_text_scroll(*self.text.yview())
+
+    def clear(self):
+        self.store.clear()
+        self.text.delete("1.0", tk.END)
+        self.first = 0
+        self.line_starts = []
+        self.scrollbar.set(0, 1)
+
+    def _render(self, start, results):
+        # Renders results (store index start onwards) at the end of the widget in one insert
+        line = int(self.text.index("end-1c").split('.')[0])
+        runs = []
+        for index, result in enumerate(results, start):
+            result_runs = html_to_runs(result)
+            if index:
+                result_runs = separator_runs() + result_runs
+            self.line_starts.append(line)
+            line += sum(text.count("\n") for text, _ in result_runs)
+            runs.extend(result_runs)
+        if runs:
+            self.text.insert(tk.END, *flatten_runs(runs))
+
+    def show_window(self, first):
+        """Renders the WINDOW results from first (clamped to the store)."""
+        first = max(0, min(first, len(self.store) - self.WINDOW))
+        self.text.delete("1.0", tk.END)
+        self.first = first
+        self.line_starts = []
+        self._render(first, self.store.get_range(first, first + self.WINDOW))
+
+    def top_result(self):
+        """Index of the result at the top of the view."""
+        line = int(self.text.index("@0,0").split('.')[0])
+        return self.first + max(bisect_right(self.line_starts, line) - 1, 0)
+
+    def scroll_to(self, index):
+        """Brings a result to the top of the view, rendering a new window if needed."""
+        if not self.first <= index < self.last:
+            self.show_window(index - self.WINDOW // 4)
+        if self.first <= index < self.last:
+            self.text.yview(f"{self.line_starts[index - self.first]}.0")
+
+    def result_range(self, index):
+        """Widget indices spanning a rendered result."""
+        position = index - self.first
+        end = f"{self.line_starts[position + 1]}.0" if position + 1 < len(self.line_starts) else tk.END
+        return f"{self.line_starts[position]}.0", end
+
+    def on_text_scroll(self, lo, hi):
+        lo, hi = float(lo), float(hi)
+        total = len(self.store)
+        if total and self.line_starts:
+            span = len(self.line_starts) / total
+            self.scrollbar.set(self.first / total + lo * span, self.first / total + hi * span)
+        else:
+            self.scrollbar.set(lo, hi)
+        # At either edge of the window, slide it along once Tk has finished this redraw
+        if self.shift_job is None and ((lo <= 0 and self.first > 0) or (hi >= 1 and self.last < total)):
+            self.shift_job = self.text.after_idle(self._shift_window)
+
+    def _shift_window(self):
+        self.shift_job = None
+        top = self.top_result()
+        first = max(0, min(top - self.WINDOW // 2, len(self.store) - self.WINDOW))
+        if first != self.first:
+            self.show_window(first)
+            self.scroll_to(top)
+
+    def on_scrollbar(self, *args):
+        if args[0] == "moveto":
+            total = len(self.store)
+            if total:
+                self.scroll_to(min(int(float(args[1]) * total), total - 1))
+        else:
+            self.text.yview(*args)
 
 class IPPInterface:
     def __init__(self, root, base_dir):
@@ -17,13 +135,27 @@ class IPPInterface:
 
         self.COLOR_ODD = "#FFFFFF"
         self.COLOR_EVEN = "#EFEFEF"
+        # Script Editor striping is debounced and limited to the visible lines
+        self.SHADING_DELAY_MS = 75
+        self.SHADING_MARGIN = 50
+        self.shading_job = None
         self.base_dir = base_dir 
         self.RULESET_DIR = os.path.join(base_dir, "Rules") 
         self.ruleset_funcs = {} 
-
-        # --- State for Table Parsing ---
-        self.in_table = False
-        self.cell_content_start_index = None
+        self.engine = None
+        # Tables parsed from the Script Editor; re-parsed only after an edit
+        self.script_tables = None
+
+        # --- State for Background Generation ---
+        self.POLL_MS = 50
+        self.INSERT_BATCH = 50
+        self.result_queue = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.generation_thread = None
+        self.pending_report = None
+        self.generation_total = 0
+        self.generation_done = 0
+        self.browser_file = None
 
         # --- Menu Bar (File I/O) ---
         self.create_menu()
@@ -48,8 +180,10 @@ class IPPInterface:
         
         # INPUT STRIPING CONFIGURATION 
         self.input_text.tag_configure("even_line", background="#DDDDDD")
-        self.input_text.bind("<KeyRelease>", lambda e: self.apply_shading(self.input_text))
-        self.input_text.bind("<ButtonRelease>", lambda e: self.apply_shading(self.input_text))
+        self.input_text.bind("<KeyRelease>", self.schedule_shading)
+        self.input_text.bind("<ButtonRelease>", self.schedule_shading)
+        # Called by Tk whenever the view moves (scrolling, resizing, edits)
+        self.input_text.config(yscrollcommand=self.schedule_shading)
 
         # --- Center Widgets (Controls) ---
         tk.Label(control_frame, text="Active Ruleset:", font=("Arial", 9)).pack(pady=(20, 5))
@@ -69,6 +203,16 @@ class IPPInterface:
         self.run_count_entry.insert(0, "5")
         self.run_count_entry.pack(pady=5)
 
+        # Unique mode: repeats are rolled again, and the repeat rate is shown when done
+        self.unique_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(control_frame, text="Unique results", variable=self.unique_var).pack(pady=5)
+        self.unique_stats = None
+
+        # Profiling: the report opens in its own window when the run ends
+        self.profile_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(control_frame, text="Profile run", variable=self.profile_var).pack(pady=5)
+        self.profiler = None
+
         self.generate_btn = tk.Button(control_frame, text="Generate >>", command=self.run_generation, height=2, bg="#dddddd", font=("Arial", 10, "bold"))
         self.generate_btn.pack(pady=(30, 5))
 
@@ -77,13 +221,34 @@ class IPPInterface:
         self.browser_btn.pack(pady=(0, 20))
         # --------------------------
 
+        self.cancel_btn = tk.Button(control_frame, text="Cancel", command=self.cancel_generation, state=tk.DISABLED)
+        self.cancel_btn.pack(pady=5)
+
+        self.progress_bar = ttk.Progressbar(control_frame, length=130, mode='determinate')
+        self.progress_bar.pack(pady=5)
+        self.progress_label = tk.Label(control_frame, text="", font=("Arial", 9))
+        self.progress_label.pack()
+
         self.clear_btn = tk.Button(control_frame, text="Clear Output", command=self.clear_output)
         self.clear_btn.pack(side=tk.BOTTOM, pady=20)
 
         # --- Right Widgets (Output) ---
         tk.Label(right_frame, text="Simple Output", font=("Arial", 11, "bold")).pack(anchor="w")
-        self.output_text = tk.Text(right_frame, width=40, height=30, wrap=tk.WORD, bg=self.COLOR_ODD)
-        self.output_text.pack(fill=tk.BOTH, expand=True)
+        output_tools = tk.Frame(right_frame)
+        output_tools.pack(fill=tk.X, pady=(0, 5))
+        self.search_entry = tk.Entry(output_tools, width=20)
+        self.search_entry.pack(side=tk.LEFT)
+        self.search_entry.bind("<Return>", self.find_next)
+        tk.Button(output_tools, text="Find", command=self.find_next).pack(side=tk.LEFT, padx=(5, 0))
+        self.search_label = tk.Label(output_tools, text="", font=("Arial", 9))
+        self.search_label.pack(side=tk.LEFT, padx=5)
+        tk.Button(output_tools, text="Save Output...", command=self.save_output).pack(side=tk.RIGHT)
+        tk.Button(output_tools, text="Copy All", command=self.copy_output).pack(side=tk.RIGHT, padx=5)
+
+        # Results are kept in a file-backed store; only those near the view are rendered
+        self.output = VirtualOutput(right_frame, width=40, height=30, wrap=tk.WORD, bg=self.COLOR_ODD)
+        self.output_text = self.output.text
+        self.search_index = -1
         self.setup_output_tags() 
 
         # --- Initial Setup ---
@@ -101,11 +266,8 @@ class IPPInterface:
             messagebox.showerror("File System Error", f"Could not create ruleset directory '{self.RULESET_DIR}': {e}")
             
     def refresh_ruleset_list(self):
-        ruleset_names = []
         try:
-            for entry in os.scandir(self.RULESET_DIR):
-                if entry.is_dir():
-                    ruleset_names.append(entry.name)
+            ruleset_names = list_rulesets(self.RULESET_DIR)
         except FileNotFoundError:
             self._ensure_rules_directory()
             return
@@ -124,65 +286,51 @@ class IPPInterface:
             else:
                 self.package_selector.current(0)
                 
-    def _load_module_from_path(self, file_path, module_name):
-        spec = importlib.util.spec_from_file_location(module_name, file_path)
-        if spec is None: return None
-        module = importlib.util.module_from_spec(spec)
-        sys.path.append(os.path.dirname(file_path)) 
-        try:
-            spec.loader.exec_module(module)
-            return module
-        except Exception as e:
-            messagebox.showerror("Ruleset Error", f"Error loading rule file '{file_path}': {e}")
-            return None
-        finally:
-            sys.path.pop() 
-            
     def _load_active_ruleset(self, event=None):
         ruleset_name = self.package_selector.get()
         if ruleset_name.startswith("--"):
              self.ruleset_funcs = {}
+             self.engine = None
              return
              
         ruleset_path = os.path.join(self.RULESET_DIR, ruleset_name)
-        new_funcs = {}
-        errors = []
-        
-        for item in os.listdir(ruleset_path):
-            file_path = os.path.join(ruleset_path, item)
-            
-            if os.path.isfile(file_path) and (item.endswith('.py') or item.endswith('.rule')):
-                module_name = item.split('.')[0]
-                module = self._load_module_from_path(file_path, module_name)
-                
-                if module:
-                    for attr_name in dir(module):
-                        attr = getattr(module, attr_name)
-                        if callable(attr) and not attr_name.startswith("__"):
-                            new_funcs[attr_name] = attr 
-                else:
-                    errors.append(item)
+        new_funcs, errors = load_ruleset(ruleset_path)
+        for file_path, e in errors:
+            messagebox.showerror("Ruleset Error", f"Error loading rule file '{file_path}': {e}")
 
         self.ruleset_funcs = new_funcs
         
         # Check for essential CORE ENGINE functions 
-        CORE_ENGINE_FUNCS = ['parse_tables', 'roll_on_table', 'resolve_table_tags', 'math_evaluator', 'case_converter', 'list_sorter'] 
-        if not all(func in self.ruleset_funcs for func in CORE_ENGINE_FUNCS):
-            messagebox.showerror("Ruleset Error", f"The ruleset '{ruleset_name}' is missing one or more CORE ENGINE functions: {', '.join(CORE_ENGINE_FUNCS)}. Ensure necessary files are present.")
+        missing = missing_core_funcs(self.ruleset_funcs)
+        if missing:
+            messagebox.showerror("Ruleset Error", f"The ruleset '{ruleset_name}' is missing one or more CORE ENGINE functions: {', '.join(missing)}. Ensure necessary files are present.")
             self.ruleset_funcs = {}
+
+        self.engine = GenerationEngine(self.ruleset_funcs) if self.ruleset_funcs else None
+        self.script_tables = None
             
         self.refresh_table_list()
 
 
     # --- Generation Logic ---
+    def get_script_tables(self):
+        """
+        Returns the tables parsed from the Script Editor. The buffer is only read
+        and re-parsed when the Text widget's modified flag says it was edited.
+        """
+        if self.script_tables is None or self.input_text.edit_modified():
+            script = self.input_text.get("1.0", tk.END)
+            self.input_text.edit_modified(False)
+            self.script_tables = self.engine.parse_script(script)
+        return self.script_tables
+
     def refresh_table_list(self):
-        if 'parse_tables' not in self.ruleset_funcs:
+        if self.engine is None:
             self.table_selector['values'] = ["-- Ruleset Not Loaded --"]
             self.table_selector.set("-- Ruleset Not Loaded --")
             return
 
-        script = self.input_text.get("1.0", tk.END)
-        tables = self.ruleset_funcs['parse_tables'](script) 
+        tables = self.get_script_tables()
         
         table_names = list(tables.keys())
         self.table_selector['values'] = table_names
@@ -193,182 +341,185 @@ class IPPInterface:
         else:
             self.table_selector.set("")
 
-    def run_generation(self):
-        CORE_ENGINE_FUNCS = ['parse_tables', 'roll_on_table', 'resolve_table_tags', 'math_evaluator', 'case_converter', 'list_sorter']
-        if not all(func in self.ruleset_funcs for func in CORE_ENGINE_FUNCS):
+    def _prepare_generation(self):
+        """Parses the script and reads the run settings. Returns (tables, start_table, num_runs) or None."""
+        if self.engine is None:
             messagebox.showerror("Execution Error", "Core Ruleset is not fully loaded. Check for errors during load.")
-            return
-
-        parse_tables_func = self.ruleset_funcs['parse_tables']
-        roll_on_table_func = self.ruleset_funcs['roll_on_table']
-        resolve_table_tags_func = self.ruleset_funcs['resolve_table_tags']
+            return None
 
-        script = self.input_text.get("1.0", tk.END)
-        tables = parse_tables_func(script)
+        tables = self.get_script_tables()
 
         if not tables:
             messagebox.showinfo("Info", "No tables found in script.")
-            return
+            return None
 
         try:
             num_runs = int(self.run_count_entry.get())
         except ValueError:
             messagebox.showerror("Input Error", "Please enter a valid number for 'Run X Times'.")
-            return
-
-        start_table = self.table_selector.get()
-        if not start_table or start_table not in tables:
-            if tables:
-                start_table = list(tables.keys())[0]
-            else:
-                return
-
-        self.output_text.delete("1.0", tk.END)
-        
-        # Pass UI update to prevent freezing
-        self.ruleset_funcs['gui_update'] = self.root.update 
-
-        for i in range(num_runs):
-            # --- INITIALIZE FRESH STATE FOR EACH RUN ---
-            self.ruleset_funcs['variables'] = {}
-            self.ruleset_funcs['deck_state'] = {} 
-            # -------------------------------------------
+            return None
 
-            base_text = roll_on_table_func(start_table, tables) 
-            
-            # --- Resolve Tags ---
-            final_text = resolve_table_tags_func(base_text, tables, self.ruleset_funcs) 
-            
-            # --- Resolve \a modifier ---
-            final_text = self.resolve_a_an_modifier(final_text)
+        start_table = self.engine.resolve_start_table(tables, self.table_selector.get())
+        return tables, start_table, num_runs
 
-            self.parse_and_insert_html(final_text)
+    def run_generation(self):
+        if self.generation_thread is not None:
+            return
+        prepared = self._prepare_generation()
+        if prepared is None:
+            return
 
-            if i < num_runs - 1:
-                self.output_text.insert(tk.END, "═" * 40, "separator")
-                self.output_text.insert(tk.END, "\n")
+        self.clear_output()
+        self._start_generation(*prepared)
 
     def run_generation_browser(self):
-        CORE_ENGINE_FUNCS = ['parse_tables', 'roll_on_table', 'resolve_table_tags', 'math_evaluator', 'case_converter', 'list_sorter']
-        if not all(func in self.ruleset_funcs for func in CORE_ENGINE_FUNCS):
-            messagebox.showerror("Execution Error", "Core Ruleset is not fully loaded.")
+        if self.generation_thread is not None:
             return
-
-        parse_tables_func = self.ruleset_funcs['parse_tables']
-        roll_on_table_func = self.ruleset_funcs['roll_on_table']
-        resolve_table_tags_func = self.ruleset_funcs['resolve_table_tags']
-
-        script = self.input_text.get("1.0", tk.END)
-        tables = parse_tables_func(script)
-
-        if not tables:
-            messagebox.showinfo("Info", "No tables found in script.")
+        prepared = self._prepare_generation()
+        if prepared is None:
             return
 
+        # Results are streamed straight into the temp file as they are generated
         try:
-            num_runs = int(self.run_count_entry.get())
-        except ValueError:
-            messagebox.showerror("Input Error", "Please enter a valid number.")
-            return
-
-        start_table = self.table_selector.get()
-        if not start_table or start_table not in tables:
-            if tables:
-                start_table = list(tables.keys())[0]
-            else:
-                return
-
-        # Pass UI update function
-        self.ruleset_funcs['gui_update'] = self.root.update 
-
-        full_html_content = ""
-        
-        for i in range(num_runs):
-            # --- INITIALIZE FRESH STATE FOR EACH RUN ---
-            self.ruleset_funcs['variables'] = {}
-            self.ruleset_funcs['deck_state'] = {} 
-            # -------------------------------------------
-
-            base_text = roll_on_table_func(start_table, tables) 
-            final_text = resolve_table_tags_func(base_text, tables, self.ruleset_funcs) 
-            final_text = self.resolve_a_an_modifier(final_text)
-
-            full_html_content += f"<div class='result-block'>{final_text}</div>"
-            if i < num_runs - 1:
-                full_html_content += "<hr>"
-
-        final_html = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="utf-8">
-            <title>Generator Output</title>
-            <style>
-                body {{ font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; padding: 40px; background-color: #f4f4f4; }}
-                .container {{ background-color: white; padding: 40px; border-radius: 8px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); max-width: 20000px; margin: 0 auto; }}
-                .result-block {{ margin-bottom: 20px; line-height: 1.6; }}
-                hr {{ border: 0; height: 1px; background: #ddd; margin: 30px 0; }}
-                table {{ border-collapse: collapse; width: 100%; margin-top: 10px; margin-bottom: 10px; }}
-                td, th {{ border: 1px solid #ddd; padding: 8px; text-align: left; }}
-                tr:nth-child(even) {{ background-color: #f9f9f9; }}
-                th {{ background-color: #4CAF50; color: white; }}
-                h1, h2, h3 {{ color: #333; }}
-                b {{ color: #444; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                {full_html_content}
-            </div>
-        </body>
-        </html>
-        """
-
-        try:
-            with tempfile.NamedTemporaryFile('w', delete=False, suffix='.html', encoding='utf-8') as f:
-                url = 'file://' + f.name
-                f.write(final_html)
-            webbrowser.open(url)
+            self.browser_file = tempfile.NamedTemporaryFile('w', delete=False, suffix='.html', encoding='utf-8')
         except Exception as e:
             messagebox.showerror("Browser Error", f"Could not open browser: {e}")
-
-    # --- A/An Modifier Resolver ---
-    def resolve_a_an_modifier(self, text):
-        """
-        Replaces the '\a' modifier with 'a' or 'an' based on the following word.
-        """
-        VOWELS = "AEIOUaeiou"
-
-        def final_substitute(match):
-            index = match.end()
-            text_after_a = match.string[index:]
-            
-            i = 0
-            while i < len(text_after_a):
-                char = text_after_a[i]
-                if char.isspace():
-                    i += 1
-                    continue
-                if char == '<':
-                    tag_end = text_after_a.find('>', i)
-                    if tag_end != -1:
-                        i = tag_end + 1
-                        continue
-                    else:
-                        i += 1
-                        continue
-                first_char = char
-                break
+            return
+        self._start_generation(*prepared)
+
+    # --- Background Generation ---
+    # Runs are generated on a worker thread. The worker never touches Tk: it only
+    # puts ('result', text) or ('progress', None) for each finished run, any
+    # ('report', (title, text)) and finally ('done', error) on result_queue,
+    # which the Tk thread drains in batches with after(). Other jobs that use
+    # the engine (like the output distribution) run the same way, so only one
+    # thread uses it at a time.
+    def _start_generation(self, tables, start_table, num_runs):
+        self.unique_stats = UniqueStats() if self.unique_var.get() else None
+        self.profiler = GenerationProfiler() if self.profile_var.get() else None
+        self._start_worker(num_runs, self._generation_worker, self.engine, tables, start_table, num_runs,
+                           self.browser_file, self.unique_stats, self.profiler)
+
+    def _start_worker(self, total, target, *args):
+        self.cancel_event.clear()
+        self.result_queue = queue.Queue()
+        self.pending_report = None
+        self.generation_total = total
+        self.generation_done = 0
+        self._set_generating(True)
+        self._update_progress()
+
+        self.generation_thread = threading.Thread(target=target, args=args + (self.result_queue,), daemon=True)
+        self.generation_thread.start()
+        self.root.after(self.POLL_MS, self._poll_generation)
+
+    def _generation_worker(self, engine, tables, start_table, num_runs, browser_file, unique_stats, profiler, result_queue):
+        error = None
+        try:
+            if unique_stats is not None:
+                results = engine.generate_unique(tables, start_table, num_runs, should_stop=self.cancel_event.is_set, stats=unique_stats)
             else:
-                first_char = ''
-
-            if first_char and first_char in VOWELS:
-                return "an"
+                results = engine.generate(tables, start_table, num_runs, should_stop=self.cancel_event.is_set)
+            # The profiler only sees this thread, so Tk is never slowed down by it
+            if profiler is not None:
+                with profiler:
+                    self._send_results(results, browser_file, result_queue)
             else:
-                return "a"
-
-        text = re.sub(r'\\a', final_substitute, text)
-        return text
+                self._send_results(results, browser_file, result_queue)
+        except Exception as e:
+            error = e
+        result_queue.put(('done', error))
+
+    def _send_results(self, results, browser_file, result_queue):
+        if browser_file is not None:
+            with browser_file, HtmlSink(browser_file) as sink:
+                for result in results:
+                    sink.write(result)
+                    result_queue.put(('progress', None))
+        else:
+            for result in results:
+                result_queue.put(('result', result))
+
+    def _poll_generation(self):
+        finished = False
+        error = None
+        handled = 0
+        # The whole batch is stored at once; any of it that is rendered goes in with one insert
+        results = []
+        try:
+            while handled < self.INSERT_BATCH:
+                kind, payload = self.result_queue.get_nowait()
+                if kind == 'done':
+                    finished, error = True, payload
+                    break
+                if kind == 'report':
+                    self.pending_report = payload
+                else:
+                    # 'result' and 'progress' each stand for one finished run
+                    if kind == 'result':
+                        results.append(payload)
+                    self.generation_done += 1
+                handled += 1
+        except queue.Empty:
+            pass
+        if results:
+            self.output.append(results)
+
+        self._update_progress()
+        if finished:
+            self._finish_generation(error)
+        else:
+            self.root.after(self.POLL_MS, self._poll_generation)
+
+    def _finish_generation(self, error):
+        cancelled = self.cancel_event.is_set()
+        browser_file = self.browser_file
+        self.browser_file = None
+        self.generation_thread = None
+        self._set_generating(False)
+
+        if error is not None:
+            messagebox.showerror("Execution Error", f"Generation failed: {error}")
+        elif browser_file is not None and not cancelled:
+            try:
+                webbrowser.open('file://' + browser_file.name)
+            except Exception as e:
+                messagebox.showerror("Browser Error", f"Could not open browser: {e}")
+
+        if self.unique_stats is not None:
+            stats = self.unique_stats
+            self.progress_label.config(text=f"{'Cancelled: ' if cancelled else ''}{stats.unique} unique, {stats.collision_rate:.1%} repeats")
+            if stats.exhausted:
+                messagebox.showinfo("Unique Results", stats.summary() + ".")
+        elif cancelled:
+            self.progress_label.config(text=f"Cancelled ({self.generation_done} / {self.generation_total})")
+
+        if self.profiler is not None and error is None:
+            self.show_profile(self.profiler)
+        self.profiler = None
+        if self.pending_report is not None:
+            self._show_report(*self.pending_report)
+            self.pending_report = None
+
+    def cancel_generation(self):
+        self.cancel_event.set()
+
+    def _set_generating(self, generating):
+        busy = tk.DISABLED if generating else tk.NORMAL
+        self.generate_btn.config(state=busy)
+        self.browser_btn.config(state=busy)
+        self.refresh_btn.config(state=busy)
+        self.package_selector.config(state=tk.DISABLED if generating else "readonly")
+        # These use the engine (and the global random state) too
+        self.file_menu.entryconfig("Open Script...", state=busy)
+        self.tools_menu.entryconfig("Analyze Script...", state=busy)
+        self.tools_menu.entryconfig("Output Distribution...", state=busy)
+        self.cancel_btn.config(state=tk.NORMAL if generating else tk.DISABLED)
+
+    def _update_progress(self):
+        self.progress_bar['maximum'] = max(self.generation_total, 1)
+        self.progress_bar['value'] = self.generation_done
+        self.progress_label.config(text=f"{self.generation_done} / {self.generation_total}")
 
     # --- UI & Helper Methods ---
                 
@@ -388,31 +539,37 @@ class IPPInterface:
         self.output_text.tag_configure("green", foreground="green")
         self.output_text.tag_configure("gray", foreground="gray")
         self.output_text.tag_configure("separator", foreground="#888888", justify='center', spacing1=10, spacing3=10)
+        self.output_text.tag_configure("search_hit", background="#FFF176")
         
         # --- Table Tags ---
+        # Table layout pads columns with spaces (see RPG_Pad_Render.py), so
+        # cells use a fixed-width font and table lines don't wrap.
         self.output_text.tag_configure("table_border", 
                                        lmargin1=10, 
                                        lmargin2=10,
                                        rmargin=10,  
-                                       background="#F9F9F9") 
+                                       background="#F9F9F9",
+                                       font=("Courier", 10),
+                                       wrap=tk.NONE) 
         
         self.output_text.tag_configure("td_cell", 
-                                       borderwidth=1, 
-                                       relief=tk.RIDGE, 
-                                       font=(base_font, 10), 
-                                       lmargin1=5, 
-                                       lmargin2=5,
-                                       rmargin=5) 
+                                       font=("Courier", 10)) 
+        self.output_text.tag_configure("th_cell", 
+                                       font=("Courier", 10, "bold")) 
 
 
     def create_menu(self):
         menubar = tk.Menu(self.root)
-        file_menu = tk.Menu(menubar, tearoff=0)
+        file_menu = self.file_menu = tk.Menu(menubar, tearoff=0)
         file_menu.add_command(label="Open Script...", command=self.open_file)
         file_menu.add_command(label="Save Script...", command=self.save_file)
         file_menu.add_separator()
         file_menu.add_command(label="Exit", command=self.root.quit)
         menubar.add_cascade(label="File", menu=file_menu)
+        tools_menu = self.tools_menu = tk.Menu(menubar, tearoff=0)
+        tools_menu.add_command(label="Analyze Script...", command=self.show_analysis)
+        tools_menu.add_command(label="Output Distribution...", command=self.show_distribution)
+        menubar.add_cascade(label="Tools", menu=tools_menu)
         self.root.config(menu=menubar)
 
     def load_sample_script(self):
@@ -434,16 +591,37 @@ class IPPInterface:
         self.input_text.delete("1.0", tk.END)
         self.input_text.insert(tk.END, content)
 
+    def schedule_shading(self, *args):
+        """Re-shades the Script Editor once input settles, instead of on every key press."""
+        if self.shading_job is not None:
+            self.root.after_cancel(self.shading_job)
+        self.shading_job = self.root.after(self.SHADING_DELAY_MS, self._run_scheduled_shading)
+
+    def _run_scheduled_shading(self):
+        self.shading_job = None
+        self.apply_shading(self.input_text)
+
     def apply_shading(self, text_widget):
-        text_widget.tag_remove("even_line", "1.0", "end")
-        last_index = text_widget.index("end-1c")
+        """
+        Stripes only the visible lines plus a margin either side. Lines further
+        away may hold stale stripes after edits, but they are re-shaded as soon
+        as they scroll into view.
+        """
         try:
-            num_lines = int(last_index.split('.')[0])
+            first_line = int(text_widget.index("@0,0").split('.')[0])
+            last_line = int(text_widget.index(f"@0,{text_widget.winfo_height()}").split('.')[0])
+            num_lines = int(text_widget.index("end-1c").split('.')[0])
         except ValueError:
             return 
-        for i in range(1, num_lines + 1):
-            if i % 2 == 0:
-                text_widget.tag_add("even_line", f"{i}.0", f"{i}.end + 1c")
+        first_line = max(1, first_line - self.SHADING_MARGIN)
+        last_line = min(num_lines, last_line + self.SHADING_MARGIN)
+
+        text_widget.tag_remove("even_line", f"{first_line}.0", f"{last_line}.end + 1c")
+        ranges = []
+        for i in range(first_line + first_line % 2, last_line + 1, 2):
+            ranges.extend((f"{i}.0", f"{i}.end + 1c"))
+        if ranges:
+            text_widget.tag_add("even_line", *ranges)
     
     def open_file(self):
         file_path = filedialog.askopenfilename(filetypes=[("Text Files", "*.txt"), ("All Files", "*.*")])
@@ -468,100 +646,127 @@ class IPPInterface:
             except Exception as e:
                 messagebox.showerror("Error", f"Could not save file: {e}")
 
+    def show_analysis(self):
+        """Shows the static analysis of the script's tables from the selected start table."""
+        if self.engine is None:
+            messagebox.showerror("Execution Error", "Core Ruleset is not fully loaded. Check for errors during load.")
+            return
+        tables = self.get_script_tables()
+        start_table = self.engine.resolve_start_table(tables, self.table_selector.get())
+        try:
+            report = self.engine.analyze(tables, start_table).format()
+        except Exception as e:
+            messagebox.showerror("Analysis Error", f"Could not analyze script: {e}")
+            return
+        self._show_report("Script Analysis", report)
+
+    def show_distribution(self):
+        """Shows the probability of each output of the selected start table (exact, or sampled)."""
+        if self.engine is None:
+            messagebox.showerror("Execution Error", "Core Ruleset is not fully loaded. Check for errors during load.")
+            return
+        tables = self.get_script_tables()
+        if not tables:
+            messagebox.showinfo("Info", "No tables found in script.")
+            return
+        if self.generation_thread is not None:
+            return
+        start_table = self.engine.resolve_start_table(tables, self.table_selector.get())
+        # Sampling can take a while, so it runs on the worker thread (Cancel stops it early)
+        self.unique_stats = None
+        self.profiler = None
+        self._start_worker(1, self._distribution_worker, self.engine, tables, start_table)
+
+    def _distribution_worker(self, engine, tables, start_table, result_queue):
+        error = None
+        try:
+            distribution = engine.output_distribution(tables, start_table, should_stop=self.cancel_event.is_set)
+            result_queue.put(('report', (f"Output Distribution: {start_table}", distribution.format())))
+            result_queue.put(('progress', None))
+        except Exception as e:
+            error = e
+        result_queue.put(('done', error))
+
+    def show_profile(self, profiler):
+        """Shows a generation profile, with a button to save it for flame graph tools."""
+        def save_flame_graph():
+            file_path = filedialog.asksaveasfilename(defaultextension=".folded",
+                                                     filetypes=[("Collapsed Stacks", "*.folded"), ("Text Files", "*.txt")])
+            if file_path:
+                try:
+                    write_collapsed_file(profiler, file_path)
+                except Exception as e:
+                    messagebox.showerror("Error", f"Could not save profile: {e}")
+        self._show_report("Generation Profile", profiler.format(), [("Save Flame Graph...", save_flame_graph)])
+
+    def _show_report(self, title, report, actions=()):
+        window = tk.Toplevel(self.root)
+        window.title(title)
+        if actions:
+            action_frame = tk.Frame(window)
+            action_frame.pack(side=tk.BOTTOM, fill=tk.X)
+            for label, command in actions:
+                tk.Button(action_frame, text=label, command=command).pack(side=tk.RIGHT, padx=5, pady=5)
+        report_text = tk.Text(window, width=90, height=30, wrap=tk.NONE, font=("Courier", 10))
+        report_text.pack(fill=tk.BOTH, expand=True)
+        report_text.insert(tk.END, report)
+        report_text.config(state=tk.DISABLED)
+
     def parse_and_insert_html(self, text_content):
-        tokens = re.split(r'(<[^>]+>)', text_content)
-        active_tags = set()
-        table_start_index = None 
-        
-        for token in tokens:
-            if not token: continue
-            
-            # Check if the token is an HTML tag
-            if token.startswith("<") and token.endswith(">"):
-                tag_lower = token.lower()
-                
-                # --- Block and Separator Tags ---
-                if tag_lower == "<br>": self.output_text.insert(tk.END, "\n")
-                elif tag_lower == "<p>": self.output_text.insert(tk.END, "\n\n")
-                elif tag_lower == "<hr>": self.output_text.insert(tk.END, "\n" + "—" * 40 + "\n")
-                elif tag_lower == "<li>": self.output_text.insert(tk.END, "\n • ")
-                
-                # --- TABLE Tags ---
-                elif tag_lower.startswith("<table"):
-                    self.in_table = True
-                    self.output_text.insert(tk.END, "\n")
-                    table_start_index = self.output_text.index(tk.END + "-1c")
-                    self.output_text.insert(tk.END, " " * 80 + "\n") 
-                    
-                elif tag_lower.startswith("<tr"):
-                    if self.in_table:
-                        if table_start_index != self.output_text.index(tk.END + "-1c"):
-                             self.output_text.insert(tk.END, "\n")
-                             
-                elif token.lower().startswith("<td") or token.lower().startswith("<th"):
-                    is_header = token.lower().startswith("<th")
-                    if self.in_table:
-                        colspan_match = re.search(r'colspan\s*=\s*["\']?(\d+)["\']?', token, re.IGNORECASE)
-                        colspan_value = int(colspan_match.group(1)) if colspan_match else 1
-                        
-                        current_line_start = self.output_text.index("insert linestart")
-                        current_pos = self.output_text.index("insert")
-                        
-                        if current_pos != current_line_start:
-                             self.output_text.insert(tk.END, " | ")
-
-                        if colspan_value > 1:
-                            self.output_text.insert(tk.END, " " * 5 * (colspan_value - 1))
-                            
-                        if is_header: active_tags.add("bold")
-                        self.cell_content_start_index = self.output_text.index(tk.END)
-                        
-                elif tag_lower == "</td>" or tag_lower == "</th>": 
-                    if self.in_table and self.cell_content_start_index:
-                        self.output_text.tag_add("td_cell", self.cell_content_start_index, self.output_text.index(tk.END))
-                        if tag_lower == "</th>": active_tags.discard("bold")
-                        self.cell_content_start_index = None 
-                        
-                elif tag_lower == "</tr>":
-                    if self.in_table:
-                        self.output_text.insert(tk.END, " \n") 
-                        
-                elif tag_lower == "</table>":
-                    if self.in_table:
-                        self.in_table = False
-                        if table_start_index:
-                            self.output_text.tag_add("table_border", table_start_index, self.output_text.index(tk.END))
-                        self.output_text.insert(tk.END, "\n")
-                        table_start_index = None
-                        
-                # --- Text Formatting Tags ---
-                elif tag_lower.startswith("</"): 
-                    tag_name = tag_lower[2:-1]
-                    if tag_name in ["b", "i", "u", "h1", "h2", "h3", "red", "blue"]:
-                        full_tag_map = {"b": "bold", "i": "italic", "u": "underline", 
-                                        "red": "red", "blue": "blue"}
-                        full_tag_name = full_tag_map.get(tag_name, tag_name)
-                        active_tags.discard(full_tag_name)
-                        if full_tag_name.startswith("h"): self.output_text.insert(tk.END, "\n")
-
-                elif tag_lower.startswith("<"): 
-                    tag_name = tag_lower[1:-1]
-                    if tag_name == "b": active_tags.add("bold")
-                    elif tag_name == "i": active_tags.add("italic")
-                    elif tag_name == "u": active_tags.add("underline")
-                    elif tag_name == "h1": active_tags.add("h1"); self.output_text.insert(tk.END, "\n")
-                    elif tag_name == "h2": active_tags.add("h2"); self.output_text.insert(tk.END, "\n")
-                    elif tag_name == "h3": active_tags.add("h3"); self.output_text.insert(tk.END, "\n")
-                    elif tag_name == "red": active_tags.add("red")
-                    elif tag_name == "blue": active_tags.add("blue")
-                
-            else:
-                self.output_text.insert(tk.END, token, tuple(active_tags))
-        
-        self.output_text.insert(tk.END, "\n")
+        """Adds one result to the Simple Output pane."""
+        self.output.append([text_content])
 
     def clear_output(self):
-        self.output_text.delete("1.0", tk.END)
+        self.output.clear()
+        self.search_index = -1
+        self.search_label.config(text="")
+
+    # --- Output Search, Copy and Save ---
+    # These work on the result store, so they cover every result, not just
+    # the ones currently rendered in the pane.
+    def find_next(self, event=None):
+        query = self.search_entry.get().lower()
+        if not query:
+            return
+        if self.search_index < 0:
+            start = self.output.top_result()
+        else:
+            start = self.search_index + 1
+        index = self.output.store.find(lambda result: query in strip_tags(result).lower(), start)
+        self.search_index = index
+        self.output_text.tag_remove("search_hit", "1.0", tk.END)
+        if index < 0:
+            self.search_label.config(text="Not found")
+            return
+        self.search_label.config(text=f"Result {index + 1} of {len(self.output.store)}")
+        self.output.scroll_to(index)
+
+        # Highlight the matches within that result
+        position, end = self.output.result_range(index)
+        while True:
+            position = self.output_text.search(query, position, stopindex=end, nocase=True)
+            if not position:
+                break
+            match_end = f"{position} + {len(query)}c"
+            self.output_text.tag_add("search_hit", position, match_end)
+            position = match_end
+
+    def copy_output(self):
+        """Copies every result, as the pane shows it, to the clipboard."""
+        separator = SEPARATOR_TEXT + "\n"
+        self.root.clipboard_clear()
+        self.root.clipboard_append(separator.join(plain_text(result) for result in self.output.store))
+
+    def save_output(self):
+        file_path = filedialog.asksaveasfilename(defaultextension=".txt", filetypes=[("Text Files", "*.txt"), ("HTML Files", "*.html"), ("JSON Lines", "*.jsonl")])
+        if file_path:
+            extension = os.path.splitext(file_path)[1].lower()
+            sink_class = SINKS.get({".html": "html", ".htm": "html", ".jsonl": "jsonl"}.get(extension, "text"))
+            try:
+                with open(file_path, "w", encoding="utf-8") as f:
+                    stream_results(self.output.store, sink_class(f))
+            except Exception as e:
+                messagebox.showerror("Error", f"Could not save output: {e}")
 
 if __name__ == "__main__":
     script_dir = os.path.dirname(os.path.abspath(__file__))
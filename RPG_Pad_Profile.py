@@ -0,0 +1,208 @@
+import os
+import re
+import sys
+import time
+
+# --- RPG Pad Pro generation profiler ---
+# Shows where generation time goes: rolls per table, time per kind of tag,
+# how deep the resolver recurses and how often the rescanning resolver
+# rescans its text. It hooks in with sys.setprofile() only while a
+# GenerationProfiler is active, so generation runs exactly as fast as
+# before when profiling is off. The hook watches calls by function name, so
+# the ruleset files need no changes; a ruleset with different function names
+# simply shows less detail.
+#
+#   with GenerationProfiler() as profiler:
+#       for result in engine.generate(tables, start_table, 100): ...
+#   print(profiler.format())
+#   profiler.write_collapsed(open("profile.folded", "w"))   # for flamegraph.pl / speedscope
+
+# Ruleset functions timed as one kind of tag each (time spent in nested
+# calls of other kinds is counted there instead)
+TAG_FUNCTIONS = {
+    'roll_dice_expression': "dice",
+    'roll_range': "dice",
+    '_resolve_dice': "dice",
+    'evaluate_arithmetic': "arithmetic",
+    '_resolve_arithmetic': "arithmetic",
+    'evaluate_math_function': "arithmetic",
+    'substitute_variables': "variables",
+    'substitute_variables_stepwise': "variables",
+    'run_logic_loop': "if/while",
+    'evaluate_custom_condition': "if/while",
+    'resolve_table_call': "table call",
+    'pick_inline_option': "inline pick",
+    'math_evaluator': "math scan",
+}
+# Time not inside any of the above (template walking, rescanning, joining)
+RESOLVER_CATEGORY = "resolver"
+GENERATION_FUNCTION = 'generate_raw_one'
+DEPTH_FUNCTION = 'resolve_table_tags'
+RESCAN_CALLER = 'resolve_table_tags_legacy'
+
+CALL_MODIFIERS_PATTERN = re.compile(r'\s+>>.*$')
+CALL_COUNT_PATTERN = re.compile(r"^(\d+)\s+(.*)")
+
+def table_call_target(content):
+    """Returns (table name, roll count) for the inside of a [@...] or [!...] tag."""
+    content = CALL_MODIFIERS_PATTERN.sub("", content.strip())
+    match = CALL_COUNT_PATTERN.match(content)
+    if match:
+        return match.group(2).strip(), int(match.group(1))
+    return content, 1
+
+class GenerationProfiler:
+    """
+    Collects profile data for every generation run in this thread while it
+    is active. Use as a context manager around the generation calls.
+    """
+    def __init__(self):
+        self.table_rolls = {}
+        self.category_seconds = {}
+        self.category_calls = {}
+        self.depth_counts = {}
+        self.rescans = []          # rescanning resolver passes, one entry per generation
+        self.stacks = {}           # collapsed stack -> self time in seconds
+        self.generations = 0
+        self.seconds = 0.0
+        # Per code object: the frame name and category, or None to ignore it
+        self.roles = {}
+        self.stack = []
+        self.current_rescans = 0
+        self.previous_profile = None
+        self.started = None
+
+    def __enter__(self):
+        self.previous_profile = sys.getprofile()
+        self.started = time.perf_counter()
+        sys.setprofile(self._profile)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        sys.setprofile(self.previous_profile)
+        self.seconds += time.perf_counter() - self.started
+        self.stack = []
+        return False
+
+    def _role(self, code):
+        name = code.co_name
+        if name in TAG_FUNCTIONS:
+            role = ("tag", TAG_FUNCTIONS[name])
+        elif name == DEPTH_FUNCTION:
+            role = ("depth", None)
+        elif name == GENERATION_FUNCTION:
+            role = ("generation", RESOLVER_CATEGORY)
+        else:
+            role = None
+        self.roles[code] = role
+        return role
+
+    def _profile(self, frame, event, arg):
+        if event == 'call':
+            code = frame.f_code
+            role = self.roles.get(code, False)
+            if role is False:
+                role = self._role(code)
+            if role is None:
+                return
+            kind, category = role
+            if kind == "depth":
+                depth = frame.f_locals.get('recursion_depth', 0)
+                self.depth_counts[depth] = self.depth_counts.get(depth, 0) + 1
+                return
+            self._enter(frame, kind, category)
+        elif event == 'return':
+            stack = self.stack
+            if stack and stack[-1][0] is frame:
+                self._leave(stack.pop())
+
+    def _enter(self, frame, kind, category):
+        if kind == "generation":
+            self.generations += 1
+            self.current_rescans = 0
+            label = "generate"
+            table_name = frame.f_locals.get('start_table')
+            if table_name is not None:
+                self._count_rolls(table_name, 1)
+        elif category == "table call":
+            locals_ = frame.f_locals
+            table_name, count = table_call_target(str(locals_.get('content', '')))
+            self._count_rolls(table_name, count)
+            label = f"{locals_.get('operator', '@')}{table_name}"
+        else:
+            label = frame.f_code.co_name
+            if category == "math scan":
+                caller = frame.f_back
+                if caller is not None and caller.f_code.co_name == RESCAN_CALLER:
+                    self.current_rescans += 1
+        path = (self.stack[-1][1] + ";" + label) if self.stack else label
+        # [frame, stack path, category, start time, time in tracked children]
+        self.stack.append([frame, path, category, kind, time.perf_counter(), 0.0])
+
+    def _leave(self, entry):
+        frame, path, category, kind, start, child_seconds = entry
+        elapsed = time.perf_counter() - start
+        own = elapsed - child_seconds
+        self.category_seconds[category] = self.category_seconds.get(category, 0.0) + own
+        self.category_calls[category] = self.category_calls.get(category, 0) + 1
+        self.stacks[path] = self.stacks.get(path, 0.0) + own
+        if self.stack:
+            self.stack[-1][5] += elapsed
+        if kind == "generation":
+            self.rescans.append(self.current_rescans)
+
+    def _count_rolls(self, table_name, count):
+        self.table_rolls[table_name] = self.table_rolls.get(table_name, 0) + count
+
+    def write_collapsed(self, stream):
+        """
+        Writes the call stacks in the collapsed format read by flamegraph.pl,
+        speedscope and similar tools: one 'frame;frame;frame count' line per
+        stack, counted in microseconds of self time.
+        """
+        for path, seconds in sorted(self.stacks.items()):
+            microseconds = int(round(seconds * 1000000))
+            if microseconds > 0:
+                stream.write(f"{path} {microseconds}\n")
+
+    def format(self, limit=30):
+        """The profile as readable text."""
+        lines = [f"Profiled {self.generations} generations in {self.seconds:.3f} s (times include profiling overhead)"]
+
+        total = sum(self.category_seconds.values())
+        if total:
+            lines.append("")
+            lines.append("Time by tag type (not counting nested tags of other types):")
+            for category, seconds in sorted(self.category_seconds.items(), key=lambda item: -item[1]):
+                lines.append(f"  {category:<12}{seconds:10.4f} s {seconds / total:7.1%} {self.category_calls[category]:>10} calls")
+
+        if self.table_rolls:
+            lines.append("")
+            lines.append("Rolls per table:")
+            ranked = sorted(self.table_rolls.items(), key=lambda item: -item[1])
+            width = max(len(name) for name, _ in ranked[:limit])
+            for name, rolls in ranked[:limit]:
+                lines.append(f"  {name:<{width}}  {rolls:>10}")
+            if len(ranked) > limit:
+                lines.append(f"  ({len(ranked) - limit} more tables)")
+
+        if self.depth_counts:
+            lines.append("")
+            lines.append("Recursion depth (resolver calls at each depth):")
+            most = max(self.depth_counts.values())
+            for depth in sorted(self.depth_counts):
+                count = self.depth_counts[depth]
+                lines.append(f"  {depth:>4}  {count:>10}  {'#' * max(1, round(count / most * 40))}")
+
+        if self.rescans:
+            lines.append("")
+            lines.append(f"Rescans per generation: {sum(self.rescans) / len(self.rescans):.1f} on average, "
+                         f"{max(self.rescans)} at most (templates the compiled renderer handles need none)")
+        return "\n".join(lines)
+
+def write_collapsed_file(profiler, path):
+    """Writes the profiler's collapsed stacks to path."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        profiler.write_collapsed(f)
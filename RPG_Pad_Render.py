@@ -0,0 +1,276 @@
+import re
+
+# --- RPG Pad Pro Simple Output renderer ---
+# Turns a generated result into a list of (text, tags) runs for the Simple
+# Output pane, entirely in Python. The GUI inserts a whole batch of runs with
+# one multi-argument Text.insert() call, so rendering costs a handful of Tcl
+# round-trips however many tags a result holds. Tables are laid out here too:
+# columns are padded to a common width and drawn in a fixed-width font.
+
+HTML_TOKEN_PATTERN = re.compile(r'(<[^>]+>)')
+COLSPAN_PATTERN = re.compile(r'colspan\s*=\s*["\']?(\d+)["\']?', re.IGNORECASE)
+WHITESPACE_PATTERN = re.compile(r'\s+')
+TAG_NAME_PATTERN = re.compile(r'</?\s*([a-z0-9]*)')
+HTML_TAG_PATTERN = re.compile(r'<[^>]+>')
+
+# Opening tags that switch on a text style, and the Tk tag they use
+STYLE_TAGS = {"b": "bold", "i": "italic", "u": "underline", "h1": "h1", "h2": "h2", "h3": "h3", "red": "red", "blue": "blue"}
+HEADING_TAGS = ("h1", "h2", "h3")
+BLOCK_TAGS = {"<br>": "\n", "<p>": "\n\n", "<hr>": "\n" + "—" * 40 + "\n", "<li>": "\n • "}
+
+SEPARATOR_TEXT = "═" * 40
+CELL_SEPARATOR = " | "
+ROW_RULE = "-+-"
+# Tables wider than this (in characters) are shown one cell after another
+MAX_TABLE_WIDTH = 100
+
+class TableLayout:
+    """
+    Collects the rows and cells of one <table> and lays them out as text.
+    Each cell is a list of lines (line breaks, list items and headings start
+    a new one) and each line a list of runs. Columns are padded to their
+    widest line, so the grid lines up in the fixed-width cell font.
+    """
+    def __init__(self):
+        self.rows = []
+        self.cell = None
+
+    def start_row(self):
+        self.end_cell()
+        self.rows.append([])
+
+    def start_cell(self, colspan, header):
+        self.end_cell()
+        if not self.rows:
+            self.rows.append([])
+        self.cell = {"lines": [[]], "colspan": max(1, colspan), "header": header}
+        self.rows[-1].append(self.cell)
+
+    def end_cell(self):
+        self.cell = None
+
+    def add_text(self, text, tags):
+        if self.cell is None:
+            # Stray text between cells is usually just the script's formatting
+            if not text.strip():
+                return
+            self.start_cell(1, False)
+        self.cell["lines"][-1].append((WHITESPACE_PATTERN.sub(" ", text), tags))
+
+    def break_line(self, count=1):
+        if self.cell is not None:
+            for _ in range(count):
+                self.cell["lines"].append([])
+
+    @staticmethod
+    def _cell_lines(cell):
+        # Trims each line and drops the empty lines at the start and end of the cell
+        lines = []
+        for line in cell["lines"]:
+            runs = [[text, tags] for text, tags in line if text]
+            while runs and not runs[0][0].strip(): runs.pop(0)
+            while runs and not runs[-1][0].strip(): runs.pop()
+            if runs:
+                runs[0][0] = runs[0][0].lstrip()
+                runs[-1][0] = runs[-1][0].rstrip()
+            lines.append([(text, tuple(tags)) for text, tags in runs])
+        while lines and not lines[0]: lines.pop(0)
+        while lines and not lines[-1]: lines.pop()
+        return lines or [[]]
+
+    def column_widths(self, rows):
+        widths = []
+        spanning = []
+        for row in rows:
+            column = 0
+            for span, lines in row:
+                width = max(sum(len(text) for text, _ in line) for line in lines)
+                while len(widths) < column + span:
+                    widths.append(0)
+                if span == 1:
+                    widths[column] = max(widths[column], width)
+                else:
+                    spanning.append((column, span, width))
+                column += span
+        # A spanning cell wider than its columns widens the last of them
+        for column, span, width in spanning:
+            available = sum(widths[column:column + span]) + len(CELL_SEPARATOR) * (span - 1)
+            if width > available:
+                widths[column + span - 1] += width - available
+        return widths
+
+    def runs(self):
+        """Returns the laid out table as (text, tags) runs."""
+        rows = []
+        for row in self.rows:
+            if row:
+                rows.append([(cell["colspan"], self._cell_lines(cell), "th_cell" if cell["header"] else "td_cell")
+                             for cell in row])
+        out = [("\n", ())]
+        if not rows:
+            return out
+        widths = self.column_widths([[(span, lines) for span, lines, _ in row] for row in rows])
+        total_width = sum(widths) + len(CELL_SEPARATOR) * (len(widths) - 1)
+        border = ("table_border",)
+
+        if total_width > MAX_TABLE_WIDTH:
+            # Too wide for a grid: one cell after another, rows ruled off
+            for row_index, row in enumerate(rows):
+                if row_index:
+                    out.append(("-" * 40 + "\n", border))
+                for cell_index, (span, lines, cell_tag) in enumerate(row):
+                    if cell_index:
+                        out.append(("\n", border))
+                    for line in lines:
+                        for text, tags in line:
+                            out.append((text, tags + ("table_border", cell_tag)))
+                        out.append(("\n", border))
+            out.append(("\n", ()))
+            return out
+
+        multi_line = any(len(lines) > 1 for row in rows for _, lines, _ in row)
+        for row_index, row in enumerate(rows):
+            if row_index and multi_line:
+                out.append((ROW_RULE.join("-" * width for width in widths) + "\n", border))
+            for line_index in range(max(len(lines) for _, lines, _ in row)):
+                column = 0
+                for cell_index, (span, lines, cell_tag) in enumerate(row):
+                    if cell_index:
+                        out.append((CELL_SEPARATOR, border))
+                    width = sum(widths[column:column + span]) + len(CELL_SEPARATOR) * (span - 1)
+                    used = 0
+                    if line_index < len(lines):
+                        for text, tags in lines[line_index]:
+                            out.append((text, tags + ("table_border", cell_tag)))
+                            used += len(text)
+                    if used < width:
+                        out.append((" " * (width - used), ("table_border", cell_tag)))
+                    column += span
+                out.append(("\n", border))
+        out.append(("\n", ()))
+        return out
+
+def html_to_runs(text_content):
+    """
+    Renders one result to a list of (text, tags) runs, ending with a newline.
+    Handles the same simple HTML as the old tag-by-tag renderer: b, i, u,
+    h1-h3, red, blue, br, p, hr, li and tables (table, tr, td, th, colspan).
+    """
+    runs = []
+    active_tags = []
+    table = None
+
+    for position, token in enumerate(HTML_TOKEN_PATTERN.split(text_content)):
+        if not token: continue
+
+        # Text between tags
+        if position % 2 == 0:
+            if table is not None:
+                table.add_text(token, tuple(active_tags))
+            else:
+                runs.append((token, tuple(active_tags)))
+            continue
+
+        tag_lower = token.lower()
+        tag_name = TAG_NAME_PATTERN.match(tag_lower).group(1)
+        closing = tag_lower.startswith("</")
+
+        # --- TABLE Tags ---
+        if tag_name == "table" and not closing:
+            if table is None:
+                table = TableLayout()
+        elif table is not None:
+            if tag_name == "tr" and not closing:
+                table.start_row()
+            elif tag_name in ("td", "th") and not closing:
+                colspan_match = COLSPAN_PATTERN.search(token)
+                table.start_cell(int(colspan_match.group(1)) if colspan_match else 1, tag_name == "th")
+            elif tag_name in ("td", "th", "tr"):
+                table.end_cell()
+            elif tag_name == "table":
+                runs.extend(table.runs())
+                table = None
+            elif tag_lower == "<br>":
+                table.break_line()
+            elif tag_lower == "<p>":
+                table.break_line(2)
+            elif tag_lower == "<li>":
+                table.break_line()
+                table.add_text(" • ", ())
+            elif tag_lower == "<hr>":
+                table.break_line()
+                table.add_text("—" * 10, ())
+                table.break_line()
+            else:
+                if tag_name in HEADING_TAGS:
+                    table.break_line()
+                _switch_style(tag_lower, active_tags, None)
+
+        # --- Block and Separator Tags ---
+        elif tag_lower in BLOCK_TAGS:
+            runs.append((BLOCK_TAGS[tag_lower], ()))
+
+        # --- Text Formatting Tags ---
+        else:
+            _switch_style(tag_lower, active_tags, runs)
+
+    # A table left open still gets shown
+    if table is not None:
+        runs.extend(table.runs())
+
+    runs.append(("\n", ()))
+    return merge_runs(runs)
+
+def _switch_style(tag_lower, active_tags, runs):
+    # Headings start and end on their own line (inside a table, runs is None
+    # and the caller breaks the cell's line instead)
+    if tag_lower.startswith("</"):
+        style = STYLE_TAGS.get(tag_lower[2:-1])
+        if style is not None:
+            if style in active_tags:
+                active_tags.remove(style)
+            if style in HEADING_TAGS and runs is not None:
+                runs.append(("\n", ()))
+    else:
+        style = STYLE_TAGS.get(tag_lower[1:-1])
+        if style is not None:
+            if style not in active_tags:
+                active_tags.append(style)
+            if style in HEADING_TAGS and runs is not None:
+                runs.append(("\n", ()))
+
+def merge_runs(runs):
+    """Joins neighbouring runs that carry the same tags."""
+    merged = []
+    pieces = []
+    current_tags = None
+    for text, tags in runs:
+        if not text: continue
+        if tags != current_tags and pieces:
+            merged.append(("".join(pieces), current_tags))
+            pieces = []
+        pieces.append(text)
+        current_tags = tags
+    if pieces:
+        merged.append(("".join(pieces), current_tags))
+    return merged
+
+def separator_runs():
+    """The line drawn between two results."""
+    return [(SEPARATOR_TEXT, ("separator",)), ("\n", ())]
+
+def flatten_runs(runs):
+    """Returns the runs as Text.insert() arguments: text, tags, text, tags, ..."""
+    args = []
+    for text, tags in runs:
+        args.append(text)
+        args.append(tags)
+    return args
+
+def plain_text(text_content):
+    """The text of one result as the Simple Output pane shows it, without styles."""
+    return "".join(text for text, _ in html_to_runs(text_content))
+
+def strip_tags(text_content):
+    """A quick tag strip for searching: the result's text without laying out tables."""
+    return HTML_TAG_PATTERN.sub("", text_content)
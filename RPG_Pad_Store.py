@@ -0,0 +1,185 @@
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+
+# --- RPG Pad Pro result database ---
+# Keeps generated results in a SQLite file so big batches can be kept,
+# queried and exported later. Each run is recorded under the script's hash,
+# the start table, the master seed and its run index (which together
+# reproduce it); the raw and '\a'-resolved text of identical results is
+# stored once. Export a database from the command line, e.g.:
+#   python RPG_Pad_Store.py results.db -f csv -o results.csv
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS texts (
+    id INTEGER PRIMARY KEY,
+    hash BLOB NOT NULL UNIQUE,
+    raw_text TEXT NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS runs (
+    script_hash TEXT NOT NULL,
+    start_table TEXT NOT NULL,
+    seed TEXT NOT NULL,
+    fast_dice INTEGER NOT NULL,
+    run_index INTEGER NOT NULL,
+    text_id INTEGER NOT NULL REFERENCES texts(id),
+    PRIMARY KEY (script_hash, start_table, seed, fast_dice, run_index)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS runs_by_text ON runs(text_id);
+CREATE INDEX IF NOT EXISTS runs_by_table ON runs(start_table);
+"""
+
+EXPORT_COLUMNS = ["script_hash", "start_table", "seed", "fast_dice", "run_index", "raw_text", "text"]
+EXPORT_FORMATS = ("csv", "jsonl")
+
+def script_hash(script):
+    """The hash results are filed under: SHA-256 of the script text."""
+    return hashlib.sha256(script.encode("utf-8")).hexdigest()
+
+def text_hash(raw_text, text):
+    return hashlib.sha256(raw_text.encode("utf-8") + b"\0" + text.encode("utf-8")).digest()
+
+class ResultDatabase:
+    """
+    A SQLite file of generated results. Recording a run again (same script,
+    start table, seed, dice mode and run index) replaces it rather than
+    adding a duplicate, and identical result texts share one row.
+    Use as a context manager to close the connection.
+    """
+    COMMIT_EVERY = 1000
+
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+        # Text ids by hash, so repeated results skip the lookup
+        self.text_ids = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def close(self):
+        self.connection.commit()
+        self.connection.close()
+
+    def _text_id(self, cursor, raw_text, text):
+        key = text_hash(raw_text, text)
+        text_id = self.text_ids.get(key)
+        if text_id is None:
+            cursor.execute("INSERT OR IGNORE INTO texts (hash, raw_text, text) VALUES (?, ?, ?)", (key, raw_text, text))
+            if cursor.rowcount:
+                text_id = cursor.lastrowid
+            else:
+                text_id = cursor.execute("SELECT id FROM texts WHERE hash = ?", (key,)).fetchone()[0]
+            self.text_ids[key] = text_id
+        return text_id
+
+    def record(self, raw_results, script, start_table, seed, resolve_a_an, fast_dice=False, first_index=0):
+        """
+        Stores raw results (e.g. engine.generate_batch(..., raw=True)) as they
+        arrive and yields each one resolved with resolve_a_an, so recording can
+        sit between the engine and an output sink. Commits every COMMIT_EVERY runs.
+        """
+        key = (script_hash(script), start_table, str(seed), int(bool(fast_dice)))
+        cursor = self.connection.cursor()
+        pending = 0
+        try:
+            for run_index, raw_text in enumerate(raw_results, first_index):
+                text = resolve_a_an(raw_text)
+                cursor.execute("INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?, ?)",
+                               key + (run_index, self._text_id(cursor, raw_text, text)))
+                pending += 1
+                if pending >= self.COMMIT_EVERY:
+                    self.connection.commit()
+                    pending = 0
+                yield text
+        finally:
+            self.connection.commit()
+
+    def count(self):
+        """Returns (runs recorded, distinct results)."""
+        runs = self.connection.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+        texts = self.connection.execute("SELECT COUNT(*) FROM texts").fetchone()[0]
+        return runs, texts
+
+    def rows(self, script_hash=None, start_table=None):
+        """Yields export rows (see EXPORT_COLUMNS) in run order, optionally filtered."""
+        query = ("SELECT runs.script_hash, runs.start_table, runs.seed, runs.fast_dice, runs.run_index, "
+                 "texts.raw_text, texts.text FROM runs JOIN texts ON texts.id = runs.text_id")
+        conditions, params = [], []
+        if script_hash is not None:
+            conditions.append("runs.script_hash = ?")
+            params.append(script_hash)
+        if start_table is not None:
+            conditions.append("runs.start_table = ?")
+            params.append(start_table)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY runs.script_hash, runs.start_table, runs.seed, runs.fast_dice, runs.run_index"
+        yield from self.connection.execute(query, params)
+
+    def export(self, stream, fmt="csv", script_hash=None, start_table=None):
+        """Writes the stored runs to an open file as CSV (with a header row) or JSON Lines. Returns the count."""
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format '{fmt}'")
+        count = 0
+        if fmt == "csv":
+            writer = csv.writer(stream)
+            writer.writerow(EXPORT_COLUMNS)
+            for row in self.rows(script_hash, start_table):
+                writer.writerow(row)
+                count += 1
+        else:
+            for row in self.rows(script_hash, start_table):
+                record = dict(zip(EXPORT_COLUMNS, row))
+                record["fast_dice"] = bool(record["fast_dice"])
+                stream.write(json.dumps(record, ensure_ascii=False))
+                stream.write("\n")
+                count += 1
+        return count
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export results recorded with RPG_Pad_CLI.py --db.")
+    parser.add_argument("database", help="Path to the result database.")
+    parser.add_argument("-f", "--format", choices=EXPORT_FORMATS, default="csv", help="Export format (default: %(default)s).")
+    parser.add_argument("-o", "--output", help="Write to this file instead of stdout.")
+    parser.add_argument("-t", "--table", help="Only export runs from this start table.")
+    parser.add_argument("--script-hash", help="Only export runs of the script with this hash.")
+    parser.add_argument("--count", action="store_true", help="Print the number of runs and distinct results and exit.")
+    args = parser.parse_args(argv)
+
+    if not os.path.isfile(args.database):
+        print(f"Database '{args.database}' not found.", file=sys.stderr)
+        return 2
+    try:
+        database = ResultDatabase(args.database)
+    except sqlite3.Error as e:
+        print(f"Could not open database '{args.database}': {e}", file=sys.stderr)
+        return 2
+
+    with database:
+        if args.count:
+            runs, texts = database.count()
+            print(f"{runs} runs, {texts} distinct results")
+            return 0
+        out = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+        try:
+            database.export(out, args.format, args.script_hash, args.table)
+        finally:
+            if out is not sys.stdout:
+                out.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
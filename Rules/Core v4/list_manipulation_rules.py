@@ -2,6 +2,10 @@
 
 import re
 
+TAG_PATTERN = re.compile(r'<[^>]+>')
+ENTITY_PATTERN = re.compile(r'&[^;]+;')
+NUMBER_PREFIX_PATTERN = re.compile(r'^\s*(\d+(\.\d*)?)')
+
 def list_sorter(results_list):
     """
     Sorts a list of generated results using 'natural sorting' logic,
@@ -13,9 +17,9 @@ def list_sorter(results_list):
     def strip_tags(text):
         """Removes all HTML/XML tags (<...>) and HTML entities (&...;) from a string."""
         # Remove HTML tags
-        text = re.sub(r'<[^>]+>', '', text)
+        text = TAG_PATTERN.sub('', text)
         # Remove HTML entities (e.g., &nbsp;)
-        text = re.sub(r'&[^;]+;', '', text)
+        text = ENTITY_PATTERN.sub('', text)
         return text.strip()
 
     def get_sort_key(item):
@@ -26,7 +30,7 @@ def list_sorter(results_list):
         stripped_item = strip_tags(item)
         
         # 2. Match optional leading whitespace, then capture the number
-        match = re.match(r'^\s*(\d+(\.\d*)?)', stripped_item) 
+        match = NUMBER_PREFIX_PATTERN.match(stripped_item) 
         
         if match:
             # Numerical key tuple: (0, numeric_value, original_string)
@@ -1,194 +1,568 @@
 import random
 import re
 import math
+from bisect import bisect
+from functools import lru_cache
+from itertools import accumulate, repeat
 from statistics import mean 
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# --- Single Tag Helpers ---
+# Each of these resolves one already-matched tag. They are shared by the
+# regex passes below and by the compiled template renderer.
+
+def roll_dice_expression(count, sides, operator=None, value_str=None, dice_engine=None):
+    """
+    Rolls one {XdY} tag, with an optional +, -, * or / modifier. The dice are
+    rolled through dice_engine (helpers['dice_engine']) when one is given.
+    """
+    count = int(count)
+    sides = int(sides)
+    
+    if dice_engine is not None:
+        total = dice_engine.roll_sum(count, sides)
+    else:
+        # randrange(sides) is the same draw randint(1, sides) makes, minus the
+        # argument checks, so seeded output is unchanged
+        total = count + sum(map(random.randrange, repeat(sides, count)))
+    
+    if operator and value_str:
+        try:
+            value = int(value_str)
+        except ValueError: return "[Err]"
+        
+        if operator == '+': total += value
+        elif operator == '-': total -= value
+        elif operator == '*': total *= value
+        elif operator == '/': 
+            return f"{(float(total) / value):.2f}" if value != 0 else "[Err: DivByZero]"
+    
+    return str(total)
+
+def roll_range(mn, mx):
+    """Picks a random number for one {Min--Max} tag."""
+    mn = int(mn)
+    mx = int(mx)
+    if mn > mx:
+        mn, mx = mx, mn
+    return str(random.randint(mn, mx))
+
+# --- Arithmetic Compiler ---
+# {...} arithmetic is tokenized and compiled into nested closures by a small
+# recursive-descent parser instead of being handed to eval(). It accepts the
+# same expressions eval() did (numbers, + - * / // **, unary signs and
+# parentheses) with Python's precedence, and uses Python's own operators, so
+# results are unchanged.
+
+ARITHMETIC_TOKEN_PATTERN = re.compile(r"(\d+\.?\d*|\.\d+)|(\*\*|//|[-+*/()])|([ \t\f]+)|([\r\n]+)")
+MAX_POWER_BITS = 1000000
+
+def _checked_pow(base, exponent):
+    # Stops runaway integer powers like 9**9**9 instead of hanging the generator
+    if isinstance(base, int) and isinstance(exponent, int) and exponent > 0 and abs(base) > 1:
+        if exponent * math.log2(abs(base)) > MAX_POWER_BITS:
+            raise OverflowError("power result too large")
+    return base ** exponent
+
+ARITHMETIC_BINARY_OPS = {
+    '+': lambda a, b: a + b,
+    '-': lambda a, b: a - b,
+    '*': lambda a, b: a * b,
+    '/': lambda a, b: a / b,
+    '//': lambda a, b: a // b,
+    '**': _checked_pow,
+}
+
+def tokenize_arithmetic(expression):
+    """
+    Splits an expression into number and operator tokens. Line breaks are only
+    allowed inside parentheses, as in Python. Raises ValueError on anything else.
+    """
+    tokens = []
+    depth = 0
+    pos = 0
+    while pos < len(expression):
+        match = ARITHMETIC_TOKEN_PATTERN.match(expression, pos)
+        if not match:
+            raise ValueError(f"Unexpected character at {pos}")
+        number, op, _, line_break = match.groups()
+        if number is not None:
+            # Python rejects integer literals with leading zeros, such as 07
+            if '.' not in number and number[0] == '0' and number.strip('0'):
+                raise ValueError(f"Leading zeros in {number}")
+            tokens.append(('num', number))
+        elif op is not None:
+            if op == '(': depth += 1
+            elif op == ')': depth -= 1
+            tokens.append(('op', op))
+        elif line_break is not None and depth <= 0:
+            raise ValueError("Line break outside parentheses")
+        pos = match.end()
+    return tokens
+
+class ArithmeticParser:
+    """
+    expr   := term (('+' | '-') term)*
+    term   := factor (('*' | '/' | '//') factor)*
+    factor := ('+' | '-') factor | power
+    power  := atom ['**' factor]
+    atom   := number | '(' expr ')'
+    """
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def take_op(self, *ops):
+        kind, value = self.peek()
+        if kind == 'op' and value in ops:
+            self.pos += 1
+            return value
+        return None
+
+    def parse(self):
+        node = self.parse_expr()
+        if self.pos != len(self.tokens):
+            raise ValueError("Unexpected trailing input")
+        return node
+
+    def parse_binary(self, parse_operand, ops):
+        node = parse_operand()
+        op = self.take_op(*ops)
+        while op:
+            func, left, right = ARITHMETIC_BINARY_OPS[op], node, parse_operand()
+            node = lambda func=func, left=left, right=right: func(left(), right())
+            op = self.take_op(*ops)
+        return node
+
+    def parse_expr(self):
+        return self.parse_binary(self.parse_term, ('+', '-'))
+
+    def parse_term(self):
+        return self.parse_binary(self.parse_factor, ('*', '/', '//'))
+
+    def parse_factor(self):
+        op = self.take_op('+', '-')
+        if op == '-':
+            operand = self.parse_factor()
+            return lambda: -operand()
+        if op == '+':
+            operand = self.parse_factor()
+            return lambda: +operand()
+        return self.parse_power()
+
+    def parse_power(self):
+        base = self.parse_atom()
+        if self.take_op('**'):
+            exponent = self.parse_factor()
+            return lambda: _checked_pow(base(), exponent())
+        return base
+
+    def parse_atom(self):
+        kind, value = self.peek()
+        if kind == 'num':
+            self.pos += 1
+            number = float(value) if '.' in value else int(value)
+            return lambda: number
+        if self.take_op('('):
+            node = self.parse_expr()
+            if not self.take_op(')'):
+                raise ValueError("Missing )")
+            return node
+        raise ValueError("Expected a number or (")
+
+def compile_arithmetic(expression):
+    """Compiles an arithmetic expression into a zero-argument function. Raises ValueError if it is not valid."""
+    return ArithmeticParser(tokenize_arithmetic(expression)).parse()
+
+def format_number(result):
+    """Formats a math result the way every {...} tag prints it: whole numbers without a decimal point."""
+    if result == int(result):
+        return str(int(result))
+    return f"{result:.8f}".rstrip('0').rstrip('.')
+
+# Arithmetic expressions contain only constants, so each distinct expression
+# is compiled and evaluated once and its printed result reused.
+_ARITHMETIC_CACHE = {}
+_ARITHMETIC_CACHE_LIMIT = 50000
+_MISSING = object()
+
+def evaluate_arithmetic(expression):
+    """
+    Evaluates the inside of one {...} arithmetic tag.
+    Returns None when the expression is not plain arithmetic.
+    """
+    expression = expression.strip()
+    
+    result = _ARITHMETIC_CACHE.get(expression, _MISSING)
+    if result is _MISSING:
+        try:
+            result = format_number(compile_arithmetic(expression)())
+        except Exception:
+            result = None
+        if len(_ARITHMETIC_CACHE) >= _ARITHMETIC_CACHE_LIMIT:
+            _ARITHMETIC_CACHE.clear()
+        _ARITHMETIC_CACHE[expression] = result
+    return result
+
+# --- Dice Engine ---
+# By default {XdY} tags roll one die at a time on the random module, which is
+# what seeded runs are reproduced from. A DiceEngine can be set as
+# helpers['dice_engine'] for big dice pools (each set of helpers has its own): it rolls them with NumPy when it is
+# installed, or draws the sum straight from its exact distribution when not.
+# The results follow the same distribution, but come from the engine's own
+# seedable generator, so seeded output differs from the default rolls.
+
+DISTRIBUTION_MIN_COUNT = 32         # fewer dice than this are cheaper to roll one by one
+DISTRIBUTION_MAX_WORK = 2000000     # dice x possible totals; bigger pools are rolled die by die
+NUMPY_CHUNK_DICE = 1 << 22          # dice per NumPy block, to keep memory bounded
+NUMPY_MAX_VALUE = 1 << 62
+
+@lru_cache(maxsize=256)
+def dice_sum_distribution(count, sides):
+    """
+    Exact distribution of the sum of count dice with the given sides, as a
+    list where entry i is the number of ways to roll a total of count + i.
+    """
+    ways = [1]
+    for _ in range(count):
+        # Adding one die: each new entry is a sliding window sum of `sides` old entries
+        prefix = [0, *accumulate(ways)]
+        size = len(ways) + sides - 1
+        ways = [prefix[min(i + 1, len(ways))] - prefix[max(0, i - sides + 1)] for i in range(size)]
+    return ways
+
+@lru_cache(maxsize=256)
+def _cumulative_ways(count, sides):
+    return list(accumulate(dice_sum_distribution(count, sides)))
+
+class DiceEngine:
+    """
+    Rolls dice sums from its own seedable generator. Uses NumPy for batches
+    when it is available (and use_numpy isn't False), and pure Python otherwise.
+    """
+    def __init__(self, seed=None, use_numpy=None):
+        self.use_numpy = numpy is not None if use_numpy is None else (use_numpy and numpy is not None)
+        self.rng = random.Random()
+        self.np_rng = None
+        self.seed(seed)
+
+    def seed(self, seed=None):
+        self.rng.seed(seed)
+        if self.use_numpy:
+            self.np_rng = numpy.random.default_rng(seed)
+
+    def roll_sum(self, count, sides):
+        """Rolls count dice with the given sides and returns the total."""
+        if count < DISTRIBUTION_MIN_COUNT:
+            return count + sum(map(self.rng.randrange, repeat(sides, count)))
+        return self.roll_sums(count, sides, 1)[0]
+
+    def roll_sums(self, count, sides, n):
+        """Returns n independent totals of count dice with the given sides."""
+        if sides < 1 and count > 0:
+            raise ValueError(f"Cannot roll a die with {sides} sides")
+        if count <= 0:
+            return [0] * n
+        if self.use_numpy and count * sides < NUMPY_MAX_VALUE:
+            return self._numpy_sums(count, sides, n)
+        if count >= DISTRIBUTION_MIN_COUNT and count * (count * (sides - 1) + 1) <= DISTRIBUTION_MAX_WORK:
+            cumulative = _cumulative_ways(count, sides)
+            total_ways = cumulative[-1]
+            return [count + bisect(cumulative, self.rng.randrange(total_ways)) for _ in range(n)]
+        randrange = self.rng.randrange
+        return [count + sum(map(randrange, repeat(sides, count))) for _ in range(n)]
+
+    def _numpy_sums(self, count, sides, n):
+        if count > sides:
+            # The number of dice showing each face is multinomial, so the cost
+            # depends on the number of sides rather than the number of dice
+            faces = numpy.arange(1, sides + 1, dtype=numpy.int64)
+            pvals = numpy.full(sides, 1.0 / sides)
+            sums = []
+            rows = max(1, NUMPY_CHUNK_DICE // sides)
+            for start in range(0, n, rows):
+                tallies = self.np_rng.multinomial(count, pvals, size=min(rows, n - start))
+                sums.extend((tallies @ faces).tolist())
+            return sums
+        sums = []
+        rows = max(1, NUMPY_CHUNK_DICE // count)
+        for start in range(0, n, rows):
+            block = self.np_rng.integers(1, sides + 1, size=(min(rows, n - start), count), dtype=numpy.int64)
+            sums.extend(block.sum(axis=1).tolist())
+        return sums
+
 # --- Internal Helper for Dice and Range ---
 
-def _resolve_dice(text):
+# Dice pattern: {XdY[+|-|*|/|Z]}
+DICE_PATTERN = re.compile(r"\{(\d+)d(\d+)(?:([\+\-\*]|\/)\s*(\d+))?\}")
+# Random Range pattern: {Min--Max}
+RANGE_PATTERN = re.compile(r"\{(\d+)--(\d+)\}")
+ARITHMETIC_PATTERN = re.compile(r"\{(.*?)\}")
+
+def _resolve_dice(text, dice_engine=None):
     """
     Handles standard dice ({XdY}) and range ({Min--Max}) expressions.
     """
-    # Dice pattern: {XdY[+|-|*|/|Z]}
-    dice_pattern = r"\{(\d+)d(\d+)(?:([\+\-\*]|\/)\s*(\d+))?\}" 
-    
     def replace_dice_match(match):
-        count = int(match.group(1))
-        sides = int(match.group(2))
-        operator = match.group(3)
-        value_str = match.group(4)
-        
-        total = sum(random.randint(1, sides) for _ in range(count)) 
-        
-        if operator and value_str:
-            try:
-                value = int(value_str)
-            except ValueError: return "[Err]"
-            
-            if operator == '+': total += value
-            elif operator == '-': total -= value
-            elif operator == '*': total *= value
-            elif operator == '/': 
-                return f"{(float(total) / value):.2f}" if value != 0 else "[Err: DivByZero]"
-        
-        return str(total)
+        return roll_dice_expression(*match.groups(), dice_engine)
     
-    text = re.sub(dice_pattern, replace_dice_match, text)
+    text = DICE_PATTERN.sub(replace_dice_match, text)
     
-    # Random Range pattern: {Min--Max}
-    range_pattern = r"\{(\d+)--(\d+)\}"
     def replace_range_match(match):
-        mn = int(match.group(1))
-        mx = int(match.group(2))
-        if mn > mx:
-            mn, mx = mx, mn
-        return str(random.randint(mn, mx))
+        return roll_range(match.group(1), match.group(2))
         
-    text = re.sub(range_pattern, replace_range_match, text)
+    text = RANGE_PATTERN.sub(replace_range_match, text)
     return text
 
 def _resolve_arithmetic(text):
     """
     Resolves general arithmetic expressions.
     """
-    arithmetic_pattern = r"\{(.*?)\}"
-
     def replace_arithmetic_match(match):
-        expression = match.group(1).strip()
-        
-        if re.match(r'^[\d\s\.\+\-\*/\(\)]+$', expression.replace('//', '').replace('--', '')):
-            try:
-                result = eval(expression, {"__builtins__": None}, {})
-                if result == int(result):
-                    return str(int(result))
-                return f"{result:.8f}".rstrip('0').rstrip('.')
-            except Exception:
-                return match.group(0) 
-        return match.group(0)
+        result = evaluate_arithmetic(match.group(1))
+        return match.group(0) if result is None else result
 
-    return re.sub(arithmetic_pattern, replace_arithmetic_match, text)
+    return ARITHMETIC_PATTERN.sub(replace_arithmetic_match, text)
 
 
-def _resolve_simple_math_only(text):
-    text = _resolve_dice(text)
+def resolve_simple_math(text, dice_engine=None):
+    """Resolves dice, ranges and arithmetic, but not variables or functions."""
+    text = _resolve_dice(text, dice_engine)
     text = _resolve_arithmetic(text)
     return text
 
 
 # --- Public Function for Math Evaluation ---
 
-def math_evaluator(text, tables, helpers):
+MATH_FUNCTIONS = ["max", "min", "avg", "sqrt", "abs", "round", "floor", "ceil", "sign"]
+MATH_FUNCTION_PATTERN = re.compile(r"\{(" + "|".join(MATH_FUNCTIONS) + r")\s*\((.*?)\)\}", re.IGNORECASE)
+UNBRACED_FUNCTION_PATTERN = re.compile(r"^(" + "|".join(MATH_FUNCTIONS) + r")\s*\((.*)\)$", re.IGNORECASE)
+
+def evaluate_math_function(func_name, contents, tables, helpers):
     """
-    Evaluates math, dice, and variable assignment/recall.
+    Resolves one {func(...)} tag. The contents are resolved with the full tag
+    resolver first, so they may contain dice, tables and nested functions.
     """
     resolve_tags_func = helpers.get('resolve_table_tags')
-    variables = helpers.get('variables', {})
+    func_name = func_name.lower()
+    contents = contents.strip()
+    
+    resolved_contents = resolve_tags_func(contents, tables, helpers)
+    if resolved_contents.startswith("[Error"): return resolved_contents
 
-    # --- A. Resolve Variable Assignments and Recalls ---
-    while True:
-        found_var_action = False
-
-        # 1. Assignment: {$var = "val"} OR {$var = 'val'}
-        # Regex explanation:
-        # (["\']) matches either " or '
-        # (.*?) matches the content inside
-        # \2 matches whatever quote was captured in group 2 (ensures matching quotes)
-        assign_match = re.search(r'\{\$(\w+)\s*=\s*(["\'])(.*?)\2\}', text)
+    # Recursive check for nested functions
+    while UNBRACED_FUNCTION_PATTERN.match(resolved_contents):
+        rebraced = "{" + resolved_contents + "}"
+        new_res = resolve_tags_func(rebraced, tables, helpers)
+        if new_res.startswith("[Error"): 
+            resolved_contents = new_res
+            break
+        if new_res.startswith('{') and new_res.endswith('}'):
+             new_res = new_res[1:-1]
+        if new_res == resolved_contents: break
+        resolved_contents = new_res
+
+    numbers = []
+    try:
+        if func_name in ["sqrt", "abs", "round", "floor", "ceil", "sign"]:
+            numbers = [float(resolved_contents)]
+        else:
+            numbers = [float(n.strip()) for n in resolved_contents.split(',') if n.strip()]
+    except ValueError:
+        return f"[Math Error: Invalid number in {func_name}: {resolved_contents}]"
+    
+    if not numbers: return f"[Math Error: No numbers for {func_name}]"
+         
+    try:
+        n = numbers[0]
+        if func_name == "max": result = max(numbers)
+        elif func_name == "min": result = min(numbers)
+        elif func_name == "avg": result = sum(numbers) / len(numbers)
+        elif func_name == "sqrt": result = math.sqrt(n)
+        elif func_name == "abs": result = abs(n)
+        elif func_name == "round": result = round(n)
+        elif func_name == "floor": result = math.floor(n)
+        elif func_name == "ceil": result = math.ceil(n)
+        elif func_name == "sign": result = 1 if n > 0 else (-1 if n < 0 else 0)
+        else: return f"[Math Error: Unknown function {func_name}]"
+
+        return format_number(result)
         
+    except Exception as e:
+        return f"[Math Execution Error: {e}]"
+
+# --- Variables ---
+
+# Assignment: {$var = "val"} OR {$var = 'val'}
+# (["\']) matches either " or ', (.*?) the content inside, and \2 whatever
+# quote was captured in group 2 (ensures matching quotes)
+ASSIGNMENT_PATTERN = re.compile(r'\{\$(\w+)\s*=\s*(["\'])(.*?)\2\}')
+# Recall: {$var_name}
+RECALL_PATTERN = re.compile(r'\{\$(\w+)\}')
+
+def _parse_number(text):
+    try:
+        return float(text)
+    except (TypeError, ValueError):
+        return None
+
+class VariableStore(dict):
+    """
+    Script variables by name, each kept as the text it prints as. The number
+    a value reads as is parsed once, when it is set, and kept next to it, so
+    math and the [if]/[while] conditions don't keep re-parsing the same text.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self.numbers = {}        # variable name -> float, or None if not a number
+        self.text_numbers = {}   # value text -> float, for conditions the values were substituted into
+        self.update(*args, **kwargs)
+
+    def __setitem__(self, name, text):
+        super().__setitem__(name, text)
+        number = _parse_number(text)
+        self.numbers[name] = number
+        self.text_numbers[text] = number
+
+    def __delitem__(self, name):
+        super().__delitem__(name)
+        del self.numbers[name]
+
+    def update(self, *args, **kwargs):
+        for name, text in dict(*args, **kwargs).items():
+            self[name] = text
+
+    def setdefault(self, name, default=None):
+        if name not in self:
+            self[name] = default
+        return self[name]
+
+    def number(self, text):
+        """Returns text as a float, or None if it isn't a number."""
+        number = self.text_numbers.get(text, _MISSING)
+        return _parse_number(text) if number is _MISSING else number
+
+    def number_of(self, name):
+        """Returns the named variable as a float, or None if it is unset or not a number."""
+        return self.numbers.get(name) if name in self else None
+
+def get_variable_store(helpers):
+    """Returns helpers['variables'] as a VariableStore, upgrading a plain dict in place."""
+    variables = helpers.get('variables')
+    if not isinstance(variables, VariableStore):
+        variables = VariableStore(variables or {})
+        helpers['variables'] = variables
+    return variables
+
+def _recall_value(variables, var_name):
+    if var_name in variables:
+        return str(variables[var_name])
+    return f"[Error: Variable '{var_name}' not defined]"
+
+def _forms_new_tags(value):
+    # Once substituted, an empty value or one with '{' or '$' in it could join
+    # the text around it into a tag that wasn't there before
+    return not value or '{' in value or '$' in value
+
+def substitute_variables_stepwise(text, variables, dice_engine=None):
+    """
+    Resolves assignments and recalls one at a time, rescanning the text after
+    each: every assignment first (leftmost first), then every recall.
+    """
+    while True:
+        assign_match = ASSIGNMENT_PATTERN.search(text)
         if assign_match:
-            full_tag = assign_match.group(0)
-            var_name = assign_match.group(1)
-            raw_value_exp = assign_match.group(3)
-            
-            resolved_value = _resolve_simple_math_only(raw_value_exp)
-            
-            try:
-                float(resolved_value) 
-                variables[var_name] = resolved_value
-                text = text.replace(full_tag, resolved_value, 1)
-                found_var_action = True
-                continue
-            except ValueError:
-                variables[var_name] = resolved_value
-                text = text.replace(full_tag, resolved_value, 1)
-                found_var_action = True
-                continue
-
-        # 2. Recall: {$var_name}
-        recall_match = re.search(r'\{\$(\w+)\}', text)
+            resolved_value = resolve_simple_math(assign_match.group(3), dice_engine)
+            variables[assign_match.group(1)] = resolved_value
+            text = text.replace(assign_match.group(0), resolved_value, 1)
+            continue
+
+        recall_match = RECALL_PATTERN.search(text)
         if recall_match:
-            full_tag = recall_match.group(0)
-            var_name = recall_match.group(1)
-            
-            if var_name in variables:
-                text = text.replace(full_tag, str(variables[var_name]), 1)
-            else:
-                text = text.replace(full_tag, f"[Error: Variable '{var_name}' not defined]", 1)
-            
-            found_var_action = True
+            text = text.replace(recall_match.group(0), _recall_value(variables, recall_match.group(1)), 1)
             continue
-            
-        if not found_var_action:
-            break
 
-    if not resolve_tags_func:
-        return _resolve_simple_math_only(text)
+        return text
+
+def substitute_variables(text, variables, dice_engine=None):
+    """
+    Resolves every {$var = "value"} and then every {$var} in one left-to-right
+    sweep each, giving the same result as substitute_variables_stepwise.
+    A substituted value that could form a new tag with the text around it
+    hands the rest of the work to the stepwise loop from that point on.
+    """
+    if '{$' not in text:
+        return text
+
+    assignments = list(ASSIGNMENT_PATTERN.finditer(text))
+
+    # Every other '{$' must start a recall, or a later rescan could find an
+    # assignment or recall straddling a substituted value.
+    gaps = []
+    pos = 0
+    for m in assignments:
+        gaps.append((pos, m.start()))
+        pos = m.end()
+    gaps.append((pos, len(text)))
+    for gap_start, gap_end in gaps:
+        stray = text.count('{$', gap_start, gap_end)
+        if stray and stray != len(RECALL_PATTERN.findall(text, gap_start, gap_end)):
+            return substitute_variables_stepwise(text, variables, dice_engine)
+
+    if assignments:
+        pieces = []
+        pos = 0
+        for m in assignments:
+            resolved_value = resolve_simple_math(m.group(3), dice_engine)
+            variables[m.group(1)] = resolved_value
+            pieces.append(text[pos:m.start()])
+            pieces.append(resolved_value)
+            pos = m.end()
+            if _forms_new_tags(resolved_value):
+                pieces.append(text[pos:])
+                return substitute_variables_stepwise("".join(pieces), variables, dice_engine)
+        pieces.append(text[pos:])
+        text = "".join(pieces)
+
+    pieces = []
+    pos = 0
+    for m in RECALL_PATTERN.finditer(text):
+        value = _recall_value(variables, m.group(1))
+        pieces.append(text[pos:m.start()])
+        pieces.append(value)
+        pos = m.end()
+        if _forms_new_tags(value):
+            pieces.append(text[pos:])
+            return substitute_variables_stepwise("".join(pieces), variables, dice_engine)
+    pieces.append(text[pos:])
+    return "".join(pieces)
 
-    FUNCTIONS = ["max", "min", "avg", "sqrt", "abs", "round", "floor", "ceil", "sign"]
-    math_pattern = r"\{(" + "|".join(FUNCTIONS) + r")\s*\((.*?)\)\}"
+def math_evaluator(text, tables, helpers):
+    """
+    Evaluates math, dice, and variable assignment/recall.
+    """
+    resolve_tags_func = helpers.get('resolve_table_tags')
+    variables = get_variable_store(helpers)
+    dice_engine = helpers.get('dice_engine')
+
+    # --- A. Resolve Variable Assignments and Recalls ---
+    text = substitute_variables(text, variables, dice_engine)
+
+    if not resolve_tags_func:
+        return resolve_simple_math(text, dice_engine)
 
     def replace_math_match(match):
-        func_name = match.group(1).lower()
-        contents = match.group(2).strip()
-        
-        resolved_contents = resolve_tags_func(contents, tables, helpers)
-        if resolved_contents.startswith("[Error"): return resolved_contents
-
-        # Recursive check for nested functions
-        unbraced_pattern = r"^(" + "|".join(FUNCTIONS) + r")\s*\((.*)\)$"
-        while re.match(unbraced_pattern, resolved_contents, re.IGNORECASE):
-            rebraced = "{" + resolved_contents + "}"
-            new_res = resolve_tags_func(rebraced, tables, helpers)
-            if new_res.startswith("[Error"): 
-                resolved_contents = new_res
-                break
-            if new_res.startswith('{') and new_res.endswith('}'):
-                 new_res = new_res[1:-1]
-            if new_res == resolved_contents: break
-            resolved_contents = new_res
+        return evaluate_math_function(match.group(1), match.group(2), tables, helpers)
 
-        numbers = []
-        try:
-            if func_name in ["sqrt", "abs", "round", "floor", "ceil", "sign"]:
-                numbers = [float(resolved_contents)]
-            else:
-                numbers = [float(n.strip()) for n in resolved_contents.split(',') if n.strip()]
-        except ValueError:
-            return f"[Math Error: Invalid number in {func_name}: {resolved_contents}]"
-        
-        if not numbers: return f"[Math Error: No numbers for {func_name}]"
-             
-        try:
-            n = numbers[0]
-            if func_name == "max": result = max(numbers)
-            elif func_name == "min": result = min(numbers)
-            elif func_name == "avg": result = sum(numbers) / len(numbers)
-            elif func_name == "sqrt": result = math.sqrt(n)
-            elif func_name == "abs": result = abs(n)
-            elif func_name == "round": result = round(n)
-            elif func_name == "floor": result = math.floor(n)
-            elif func_name == "ceil": result = math.ceil(n)
-            elif func_name == "sign": result = 1 if n > 0 else (-1 if n < 0 else 0)
-            else: return f"[Math Error: Unknown function {func_name}]"
-
-            if result == int(result): return str(int(result))
-            return f"{result:.8f}".rstrip('0').rstrip('.')
-            
-        except Exception as e:
-            return f"[Math Execution Error: {e}]"
-
-    while re.search(math_pattern, text, re.IGNORECASE):
-        text = re.sub(math_pattern, replace_math_match, text, flags=re.IGNORECASE)
+    while MATH_FUNCTION_PATTERN.search(text):
+        text = MATH_FUNCTION_PATTERN.sub(replace_math_match, text)
         
-    text = _resolve_simple_math_only(text)
+    text = resolve_simple_math(text, dice_engine)
     return text
\ No newline at end of file
@@ -0,0 +1,663 @@
+import re
+
+# --- TABLE ANALYSIS ---
+# Looks at a parsed script without running it. Builds the call graph between
+# tables from their [@...] and [!...] tags and, from the entry weights, the
+# expected number of rolls and output length for each start table, so a
+# script that will recurse forever or be slow can be spotted before a batch
+# is run.
+#
+# The estimates are exact for plain weighted tables, picks and dice counts.
+# Where the outcome depends on run-time state they are approximate: each
+# [if] branch is taken half the time, a [while] body is counted once, and a
+# table name built from variables or tags can't be followed at all.
+#
+# For scripts without run-time state (no variables, logic or decks) the
+# exact probability of every possible output can be worked out too: table
+# rolls by their weights, in-line picks evenly and dice by convolution.
+
+# --- 1. Tag Patterns ---
+# Imported from the rescanning resolver's files, so the analysis reads tags
+# exactly the way generation does.
+
+from math_rules import ASSIGNMENT_PATTERN, RECALL_PATTERN, DICE_PATTERN, RANGE_PATTERN, UNBRACED_FUNCTION_PATTERN
+from table_parsing_rules import (TABLE_CALL_PATTERN, WHILE_PATTERN, WHILENOT_PATTERN, IF_PATTERN, IFNOT_PATTERN,
+                                 IMPLODE_MODIFIER_PATTERN, SORT_MODIFIER_PATTERN, CASE_MODIFIER_PATTERN, MULTI_ROLL_PATTERN)
+
+TAG_START_PATTERN = re.compile(r"[\[{]")
+# A table call whose count is rolled: [@{1d4} Table] or [@{2--5} Table]
+DICE_COUNT_PATTERN = re.compile(rf"^(?P<count>{DICE_PATTERN.pattern}|{RANGE_PATTERN.pattern})\s+(?P<name>.*)")
+DYNAMIC_NAME = re.compile(r"[{}\[\]$|]")
+
+# What a call to a table that doesn't exist turns into
+MISSING_TABLE_LENGTH = len("[Error: Table '' not found]")
+
+# --- 2. Entry Estimates ---
+
+class EntryEstimate:
+    """Expected direct table calls, literal output length and caveats for one piece of entry text."""
+    __slots__ = ("calls", "length", "dynamic", "notes")
+
+    def __init__(self):
+        self.calls = {}        # table name -> expected number of rolls on it
+        self.length = 0.0      # expected characters not produced by table calls
+        self.dynamic = []      # call contents whose table can't be known in advance
+        self.notes = set()
+
+def expected_number(tag):
+    """The mean of a {XdY}, {XdY+N} or {A--B} tag."""
+    match = DICE_PATTERN.fullmatch(tag)
+    if match:
+        count, sides, operator, value = match.groups()
+        mean = int(count) * (int(sides) + 1) / 2
+        if operator == '+': mean += int(value)
+        elif operator == '-': mean -= int(value)
+        elif operator == '*': mean *= int(value)
+        elif operator == '/' and int(value): mean /= int(value)
+        return mean
+    match = RANGE_PATTERN.fullmatch(tag)
+    if match:
+        return (int(match.group(1)) + int(match.group(2))) / 2
+    return None
+
+def _number_length(value):
+    if value is None:
+        return 1
+    return len(str(int(round(value)))) if float(value).is_integer() or abs(value) >= 10 else len(f"{value:.2f}")
+
+def _matching_brace(text, start):
+    # Index just past the '}' that closes the '{' at start, or -1
+    depth = 0
+    for i in range(start, len(text)):
+        if text[i] == '{': depth += 1
+        elif text[i] == '}':
+            depth -= 1
+            if depth == 0: return i + 1
+    return -1
+
+def split_inline_pick(text, start):
+    """
+    Splits the [|A|B|] pick opening at start into its options, treating
+    nested picks as part of their option. Returns (options, end) or (None, -1).
+    Like find_inline_pick_close, a '||' pair never closes a pick, so '[|a||]'
+    is not one.
+    """
+    options = []
+    depth = 0
+    option_start = i = start + 2
+    while i < len(text):
+        if text.startswith('[|', i):
+            depth += 1; i += 2
+        elif text.startswith('||', i):
+            if depth == 0:
+                options.append(text[option_start:i])
+                options.append("")
+                option_start = i + 2
+            i += 2
+        elif text.startswith('|]', i):
+            if depth == 0:
+                options.append(text[option_start:i])
+                return options, i + 2
+            depth -= 1; i += 2
+        elif text[i] == '|' and depth == 0:
+            options.append(text[option_start:i])
+            option_start = i = i + 1
+        else:
+            i += 1
+    return None, -1
+
+def _add_call(operator, content, weight, estimate):
+    content = content.strip()
+    separator = ", "
+    while True:
+        match = IMPLODE_MODIFIER_PATTERN.search(content)
+        if match:
+            separator = match.group(1); content = content[:match.start()].strip(); continue
+        match = SORT_MODIFIER_PATTERN.search(content) or CASE_MODIFIER_PATTERN.search(content)
+        if match:
+            content = content[:match.start()].strip(); continue
+        break
+
+    count = 1.0
+    match = MULTI_ROLL_PATTERN.match(content)
+    if match:
+        count = float(match.group(1)); content = match.group(2).strip()
+    else:
+        match = DICE_COUNT_PATTERN.match(content)
+        if match:
+            count = expected_number(match.group('count')); content = match.group('name').strip()
+
+    if not content or DYNAMIC_NAME.search(content):
+        estimate.dynamic.append(f"[{operator}{content}]")
+        return
+    estimate.calls[content] = estimate.calls.get(content, 0.0) + weight * count
+    if count > 1:
+        estimate.length += weight * (count - 1) * len(separator)
+
+def estimate_text(text, weight=1.0, estimate=None):
+    """Adds the expected calls and length of text (reached with probability weight) to an EntryEstimate."""
+    if estimate is None:
+        estimate = EntryEstimate()
+    i = 0
+    end = len(text)
+    while i < end:
+        match = TAG_START_PATTERN.search(text, i)
+        if match is None:
+            estimate.length += weight * (end - i)
+            break
+        estimate.length += weight * (match.start() - i)
+        i = match.start()
+
+        if text.startswith('[|', i):
+            options, close = split_inline_pick(text, i)
+            if options is not None:
+                for option in options:
+                    estimate_text(option, weight / len(options), estimate)
+                i = close
+                continue
+        elif text[i] == '[':
+            match = IF_PATTERN.match(text, i) or IFNOT_PATTERN.match(text, i)
+            if match:
+                estimate.notes.add("if")
+                estimate_text(match.group(2), weight / 2, estimate)
+                estimate_text(match.group(3), weight / 2, estimate)
+                i = match.end()
+                continue
+            match = WHILE_PATTERN.match(text, i) or WHILENOT_PATTERN.match(text, i)
+            if match:
+                estimate.notes.add("while")
+                estimate_text(match.group(2), weight, estimate)
+                i = match.end()
+                continue
+            match = TABLE_CALL_PATTERN.match(text, i)
+            if match:
+                _add_call(match.group(1), match.group(2), weight, estimate)
+                i = match.end()
+                continue
+        else:
+            match = ASSIGNMENT_PATTERN.match(text, i)
+            if match:
+                i = match.end()
+                continue
+            match = RECALL_PATTERN.match(text, i)
+            if match:
+                estimate.notes.add("variables")
+                estimate.length += weight
+                i = match.end()
+                continue
+            close = _matching_brace(text, i)
+            if close != -1:
+                estimate.length += weight * _number_length(expected_number(text[i:close]))
+                i = close
+                continue
+
+        # A lone bracket or brace is plain text
+        estimate.length += weight
+        i += 1
+    return estimate
+
+def estimate_table(table):
+    """Combines the estimates of a table's entries, weighted by their chance of being rolled."""
+    estimate = EntryEstimate()
+    total = getattr(table, 'total', None)
+    if total is None:
+        total = sum(entry['weight'] for entry in table if entry['text'] != "__RESET__")
+    if total <= 0:
+        estimate.length = len("[Error: Table is empty]")
+        return estimate
+    for entry in table:
+        if entry['text'] == "__RESET__" or entry['weight'] <= 0:
+            continue
+        estimate_text(entry['text'], entry['weight'] / total, estimate)
+    return estimate
+
+# --- 3. Graph Analysis ---
+
+def strongly_connected_tables(graph):
+    """
+    Tarjan's algorithm, without recursion. Returns the strongly connected
+    components of {table: callees}, callees before callers.
+    """
+    index_of = {}
+    low = {}
+    stack = []
+    on_stack = set()
+    components = []
+    counter = 0
+    for root in graph:
+        if root in index_of:
+            continue
+        work = [(root, iter(graph[root]))]
+        index_of[root] = low[root] = counter; counter += 1
+        stack.append(root); on_stack.add(root)
+        while work:
+            node, children = work[-1]
+            advanced = False
+            for child in children:
+                if child not in graph:
+                    continue
+                if child not in index_of:
+                    index_of[child] = low[child] = counter; counter += 1
+                    stack.append(child); on_stack.add(child)
+                    work.append((child, iter(graph[child])))
+                    advanced = True
+                    break
+                if child in on_stack:
+                    low[node] = min(low[node], index_of[child])
+            if advanced:
+                continue
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[node])
+            if low[node] == index_of[node]:
+                component = []
+                while True:
+                    member = stack.pop(); on_stack.discard(member)
+                    component.append(member)
+                    if member == node: break
+                components.append(component)
+    return components
+
+def _solve(matrix, vector):
+    # Gaussian elimination with partial pivoting; None if the system is singular
+    size = len(vector)
+    rows = [row[:] + [value] for row, value in zip(matrix, vector)]
+    for column in range(size):
+        pivot = max(range(column, size), key=lambda r: abs(rows[r][column]))
+        if abs(rows[pivot][column]) < 1e-12:
+            return None
+        rows[column], rows[pivot] = rows[pivot], rows[column]
+        for r in range(size):
+            if r != column and rows[r][column]:
+                factor = rows[r][column] / rows[column][column]
+                for c in range(column, size + 1):
+                    rows[r][c] -= factor * rows[column][c]
+    return [rows[r][size] / rows[r][r] for r in range(size)]
+
+def expected_totals(components, calls, base):
+    """
+    Solves total(T) = base(T) + sum of calls[T][U] * total(U) for every table,
+    one strongly connected component at a time. Tables whose expansion never
+    ends on average (or that call such a table) get float('inf').
+    """
+    totals = {}
+    for component in components:
+        members = {name: position for position, name in enumerate(component)}
+        matrix = [[0.0] * len(component) for _ in component]
+        vector = []
+        unbounded = False
+        for position, name in enumerate(component):
+            matrix[position][position] = 1.0
+            value = base[name]
+            for callee, count in calls[name].items():
+                if callee in members:
+                    matrix[position][members[callee]] -= count
+                elif callee in totals:
+                    value += count * totals[callee]
+            vector.append(value)
+            if value == float('inf'):
+                unbounded = True
+        solution = None if unbounded else _solve(matrix, vector)
+        # A positive solution exists only when the component's expected growth is below one
+        if solution is None or any(not value > 0 for value in solution):
+            solution = [float('inf')] * len(component)
+        for name, value in zip(component, solution):
+            totals[name] = value
+    return totals
+
+# --- 4. Report ---
+
+class TableAnalysis:
+    """The call graph of a parsed script and what it says about each start table."""
+    def __init__(self, tables, start_table):
+        self.start_table = start_table
+        self.estimates = {name: estimate_table(table) for name, table in tables.items()}
+        self.calls = {name: estimate.calls for name, estimate in self.estimates.items()}
+        graph = {name: [callee for callee in calls if callee in tables] for name, calls in self.calls.items()}
+
+        self.undefined = {}
+        for name, calls in self.calls.items():
+            for callee in calls:
+                if callee not in tables:
+                    self.undefined.setdefault(callee, []).append(name)
+
+        self.dynamic = {name: estimate.dynamic for name, estimate in self.estimates.items() if estimate.dynamic}
+        self.notes = set().union(*(estimate.notes for estimate in self.estimates.values())) if tables else set()
+
+        components = strongly_connected_tables(graph)
+        self.cycles = [sorted(component) for component in components
+                       if len(component) > 1 or component[0] in graph[component[0]]]
+
+        self.reachable = set()
+        if start_table in graph:
+            pending = [start_table]
+            while pending:
+                name = pending.pop()
+                if name not in self.reachable:
+                    self.reachable.add(name)
+                    pending.extend(graph[name])
+        self.unreachable = [name for name in tables if name not in self.reachable]
+
+        # Calls to missing tables roll nothing but print an error message
+        base_rolls = {name: 1.0 for name in tables}
+        base_length = {name: estimate.length + sum(count * MISSING_TABLE_LENGTH for callee, count in estimate.calls.items()
+                                                   if callee not in tables)
+                       for name, estimate in self.estimates.items()}
+        internal_calls = {name: {callee: count for callee, count in calls.items() if callee in tables}
+                          for name, calls in self.calls.items()}
+        self.expected_rolls = expected_totals(components, internal_calls, base_rolls)
+        self.expected_length = expected_totals(components, internal_calls, base_length)
+
+    def unbounded_cycles(self):
+        return [cycle for cycle in self.cycles if self.expected_rolls[cycle[0]] == float('inf')]
+
+    def sub_rolls(self, table_name):
+        """Expected rolls on other tables (and repeat rolls) per roll of table_name."""
+        return self.expected_rolls[table_name] - 1
+
+    def format(self):
+        """The analysis as readable text."""
+        lines = []
+        if self.start_table is not None:
+            lines.append(f"Start table: {self.start_table}")
+        lines.append(f"Tables: {len(self.estimates)}")
+
+        if self.undefined:
+            lines.append("")
+            lines.append("Undefined tables:")
+            for name, callers in self.undefined.items():
+                lines.append(f"  {name}  (called from {', '.join(callers)})")
+        if self.cycles:
+            lines.append("")
+            lines.append("Cycles:")
+            for cycle in self.cycles:
+                path = f"{cycle[0]} -> {cycle[0]}" if len(cycle) == 1 else ", ".join(cycle) + " (call each other)"
+                if self.expected_rolls[cycle[0]] == float('inf'):
+                    lines.append(f"  {path}  UNBOUNDED: runs through it will hit the recursion limit")
+                else:
+                    lines.append(f"  {path}  (ends on average)")
+        if self.start_table is not None and self.unreachable:
+            lines.append("")
+            lines.append(f"Unreachable from '{self.start_table}':")
+            lines.append("  " + ", ".join(self.unreachable))
+        if self.dynamic:
+            lines.append("")
+            lines.append("Table calls that can't be followed (name built at run time):")
+            for name, contents in self.dynamic.items():
+                lines.append(f"  {name}: {' '.join(contents)}")
+
+        lines.append("")
+        lines.append("Expected per roll of each start table:")
+        width = max((len(name) for name in self.estimates), default=0)
+        for name in self.estimates:
+            rolls = self.expected_rolls[name]
+            if rolls == float('inf'):
+                lines.append(f"  {name.ljust(width)}  unbounded")
+            else:
+                lines.append(f"  {name.ljust(width)}  {rolls - 1:10.1f} sub-rolls  {self.expected_length[name]:10.0f} chars")
+
+        caveats = []
+        if "if" in self.notes: caveats.append("each [if] branch is counted as taken half the time")
+        if "while" in self.notes: caveats.append("[while] bodies are counted once")
+        if "variables" in self.notes: caveats.append("variables are counted as one character")
+        if caveats:
+            lines.append("")
+            lines.append("Estimates are approximate: " + "; ".join(caveats) + ".")
+        return "\n".join(lines)
+
+def analyze_tables(tables, start_table=None):
+    """Returns a TableAnalysis of parsed tables. start_table defaults to the first table."""
+    if start_table is None or start_table not in tables:
+        start_table = next(iter(tables), None)
+    return TableAnalysis(tables, start_table)
+
+# --- 5. Output Distributions ---
+# A distribution is a dict of {output text: probability}. Parts of a text are
+# rolled independently, so the distribution of the whole is the product of
+# the parts' distributions. Anything whose outcome depends on more than its
+# own roll raises DistributionUnavailable, and the caller can fall back to
+# sampling.
+
+DEFAULT_MAX_OUTCOMES = 100000
+# Building the sum distribution of XdY takes about X * X * Y steps
+MAX_DICE_WORK = 20000000
+# Output that could join up with the text around it into a new tag
+TAG_CHARACTERS = re.compile(r"[\[\]{}|]")
+ARITHMETIC_TAG_PATTERN = re.compile(r"\{([^{}$\[\]|]*)\}")
+KEYWORD_TAG_PATTERN = re.compile(r"\[(?:if|ifnot|while|whilenot)\b", re.IGNORECASE)
+
+class DistributionUnavailable(ValueError):
+    """Raised when the exact output distribution can't be worked out."""
+
+class DistributionBuilder:
+    """Works out exact output distributions for the tables of one script."""
+    def __init__(self, tables, helpers, max_outcomes=DEFAULT_MAX_OUTCOMES):
+        self.tables = tables
+        self.helpers = helpers
+        self.max_outcomes = max_outcomes
+        self.table_distributions = {}
+        self.in_progress = set()
+        registry_func = helpers.get('get_tag_registry')
+        self.registry = registry_func(helpers) if registry_func else None
+
+    def _check_size(self, distribution):
+        if len(distribution) > self.max_outcomes:
+            raise DistributionUnavailable(f"more than {self.max_outcomes} possible outputs")
+        return distribution
+
+    def combine(self, first, second):
+        """The distribution of first's output followed by second's."""
+        if len(first) * len(second) > self.max_outcomes * 4:
+            raise DistributionUnavailable(f"more than {self.max_outcomes} possible outputs")
+        combined = {}
+        for text, probability in first.items():
+            for other, other_probability in second.items():
+                key = text + other
+                combined[key] = combined.get(key, 0.0) + probability * other_probability
+        return self._check_size(combined)
+
+    def mix(self, weighted):
+        """The distribution of picking one of [(weight, distribution), ...]."""
+        mixed = {}
+        for weight, distribution in weighted:
+            for text, probability in distribution.items():
+                mixed[text] = mixed.get(text, 0.0) + weight * probability
+        return self._check_size(mixed)
+
+    def table(self, name):
+        distribution = self.table_distributions.get(name)
+        if distribution is not None:
+            return distribution
+        if name not in self.tables:
+            raise DistributionUnavailable(f"table '{name}' is not defined")
+        if name in self.in_progress:
+            raise DistributionUnavailable(f"table '{name}' calls itself")
+        table = self.tables[name]
+        total = getattr(table, 'total', None)
+        entries = [entry for entry in table if entry['text'] != "__RESET__" and entry['weight'] > 0]
+        if total is None:
+            total = sum(entry['weight'] for entry in entries)
+        if not entries or total <= 0:
+            raise DistributionUnavailable(f"table '{name}' has nothing to roll")
+
+        self.in_progress.add(name)
+        try:
+            distribution = self.mix([(entry['weight'] / total, self.text(entry['text'])) for entry in entries])
+        finally:
+            self.in_progress.discard(name)
+        self.table_distributions[name] = distribution
+        return distribution
+
+    def text(self, text):
+        """The distribution of one piece of template text."""
+        if self.registry is not None and self.registry.has_custom_tags(text):
+            raise DistributionUnavailable("the script uses custom tags")
+        distribution = {"": 1.0}
+        literal_start = i = 0
+        end = len(text)
+        while i < end:
+            match = TAG_START_PATTERN.search(text, i)
+            if match is None:
+                break
+            i = match.start()
+            part, next_i = self.tag(text, i)
+            if part is None:
+                i += 1
+                continue
+            if literal_start < i:
+                distribution = {key + text[literal_start:i]: p for key, p in distribution.items()}
+            distribution = self.combine(distribution, part)
+            literal_start = i = next_i
+        if literal_start < end:
+            distribution = {key + text[literal_start:]: p for key, p in distribution.items()}
+        return distribution
+
+    def tag(self, text, i):
+        """Returns (distribution, end) for the tag at i, or (None, i) for a plain '[' or '{'."""
+        if text[i] == '{':
+            if text.startswith('{$', i):
+                raise DistributionUnavailable("the script uses variables")
+            match = DICE_PATTERN.match(text, i)
+            if match:
+                return self.dice(*match.groups()), match.end()
+            match = RANGE_PATTERN.match(text, i)
+            if match:
+                low, high = sorted((int(match.group(1)), int(match.group(2))))
+                return {str(value): 1.0 / (high - low + 1) for value in range(low, high + 1)}, match.end()
+            match = ARITHMETIC_TAG_PATTERN.match(text, i)
+            if match:
+                # Constant math, which comes out the same every time
+                function = UNBRACED_FUNCTION_PATTERN.fullmatch(match.group(1))
+                if function:
+                    evaluate = self.helpers.get('evaluate_math_function')
+                    if evaluate is None:
+                        raise DistributionUnavailable("this ruleset has no math functions")
+                    return {evaluate(function.group(1), function.group(2), self.tables, self.helpers): 1.0}, match.end()
+                evaluate = self.helpers.get('evaluate_arithmetic')
+                result = evaluate(match.group(1)) if evaluate else None
+                # Text that isn't arithmetic is left as it is
+                return {match.group(0) if result is None else result: 1.0}, match.end()
+            raise DistributionUnavailable("the script uses math on rolled values")
+
+        if text.startswith('[|', i):
+            options, close = split_inline_pick(text, i)
+            if options is None:
+                return None, i
+            # An empty option leaves a '||' behind, which can hide the '|]'
+            # closing this pick (or the one around it) from the resolver
+            if '||' in text[i:close]:
+                raise DistributionUnavailable("an in-line pick has an empty option")
+            parts = [self.text(option) for option in options]
+            for part in parts:
+                if any(TAG_CHARACTERS.search(key) for key in part):
+                    raise DistributionUnavailable("an in-line pick option can produce tag characters")
+                if "" in part:
+                    raise DistributionUnavailable("an in-line pick option can come out empty")
+            return self.mix([(1.0 / len(parts), part) for part in parts]), close
+        if KEYWORD_TAG_PATTERN.match(text, i):
+            raise DistributionUnavailable("the script uses [if] or [while] logic")
+        match = TABLE_CALL_PATTERN.match(text, i)
+        if match:
+            if match.group(1) == '!':
+                raise DistributionUnavailable("the script uses [!Deck] picks")
+            return self.call(match.group(2)), match.end()
+        return None, i
+
+    def dice(self, count, sides, operator, value_str):
+        count, sides = int(count), int(sides)
+        if sides < 1 and count > 0:
+            raise DistributionUnavailable("the script rolls a die with no sides")
+        if count * (sides - 1) + 1 > self.max_outcomes:
+            raise DistributionUnavailable(f"more than {self.max_outcomes} possible outputs")
+        if count * count * sides > MAX_DICE_WORK:
+            raise DistributionUnavailable(f"{{{count}d{sides}}} has too many dice to work out exactly")
+        dice_sum_distribution = self.helpers.get('dice_sum_distribution')
+        if dice_sum_distribution is None:
+            raise DistributionUnavailable("this ruleset has no dice distribution")
+        ways = dice_sum_distribution(count, sides) if count else [1]
+        # Whole numbers, so the division stays exact however many dice there are
+        total_ways = sides ** count
+        distribution = {}
+        for offset, way_count in enumerate(ways):
+            total = count + offset
+            # Printed the way roll_dice_expression prints it
+            if operator and value_str:
+                value = int(value_str)
+                if operator == '+': total += value
+                elif operator == '-': total -= value
+                elif operator == '*': total *= value
+                elif operator == '/':
+                    printed = f"{(float(total) / value):.2f}" if value != 0 else "[Err: DivByZero]"
+                    distribution[printed] = distribution.get(printed, 0.0) + way_count / total_ways
+                    continue
+            printed = str(total)
+            distribution[printed] = distribution.get(printed, 0.0) + way_count / total_ways
+        return distribution
+
+    def call(self, content):
+        """The distribution of one [@...] tag, with its count and modifiers."""
+        content = content.strip()
+        case_modifier = None; separator = ", "; sort_flag = False
+        while True:
+            match = IMPLODE_MODIFIER_PATTERN.search(content)
+            if match:
+                separator = match.group(1); content = content[:match.start()].strip(); continue
+            match = SORT_MODIFIER_PATTERN.search(content)
+            if match:
+                sort_flag = True; content = content[:match.start()].strip(); continue
+            match = CASE_MODIFIER_PATTERN.search(content)
+            if match:
+                case_modifier = match.group(1).lower(); content = content[:match.start()].strip(); continue
+            break
+        if '{' in content or '[' in content:
+            raise DistributionUnavailable("a table call's name or count is rolled")
+        count = 1
+        match = MULTI_ROLL_PATTERN.match(content)
+        if match:
+            count = int(match.group(1)); content = match.group(2).strip()
+
+        single = self.table(content)
+        if any(TAG_CHARACTERS.search(key) for key in single):
+            raise DistributionUnavailable(f"table '{content}' can produce tag characters")
+
+        if sort_flag:
+            # Sorting only cares which results came up, so combine them as sorted lists
+            lists = {(): 1.0}
+            for _ in range(count):
+                grown = {}
+                for results, probability in lists.items():
+                    for text, text_probability in single.items():
+                        key = tuple(sorted(results + (text,)))
+                        grown[key] = grown.get(key, 0.0) + probability * text_probability
+                lists = self._check_size(grown)
+            list_sorter = self.helpers.get('list_sorter')
+            distribution = {}
+            for results, probability in lists.items():
+                key = separator.join(list_sorter(list(results)))
+                distribution[key] = distribution.get(key, 0.0) + probability
+        elif count == 0:
+            distribution = {"": 1.0}
+        else:
+            distribution = single
+            joined = {separator + text: p for text, p in single.items()}
+            for _ in range(count - 1):
+                distribution = self.combine(distribution, joined)
+
+        if case_modifier:
+            case_converter = self.helpers.get('case_converter')
+            converted = {}
+            for text, probability in distribution.items():
+                key = case_converter(text, case_modifier)
+                converted[key] = converted.get(key, 0.0) + probability
+            distribution = converted
+        return distribution
+
+def exact_output_distribution(tables, start_table, helpers, max_outcomes=DEFAULT_MAX_OUTCOMES):
+    """
+    Returns {output text: probability} for one roll of start_table, before
+    '\\a' is resolved. Raises DistributionUnavailable (a ValueError) if the
+    script uses something whose outcome can't be worked out exactly, or if
+    there are more than max_outcomes possible outputs.
+    """
+    return DistributionBuilder(tables, helpers, max_outcomes).table(start_table)
@@ -1,54 +1,188 @@
 import random
 import re
+from bisect import bisect
+from itertools import accumulate
 
 # --- 1. CORE ENGINE: Table Definition Parsing ---
 
-def parse_tables(script_content):
-    """Parses the script content to extract tables."""
-    tables = {}
-    current_table_name = None
-    lines = script_content.splitlines()
+class CompiledTable(list):
+    """
+    The entries of one table, with the Reset: marker already stripped out and
+    a cumulative-weight sampler built once, so a roll is one random() call
+    and a bisect instead of rebuilding the weight lists every time.
+    The draw is the same one random.choices makes, so seeds stay compatible.
+    """
+    def __init__(self, entries, reset=False):
+        super().__init__(entries)
+        self.reset = reset
+        self.texts = [e['text'] for e in entries]
+        weights = [e['weight'] for e in entries]
+        self.cum_weights = list(accumulate(weights))
+        self.total = self.cum_weights[-1] + 0.0 if entries else 0.0
+        self.uniform = all(w == 1 for w in weights)
+        self.deck_layout = None
+        # {entry text: resolved text} for entries with nothing to roll; filled
+        # in by the template compiler's fold_table_entries() on first use
+        self.static_texts = None
+
+    def roll(self):
+        """Returns the text of one weighted pick. The table must have a positive total weight."""
+        if self.uniform:
+            return self.texts[int(random.random() * self.total)]
+        return self.texts[bisect(self.cum_weights, random.random() * self.total, 0, len(self.texts) - 1)]
+
+class Deck:
+    """
+    Draw-without-replacement state for one [!Table]. Keeps the remaining copies
+    of each entry in a Fenwick tree, so a draw is O(log n) with no list copying
+    and a reset just restores the starting counts.
+
+    Draws match the old expanded-list deck (random.choice followed by
+    list.remove), so seeds stay compatible.
+    """
+    def __init__(self, table):
+        if table.deck_layout is None:
+            table.deck_layout = Deck._build_layout(table)
+        self.table = table
+        self.reset()
+
+    @staticmethod
+    def _build_layout(table):
+        weights = [e['weight'] for e in table]
+        size = len(weights)
+        tree = [0] + weights
+        for i in range(1, size + 1):
+            parent = i + (i & -i)
+            if parent <= size: tree[parent] += tree[i]
+        top_bit = 1 << (size.bit_length() - 1) if size else 0
+
+        # list.remove() takes the first copy of a text, which may belong to an
+        # earlier entry with the same text. Only those entries need a group.
+        first_seen = {}
+        for index, text in enumerate(table.texts):
+            first_seen.setdefault(text, []).append(index)
+        duplicates = [None] * size
+        for group in first_seen.values():
+            if len(group) > 1:
+                for index in group: duplicates[index] = group
+        return weights, tree, sum(weights), top_bit, duplicates
+
+    def reset(self):
+        """Puts every card back."""
+        weights, tree, total, self.top_bit, self.duplicates = self.table.deck_layout
+        self.counts = list(weights)
+        self.tree = list(tree)
+        self.remaining = total
+
+    def draw(self):
+        """Removes and returns the text of one card. The deck must not be empty."""
+        # Same draw as random.choice() on the expanded deck
+        index = random.randrange(self.remaining)
+
+        # Find the entry whose block of copies holds that index
+        tree = self.tree; size = len(self.counts)
+        entry = 0; step = self.top_bit
+        while step:
+            candidate = entry + step
+            if candidate <= size and tree[candidate] <= index:
+                entry = candidate
+                index -= tree[candidate]
+            step >>= 1
+        text = self.table.texts[entry]
+
+        group = self.duplicates[entry]
+        if group:
+            entry = next(i for i in group if self.counts[i] > 0)
+        self.counts[entry] -= 1
+        self.remaining -= 1
+        i = entry + 1
+        while i <= size:
+            tree[i] -= 1
+            i += i & -i
+        return text
+
+def compile_table(entries):
+    """Builds a CompiledTable from a list of entry dicts (may hold a __RESET__ marker)."""
+    if isinstance(entries, CompiledTable):
+        return entries
+    valid_entries = [e for e in entries if e['text'] != "__RESET__"]
+    return CompiledTable(valid_entries, reset=len(valid_entries) != len(entries))
+
+# Compiled tables are never modified after parsing, so a section whose text
+# hasn't changed reuses its table from the last parse.
+_SECTION_CACHE = {}
+_SECTION_CACHE_LIMIT = 5000
+
+def split_table_sections(script_content):
+    """
+    Splits the script into (table name, entry lines) pairs in script order.
+    Lines are stripped, blank lines dropped, and anything before the first
+    Table: header (or under a header with no name) is ignored.
+    """
+    sections = []
+    current_lines = None
     
-    for line in lines:
+    for line in script_content.splitlines():
         line = line.strip()
         if not line: continue
         
         if line.lower().startswith("table:"):
-            parts = line.split(":", 1)
-            if len(parts) > 1:
-                current_table_name = parts[1].strip()
-                tables[current_table_name] = []
+            table_name = line.split(":", 1)[1].strip()
+            current_lines = [] if table_name else None
+            sections.append((table_name, current_lines if table_name else []))
             continue
             
-        if current_table_name:
-            # --- CHECK FOR RESET COMMAND ---
-            # If "Reset:" is found, we add a special marker.
-            # This tells the deck logic to reshuffle this table every time it is called.
-            if line.lower() == "reset:":
-                tables[current_table_name].append({"text": "__RESET__", "weight": 0})
-                continue
-            # -------------------------------
+        if current_lines is not None:
+            current_lines.append(line)
+    return sections
 
-            weight = 1
-            text_content = line
-            
-            if ":" in line:
-                parts = line.split(":", 1)
-                potential_weight = parts[0].strip()
-                if potential_weight.isdigit():
-                    weight = int(potential_weight)
-                    text_content = parts[1].strip()
-                    
-            tables[current_table_name].append({"text": text_content, "weight": weight})
-            
+def parse_table_section(lines):
+    """Parses the entry lines of one table into a CompiledTable."""
+    entries = []
+    for line in lines:
+        # --- CHECK FOR RESET COMMAND ---
+        # If "Reset:" is found, we add a special marker.
+        # This tells the deck logic to reshuffle this table every time it is called.
+        if line.lower() == "reset:":
+            entries.append({"text": "__RESET__", "weight": 0})
+            continue
+        # -------------------------------
+
+        weight = 1
+        text_content = line
+        
+        if ":" in line:
+            parts = line.split(":", 1)
+            potential_weight = parts[0].strip()
+            if potential_weight.isdigit():
+                weight = int(potential_weight)
+                text_content = parts[1].strip()
+                
+        entries.append({"text": text_content, "weight": weight})
+    return compile_table(entries)
+
+def parse_tables(script_content):
+    """Parses the script content to extract tables. Only edited sections are re-parsed."""
+    tables = {}
+    for table_name, lines in split_table_sections(script_content):
+        key = "\n".join(lines)
+        table = _SECTION_CACHE.get(key)
+        if table is None:
+            table = parse_table_section(lines)
+            if len(_SECTION_CACHE) >= _SECTION_CACHE_LIMIT:
+                _SECTION_CACHE.clear()
+            _SECTION_CACHE[key] = table
+        # A repeated table name replaces the earlier table but keeps its position
+        tables[table_name] = table
     return tables
 
 # --- 2. CORE ENGINE: Logic Helper ---
 
-def evaluate_custom_condition(condition_str):
+def evaluate_custom_condition(condition_str, variables=None):
     """
     Evaluates comparison logic for [if], [ifnot], [while], [whilenot].
     Supported: > (GT), < (LT), = (EQ), =/= (NEQ)
+    When given the script's variable store, numbers are parsed through its cache.
     """
     if "=/=" in condition_str:
         parts = condition_str.split("=/=")
@@ -71,8 +205,13 @@ def evaluate_custom_condition(condition_str):
     val2_raw = parts[1].strip()
 
     try:
-        v1 = float(val1_raw)
-        v2 = float(val2_raw)
+        if variables is not None and hasattr(variables, 'number'):
+            v1 = variables.number(val1_raw)
+            v2 = variables.number(val2_raw)
+            if v1 is None or v2 is None: raise ValueError
+        else:
+            v1 = float(val1_raw)
+            v2 = float(val2_raw)
         if op == "==": return v1 == v2
         if op == "!=": return v1 != v2
         if op == ">": return v1 > v2
@@ -91,37 +230,374 @@ def roll_on_table(table_name, tables):
     """Rolls a single time on the specified table."""
     if table_name not in tables: 
         return f"[Error: Table '{table_name}' not found]"
-    entries = tables[table_name]
-    if not entries: 
-        return "[Error: Table is empty]"
-    
-    # --- FILTER RESET MARKER ---
-    # Ensure standard rolls don't accidentally pick the invisible Reset marker
-    valid_entries = [e for e in entries if e['text'] != "__RESET__"]
+    table = compile_table(tables[table_name])
+    if not table: 
+        return "[Error: Table has no valid entries]" if table.reset else "[Error: Table is empty]"
+    if table.total <= 0:
+        return "[Error: Table weights invalid]"
+    return table.roll()
+
+# --- 4. CORE ENGINE: Shared Tag Actions ---
+# These are used by both the rescanning resolver below and the compiled
+# template renderer (template_compiler_rules.py), so both paths roll tables,
+# run loops and pick options in exactly the same way.
+
+IMPLODE_MODIFIER_PATTERN = re.compile(r'\s+>>\s+implode\s+"(.*?)"$', re.IGNORECASE)
+SORT_MODIFIER_PATTERN = re.compile(r'\s+>>\s+sort$', re.IGNORECASE)
+CASE_MODIFIER_PATTERN = re.compile(r'\s+>>\s+(lower|upper|proper)$', re.IGNORECASE)
+MULTI_ROLL_PATTERN = re.compile(r"^(\d+)\s+(.*)")
+
+def resolve_table_call(operator, content, tables, helpers, recursion_depth=0):
+    """
+    Resolves the inside of a [@Table] or [!Table] tag (modifiers, count and
+    table name) and returns the final replacement text.
+    """
+    content = content.strip()
+
+    # Modifier Parsing
+    case_modifier = None; separator = ", "; sort_flag = False; implode_applied = False
+    while True:
+        found_modifier = False
+        implode_match = IMPLODE_MODIFIER_PATTERN.search(content)
+        if implode_match and not implode_applied: 
+            separator = implode_match.group(1); content = content[:implode_match.start()].strip()
+            implode_applied = True; found_modifier = True; continue
+        sort_match = SORT_MODIFIER_PATTERN.search(content)
+        if sort_match and not sort_flag: 
+            sort_flag = True; content = content[:sort_match.start()].strip()
+            found_modifier = True; continue
+        case_match = CASE_MODIFIER_PATTERN.search(content)
+        if case_match and case_modifier is None: 
+            case_modifier = case_match.group(1).lower(); content = content[:case_match.start()].strip()
+            found_modifier = True; continue
+        if not found_modifier: break
+
+    # Multi-roll parsing
+    count = 1  # Default to 1 (Handles [!Table] case automatically)
+    table_ref = content
+    match_multi_num = MULTI_ROLL_PATTERN.match(content)
+    if match_multi_num:
+        count = int(match_multi_num.group(1))
+        table_ref = match_multi_num.group(2).strip()
+
+    if table_ref not in tables:
+        return f"[Error: Table '{table_ref}' not found]"
+
+    table = compile_table(tables[table_ref])
+    results = []
+
+    # Entries with nothing to roll resolve to the same text every time
+    static_texts = table.static_texts
+    if static_texts is None:
+        fold_entries_func = helpers.get('fold_table_entries')
+        static_texts = fold_entries_func(table, helpers) if fold_entries_func else {}
+        table.static_texts = static_texts
+    if recursion_depth >= 500:
+        static_texts = {}  # let resolve_table_tags report the depth error
+
+    # --- DECK LOGIC (Operator !) ---
+    if operator == '!':
+        # Create the deck if missing, or reshuffle it if the Reset flag is present (auto-reshuffle on call)
+        deck = helpers['deck_state'].get(table_ref)
+        if deck is None:
+            deck = helpers['deck_state'][table_ref] = Deck(table)
+        elif table.reset:
+            deck.reset()
+        
+        for _ in range(count):
+            if not deck.remaining:
+                results.append("[Error: Deck depleted]")
+                break
+            
+            # Draw and remove
+            pick = deck.draw()
+            
+            static = static_texts.get(pick)
+            results.append(static if static is not None else resolve_table_tags(pick, tables, helpers, recursion_depth + 1))
+
+    # --- STANDARD LOGIC (Operator @) ---
+    elif table and table.total > 0:
+        roll = table.roll
+        for _ in range(count):
+            pick = roll()
+            static = static_texts.get(pick)
+            results.append(static if static is not None else resolve_table_tags(pick, tables, helpers, recursion_depth + 1))
+    else:
+        for _ in range(count):
+            raw_res = roll_on_table(table_ref, tables)
+            results.append(resolve_table_tags(raw_res, tables, helpers, recursion_depth + 1))
     
-    if not valid_entries:
-        return "[Error: Table has no valid entries]"
+    # Looked up only when used, so a lazily loaded ruleset doesn't load them for nothing
+    if sort_flag: results = helpers.get('list_sorter')(results)
+    final_result = separator.join(results)
+    if case_modifier: final_result = helpers.get('case_converter')(final_result, case_modifier)
+    return final_result
 
-    population = [e['text'] for e in valid_entries]
-    weights = [e['weight'] for e in valid_entries]
+def run_logic_loop(negate, raw_condition, loop_content_template, tables, helpers, recursion_depth=0):
+    """
+    Runs a [while] loop (or a [whilenot] loop when negate is True) and returns
+    the joined output of every pass.
+    """
+    math_evaluator_func = helpers.get('math_evaluator')
+    accumulated_output = []
+    loop_safety = 0
+    MAX_LOOPS = 20 
     
-    try:
-        return random.choices(population, weights=weights, k=1)[0]
-    except IndexError:
-        return "[Error: Table weights invalid]"
+    while True:
+        current_condition_str = math_evaluator_func(raw_condition, tables, helpers)
+        if evaluate_custom_condition(current_condition_str, helpers.get('variables')) == negate: break 
+        step_output = resolve_table_tags(loop_content_template, tables, helpers, recursion_depth + 1)
+        accumulated_output.append(step_output)
+        loop_safety += 1
+        if loop_safety >= MAX_LOOPS:
+            accumulated_output.append(f" [Error: Loop limit ({MAX_LOOPS}) exceeded] ")
+            break
+    return "".join(accumulated_output)
+
+def find_inline_pick_close(text, start):
+    """
+    Scans forward from just after a '[|' and returns the index of the matching
+    '|]', or -1 if the pick is never closed. '||' pairs are skipped.
+    """
+    open_count = 1; i = start
+    while i < len(text):
+        if text[i:i+2] == '[|': open_count += 1; i += 2
+        elif text[i:i+2] == '||': i += 2
+        elif text[i:i+2] == '|]':
+            open_count -= 1
+            if open_count == 0: return i
+            i += 2
+        else: i += 1
+    return -1
+
+def pick_inline_option(content):
+    """Picks one option from the inside of an in-line [|A|B|] pick."""
+    options = content.split('|')
+    return random.choice(options) if options else ""
+
+# --- 5. CORE ENGINE: Tag Registry ---
+# The action tags the rescanning resolver knows, each with its pattern and
+# handler. After the math pass the resolver applies the single highest
+# priority tag found in the text, then rescans. A quick search for each tag's
+# opening text tells it which kinds are present at all, so only those
+# patterns get searched.
+#
+# Custom rulesets can add tags without touching the resolver: any ruleset
+# function named register_<something>_tags(registry) is called with the
+# registry when it is first built, e.g.
+#
+#     def register_shout_tags(registry):
+#         registry.register("shout", r'\[shout\s+"([^"]*)"\]',
+#                           lambda match, tables, helpers, depth: match.group(1).upper() + "!",
+#                           priority=45, openers=["[shout"], ignore_case=True)
+
+class TagType:
+    """One registered tag kind. find(text) locates it; apply(...) returns the new text."""
+    __slots__ = ("name", "priority", "openers", "ignore_case", "find", "apply", "core")
+
+    def __init__(self, name, priority, openers, ignore_case, find, apply, core):
+        self.name = name
+        self.priority = priority
+        self.openers = openers
+        self.ignore_case = ignore_case
+        self.find = find
+        self.apply = apply
+        self.core = core
+
+class TagRegistry:
+    """Action tags in priority order (lowest first), plus a quick check for their openers."""
+    def __init__(self):
+        self.tags = []
+        self.opener_checks = []
+        self.always_search = set()
+        self.custom_scanner = None
+        self.custom_always = False
+        self.all_core = True
+
+    def register(self, name, pattern, handler, priority=45, openers=None, ignore_case=False, core=False):
+        """
+        Registers a regex tag. handler(match, tables, helpers, recursion_depth)
+        returns the text that replaces the first occurrence of the matched tag.
+        openers lists the literal text every match starts with; without it the
+        pattern is searched on every pass.
+        """
+        if isinstance(pattern, str):
+            pattern = re.compile(pattern, re.IGNORECASE if ignore_case else 0)
+
+        def apply(text, match, tables, helpers, recursion_depth):
+            return text.replace(match.group(0), handler(match, tables, helpers, recursion_depth), 1)
+
+        self.register_action(name, pattern.search, apply, priority, openers, ignore_case, core)
+
+    def register_action(self, name, find, apply, priority=45, openers=None, ignore_case=False, core=False):
+        """
+        Registers a tag with its own finder. find(text) returns None, or whatever
+        apply(text, found, tables, helpers, recursion_depth) needs to build the new text.
+        A name that is already registered is replaced.
+        """
+        self.tags = [tag for tag in self.tags if tag.name != name]
+        self.tags.append(TagType(name, priority, tuple(openers or ()), ignore_case, find, apply, core))
+        self.tags.sort(key=lambda tag: tag.priority)
+        self._build_scanners()
 
-# --- 4. CORE ENGINE: Central Recursive Tag Resolver ---
+    def _build_scanners(self):
+        # One check per distinct opener, each stopping at its first occurrence:
+        # a plain substring test, or a regex search when case is ignored
+        names_by_opener = {}
+        for tag in self.tags:
+            for opener in tag.openers:
+                names_by_opener.setdefault((opener, tag.ignore_case), set()).add(tag.name)
+        self.opener_checks = []
+        for (opener, ignore_case), names in sorted(names_by_opener.items()):
+            search = re.compile(_opener_pattern(opener, True)).search if ignore_case else None
+            self.opener_checks.append((opener, search, frozenset(names)))
+        self.always_search = {tag.name for tag in self.tags if not tag.openers}
+
+        custom = [tag for tag in self.tags if not tag.core]
+        self.all_core = not custom
+        self.custom_always = any(not tag.openers for tag in custom)
+        custom_openers = [_opener_pattern(opener, tag.ignore_case) for tag in custom for opener in tag.openers]
+        self.custom_scanner = re.compile("|".join(custom_openers)) if custom_openers else None
+
+    def present(self, text):
+        """Returns the names of the tag kinds whose openers appear in text."""
+        found = set(self.always_search)
+        for opener, search, names in self.opener_checks:
+            if names <= found:
+                continue
+            if (opener in text) if search is None else (search(text) is not None):
+                found.update(names)
+        return found
+
+    def find_action(self, text):
+        """Returns (tag, found) for the highest priority tag in text, or None."""
+        present = self.present(text)
+        if not present:
+            return None
+        for tag in self.tags:
+            if tag.name in present:
+                found = tag.find(text)
+                if found is not None:
+                    return tag, found
+        return None
+
+    def has_custom_tags(self, text):
+        """True if text may contain a tag registered by a custom ruleset."""
+        if self.custom_always:
+            return True
+        return self.custom_scanner is not None and self.custom_scanner.search(text) is not None
+
+def _opener_pattern(opener, ignore_case):
+    escaped = re.escape(opener)
+    return f"(?i:{escaped})" if ignore_case else escaped
+
+# --- Core Tags ---
+
+WHILE_PATTERN = re.compile(r'\[while\s+"([^"]*)"\s*,\s*"([^"]*)"\]', re.IGNORECASE)
+WHILENOT_PATTERN = re.compile(r'\[whilenot\s+"([^"]*)"\s*,\s*"([^"]*)"\]', re.IGNORECASE)
+IF_PATTERN = re.compile(r'\[if\s+"([^"]*)"\s*,\s*"([^"]*)"\s*,\s*"([^"]*)"\]', re.IGNORECASE)
+IFNOT_PATTERN = re.compile(r'\[ifnot\s+"([^"]*)"\s*,\s*"([^"]*)"\s*,\s*"([^"]*)"\]', re.IGNORECASE)
+# Matches [@Table], [!Table], [@5 Table], [!5 Table]
+TABLE_CALL_PATTERN = re.compile(r"\[([@!])(.*?)\]")
+
+def _while_handler(negate):
+    # [while "condition", "loop_content"] / [whilenot "condition", "loop_content"]
+    def handler(match, tables, helpers, recursion_depth):
+        return run_logic_loop(negate, match.group(1), match.group(2), tables, helpers, recursion_depth)
+    return handler
+
+def _if_handler(negate):
+    # [if "condition", "then", "else"] / [ifnot "condition", "then", "else"]
+    def handler(match, tables, helpers, recursion_depth):
+        if bool(evaluate_custom_condition(match.group(1), helpers.get('variables'))) != negate:
+            return match.group(2)
+        return match.group(3)
+    return handler
+
+def _table_call_handler(match, tables, helpers, recursion_depth):
+    operator = match.group(1)  # '@' (Standard) or '!' (Deck)
+    return resolve_table_call(operator, match.group(2), tables, helpers, recursion_depth)
+
+def _find_inline_pick(text):
+    # [|A|B|]: the last one opened is resolved first
+    if "|]" not in text:
+        return None
+    last_open = text.rfind('[|')
+    first_close = find_inline_pick_close(text, last_open + 2)
+    return (last_open, first_close) if first_close != -1 else None
+
+def _apply_inline_pick(text, found, tables, helpers, recursion_depth):
+    last_open, first_close = found
+    selected = pick_inline_option(text[last_open + 2: first_close])
+    return text[:last_open] + selected + text[first_close+2:]
+
+def register_core_tags(registry):
+    """Registers the Core v4 action tags in the resolver's priority order."""
+    registry.register("while", WHILE_PATTERN, _while_handler(False), priority=10, openers=["[while"], ignore_case=True, core=True)
+    registry.register("whilenot", WHILENOT_PATTERN, _while_handler(True), priority=20, openers=["[whilenot"], ignore_case=True, core=True)
+    registry.register("if", IF_PATTERN, _if_handler(False), priority=30, openers=["[if"], ignore_case=True, core=True)
+    registry.register("ifnot", IFNOT_PATTERN, _if_handler(True), priority=40, openers=["[ifnot"], ignore_case=True, core=True)
+    registry.register("table", TABLE_CALL_PATTERN, _table_call_handler, priority=50, openers=["[@", "[!"], core=True)
+    registry.register_action("pick", _find_inline_pick, _apply_inline_pick, priority=60, openers=["[|"], core=True)
+
+def get_tag_registry(helpers):
+    """
+    Returns the ruleset's TagRegistry, building it on first use from the core
+    tags and any register_*_tags functions in the ruleset.
+    """
+    registry = helpers.get('tag_registry')
+    if registry is None:
+        registry = TagRegistry()
+        register_core_tags(registry)
+        # By name first, so a lazily loaded ruleset only loads the files that register tags
+        for name in list(helpers):
+            if name.startswith('register_') and name.endswith('_tags') and name != 'register_core_tags':
+                func = helpers[name]
+                if callable(func): func(registry)
+        helpers['tag_registry'] = registry
+    return registry
+
+# --- 6. CORE ENGINE: Central Recursive Tag Resolver ---
 
 def resolve_table_tags(text, tables, helpers, recursion_depth=0):
     """
-    Recursively replaces tags. Prioritizes variables/math, then Logic, then Tables.
+    Recursively replaces tags. Uses the compiled template renderer when the
+    ruleset provides one, and the rescanning resolver otherwise.
+    """
+    if 'resolve_table_tags' not in helpers: 
+        helpers['resolve_table_tags'] = resolve_table_tags
+    if 'variables' not in helpers: helpers['variables'] = {}
+    if 'deck_state' not in helpers: helpers['deck_state'] = {} # Track removed items here
+
+    if recursion_depth > 500: 
+        return "[Error: Max recursion depth]" 
+
+    render_template_func = helpers.get('render_template')
+    if render_template_func:
+        return render_template_func(text, tables, helpers, recursion_depth)
+    return resolve_table_tags_legacy(text, tables, helpers, recursion_depth)
+
+# Every core tag starts with '[' or '{' and ends with ']' or '}', so text
+# before the first '[', '{' or '|' (a stray '|]' can reach back to a '|') and
+# text after the last of '[]{}|' is finished: no later substitution can turn
+# it into part of a tag.
+FINISHED_PREFIX_PATTERN = re.compile(r'[^\[{|]*')
+TAG_CHARACTERS = "[]{}|"
+
+def resolve_table_tags_legacy(text, tables, helpers, recursion_depth=0):
+    """
+    Reference resolver: rescans the text after every substitution.
+    Prioritizes variables/math, then Logic, then Tables, then in-line picks.
+    The compiled renderer hands templates it cannot compile back to this.
+
+    Finished text at either end is moved to lists of segments as it appears,
+    so each pass only scans and copies the part still holding tags, and the
+    segments are joined once at the end.
     """
     if 'resolve_table_tags' not in helpers: 
         helpers['resolve_table_tags'] = resolve_table_tags
         
     math_evaluator_func = helpers.get('math_evaluator')
-    case_converter_func = helpers.get('case_converter')
-    list_sorter_func = helpers.get('list_sorter')
     
     if 'variables' not in helpers: helpers['variables'] = {}
     if 'deck_state' not in helpers: helpers['deck_state'] = {} # Track removed items here
@@ -129,186 +605,48 @@ def resolve_table_tags(text, tables, helpers, recursion_depth=0):
     if recursion_depth > 500: 
         return "[Error: Max recursion depth]" 
         
+    registry = get_tag_registry(helpers)
+    # Custom tags may start with anything, so with those the text stays whole
+    split_finished = registry.all_core
+    finished = []
+    finished_tail = []   # last segment first
+
     while True:
+        if split_finished:
+            end = FINISHED_PREFIX_PATTERN.match(text).end()
+            if end:
+                finished.append(text[:end])
+                text = text[end:]
+            start = max(text.rfind(char) for char in TAG_CHARACTERS) + 1
+            if start < len(text):
+                finished_tail.append(text[start:])
+                text = text[:start]
         original_text = text
         
         # --- STEP 1: RESOLVE MATH/VARIABLES ---
         text = math_evaluator_func(text, tables, helpers)
+
+        # A '|]' with no '[|' before it is read against the whole text
+        if (finished or finished_tail) and "|]" in text and "[|" not in text:
+            prefix = "".join(finished)
+            suffix = "".join(reversed(finished_tail))
+            finished = []
+            finished_tail = []
+            original_text = prefix + original_text + suffix
+            text = prefix + text + suffix
         
-        found_action = False
-        
-        # --- STEP 2: LOGIC GATES (IF / IFNOT / WHILE / WHILENOT) ---
-
-        # A. [while "condition", "loop_content"]
-        while_pattern = r'\[while\s+"([^"]*)"\s*,\s*"([^"]*)"\]'
-        while_match = re.search(while_pattern, text, re.IGNORECASE)
-        if while_match and not found_action:
-            full_tag = while_match.group(0)
-            raw_condition = while_match.group(1)
-            loop_content_template = while_match.group(2)
-            accumulated_output = []
-            loop_safety = 0
-            MAX_LOOPS = 20 
-            
-            while True:
-                if 'gui_update' in helpers: helpers['gui_update']()
-                current_condition_str = math_evaluator_func(raw_condition, tables, helpers)
-                if not evaluate_custom_condition(current_condition_str): break 
-                step_output = resolve_table_tags(loop_content_template, tables, helpers, recursion_depth + 1)
-                accumulated_output.append(step_output)
-                loop_safety += 1
-                if loop_safety >= MAX_LOOPS:
-                    accumulated_output.append(f" [Error: Loop limit ({MAX_LOOPS}) exceeded] ")
-                    break
-            text = text.replace(full_tag, "".join(accumulated_output), 1)
-            found_action = True; continue
-
-        # B. [whilenot "condition", "loop_content"]
-        whilenot_pattern = r'\[whilenot\s+"([^"]*)"\s*,\s*"([^"]*)"\]'
-        whilenot_match = re.search(whilenot_pattern, text, re.IGNORECASE)
-        if whilenot_match and not found_action:
-            full_tag = whilenot_match.group(0)
-            raw_condition = whilenot_match.group(1)
-            loop_content_template = whilenot_match.group(2)
-            accumulated_output = []
-            loop_safety = 0
-            MAX_LOOPS = 20 
-            
-            while True:
-                current_condition_str = math_evaluator_func(raw_condition, tables, helpers)
-                if evaluate_custom_condition(current_condition_str): break 
-                step_output = resolve_table_tags(loop_content_template, tables, helpers, recursion_depth + 1)
-                accumulated_output.append(step_output)
-                loop_safety += 1
-                if loop_safety >= MAX_LOOPS:
-                    accumulated_output.append(f" [Error: Loop limit ({MAX_LOOPS}) exceeded] ")
-                    break
-            text = text.replace(full_tag, "".join(accumulated_output), 1)
-            found_action = True; continue
-
-        # C. [if "condition", "then", "else"]
-        if_pattern = r'\[if\s+"([^"]*)"\s*,\s*"([^"]*)"\s*,\s*"([^"]*)"\]'
-        if_match = re.search(if_pattern, text, re.IGNORECASE)
-        if if_match and not found_action:
-            full_tag = if_match.group(0)
-            condition_str = if_match.group(1)
-            then_branch = if_match.group(2)
-            else_branch = if_match.group(3)
-            if evaluate_custom_condition(condition_str): text = text.replace(full_tag, then_branch, 1)
-            else: text = text.replace(full_tag, else_branch, 1)
-            found_action = True; continue 
-
-        # D. [ifnot "condition", "then", "else"]
-        ifnot_pattern = r'\[ifnot\s+"([^"]*)"\s*,\s*"([^"]*)"\s*,\s*"([^"]*)"\]'
-        ifnot_match = re.search(ifnot_pattern, text, re.IGNORECASE)
-        if ifnot_match and not found_action:
-            full_tag = ifnot_match.group(0)
-            condition_str = ifnot_match.group(1)
-            then_branch = ifnot_match.group(2)
-            else_branch = ifnot_match.group(3)
-            if not evaluate_custom_condition(condition_str): text = text.replace(full_tag, then_branch, 1)
-            else: text = text.replace(full_tag, else_branch, 1)
-            found_action = True; continue
-
-        # --- STEP 3: HANDLE TABLE CALLS: [@Table] and [!Table] ---
-        # Matches [@Table], [!Table], [@5 Table], [!5 Table]
-        table_match = re.search(r"\[([@!])(.*?)\]", text)
-        if table_match and not found_action:
-            full_tag = table_match.group(0)
-            operator = table_match.group(1)  # '@' (Standard) or '!' (Deck)
-            content = table_match.group(2).strip()
-            
-            # Modifier Parsing
-            case_modifier = None; separator = ", "; sort_flag = False; implode_applied = False
-            while True:
-                found_modifier = False
-                implode_match = re.search(r'\s+>>\s+implode\s+"(.*?)"$', content, re.IGNORECASE)
-                if implode_match and not implode_applied: 
-                    separator = implode_match.group(1); content = content[:implode_match.start()].strip()
-                    implode_applied = True; found_modifier = True; continue
-                sort_match = re.search(r'\s+>>\s+sort$', content, re.IGNORECASE)
-                if sort_match and not sort_flag: 
-                    sort_flag = True; content = content[:sort_match.start()].strip()
-                    found_modifier = True; continue
-                case_match = re.search(r'\s+>>\s+(lower|upper|proper)$', content, re.IGNORECASE)
-                if case_match and case_modifier is None: 
-                    case_modifier = case_match.group(1).lower(); content = content[:case_match.start()].strip()
-                    found_modifier = True; continue
-                if not found_modifier: break
-
-            # Multi-roll parsing
-            count = 1  # Default to 1 (Handles [!Table] case automatically)
-            table_ref = content
-            match_multi_num = re.match(r"^(\d+)\s+(.*)", content)
-            if match_multi_num:
-                count = int(match_multi_num.group(1))
-                table_ref = match_multi_num.group(2).strip()
-            
-            if table_ref in tables:
-                results = []
-                
-                # --- DECK LOGIC (Operator !) ---
-                if operator == '!':
-                    # Check for Reset Flag
-                    has_reset_flag = any(e['text'] == '__RESET__' for e in tables[table_ref])
-                    
-                    # Initialize deck if missing OR if Reset flag is present (auto-reshuffle on call)
-                    if table_ref not in helpers['deck_state'] or has_reset_flag:
-                        valid_items = [e for e in tables[table_ref] if e['text'] != "__RESET__"]
-                        expanded_deck = []
-                        for item in valid_items:
-                            for _ in range(item['weight']):
-                                expanded_deck.append(item['text'])
-                        helpers['deck_state'][table_ref] = expanded_deck
-
-                    current_deck = helpers['deck_state'][table_ref]
-                    
-                    for _ in range(count):
-                        if not current_deck:
-                            results.append("[Error: Deck depleted]")
-                            break
-                        
-                        # Draw and remove
-                        pick = random.choice(current_deck)
-                        current_deck.remove(pick)
-                        
-                        results.append(resolve_table_tags(pick, tables, helpers, recursion_depth + 1))
-
-                # --- STANDARD LOGIC (Operator @) ---
-                else:
-                    for _ in range(count):
-                        raw_res = roll_on_table(table_ref, tables)
-                        results.append(resolve_table_tags(raw_res, tables, helpers, recursion_depth + 1))
-                
-                if sort_flag: results = list_sorter_func(results)
-                final_result = separator.join(results)
-                if case_modifier: final_result = case_converter_func(final_result, case_modifier)
-                text = text.replace(full_tag, final_result, 1)
-                found_action = True
-            else:
-                text = text.replace(full_tag, f"[Error: Table '{table_ref}' not found]", 1)
-                found_action = True
-
-        # --- STEP 4: HANDLE IN-LINE PICKS [|A|B|] ---
-        if "[|" in text and "|]" in text and not found_action:
-            last_open = text.rfind('[|')
-            open_count = 1; first_close = -1; i = last_open + 2
-            while i < len(text):
-                if text[i:i+2] == '[|': open_count += 1; i += 2
-                elif text[i:i+2] == '||': i += 2
-                elif text[i:i+2] == '|]':
-                    open_count -= 1
-                    if open_count == 0: first_close = i; break
-                    i += 2
-                else: i += 1
-            
-            if first_close != -1:
-                options = text[last_open + 2: first_close].split('|')
-                selected = random.choice(options) if options else ""
-                text = text[:last_open] + selected + text[first_close+2:]
-                found_action = True
+        # --- STEP 2: ONE ACTION TAG (Logic, then Tables, then In-line picks) ---
+        action = registry.find_action(text)
+        if action:
+            tag, found = action
+            text = tag.apply(text, found, tables, helpers, recursion_depth)
+            continue
 
-        if original_text == text and not found_action:
+        if original_text == text:
             break
-            
+
+    if finished or finished_tail:
+        finished.append(text)
+        finished.extend(reversed(finished_tail))
+        return "".join(finished)
     return text
\ No newline at end of file
@@ -0,0 +1,521 @@
+import random
+import re
+
+# --- TEMPLATE COMPILER ---
+# Parses a table entry once into a tree of literal text and tag nodes, then
+# renders it by walking the tree instead of rescanning the text after every
+# substitution.
+#
+# The walk follows the same phase order as the rescanning resolver in
+# table_parsing_rules.py: variable assignments, recalls, math functions, dice,
+# ranges, arithmetic, [while], [whilenot], [if], [ifnot], table calls, and
+# finally in-line picks (last one first). A compiled template therefore draws
+# from the random stream in the same order and gives the same output for the
+# same seed. Anything the compiler cannot prove equivalent is handed to the
+# rescanning resolver, either up front or part-way through a render.
+#
+# Math tags that come out the same on every render ({floor(10/2)}, {2*3}) are
+# folded: evaluated once, the first time the template is rendered, with the
+# value kept on the node. An entry left with nothing to roll is returned as
+# plain text from then on.
+
+# --- 1. Tag Patterns ---
+# The tag patterns themselves come from the rescanning resolver's files, so
+# both paths always read the same syntax.
+
+from math_rules import ASSIGNMENT_PATTERN as ASSIGN_PATTERN, RECALL_PATTERN, MATH_FUNCTION_PATTERN, DICE_PATTERN, RANGE_PATTERN
+from table_parsing_rules import WHILE_PATTERN, WHILENOT_PATTERN, IF_PATTERN, IFNOT_PATTERN
+
+ARITHMETIC_TEXT_PATTERN = re.compile(r'[\d\s\.\+\-\*/\(\)]*\Z')
+
+LOGIC_PATTERNS = [
+    ("while", WHILE_PATTERN),
+    ("whilenot", WHILENOT_PATTERN),
+    ("if", IF_PATTERN),
+    ("ifnot", IFNOT_PATTERN),
+]
+
+# Text produced during a render must not contain anything that could start or
+# end a tag, or the rescanning resolver might have read it differently. When it
+# does, the render hands the partly resolved text over to that resolver.
+UNSAFE_VALUE = re.compile(r'[{}\[\]|"\n]')             # math and variable results
+UNSAFE_FUNCTION_VALUE = re.compile(r'[{}\[\]|"\n)]')   # variables inside {func(...)}
+UNSAFE_RESULT = re.compile(r'[{}\[\]|]')               # loop and table results
+UNSAFE_ASSIGNMENT = re.compile(r'\{\$|[\[\]|]')        # assigned values are not re-resolved
+FOLDABLE_CONTENTS = re.compile(r'[^{}\[\]|$]*\Z')      # {func(...)} contents with nothing to roll
+
+# Region modes used while parsing
+FULL = 0    # every tag kind
+MATH = 1    # only {...} tags; the rest is plain text ([if] conditions, [while] parts)
+TABLE = 2   # like MATH, inside a [@...] tag
+VARS = 3    # only {$...} tags; the rest is resolved later ({func(...)} contents)
+ARITH = 4   # inside a {...} arithmetic tag
+
+PHASE_ORDER = ["assign", "recall", "function", "dice", "range", "arithmetic",
+               "while", "whilenot", "if", "ifnot", "table", "pick"]
+
+# --- 2. Compiled Template Structures ---
+
+class TemplateNode:
+    """
+    One tag in a compiled template. 'pieces' rebuilds the tag's source text
+    (with any resolved children filled in) if the render has to hand over.
+    """
+    __slots__ = ("kind", "nid", "data", "pieces", "guard", "unsafe", "constant")
+
+    def __init__(self, kind, nid, guard, unsafe):
+        self.kind = kind
+        self.nid = nid
+        self.data = None
+        self.pieces = ()
+        self.guard = guard      # (if_node, branch) when inside an [if] branch
+        self.unsafe = unsafe
+        self.constant = None    # the folded value of a math tag that never changes
+
+class CompiledTemplate:
+    """A table entry parsed into literal text and TemplateNodes."""
+    __slots__ = ("parts", "node_count", "phases", "folded", "static_text")
+
+    def __init__(self, parts, node_count, phases):
+        self.parts = parts
+        self.node_count = node_count
+        self.phases = phases
+        self.folded = False
+        self.static_text = None   # set by fold_constants() when every tag folded
+
+class TemplateNotCompilable(Exception):
+    """Raised when a template has to be left to the rescanning resolver."""
+
+# --- 3. Parser ---
+
+class TemplateParser:
+    """Builds a CompiledTemplate from one template string."""
+
+    def __init__(self, text):
+        self.text = text
+        self.nodes = []
+        self.phases = {kind: [] for kind in PHASE_ORDER}
+
+    def parse(self):
+        parts = self.parse_region(0, len(self.text), FULL)
+        return CompiledTemplate(parts, len(self.nodes), self.phases)
+
+    def new_node(self, kind, guard, unsafe=UNSAFE_VALUE):
+        # Nodes are numbered in order of their opening character, so each
+        # phase list is in the same order the resolver's regexes find them.
+        node = TemplateNode(kind, len(self.nodes), guard, unsafe)
+        self.nodes.append(node)
+        self.phases[kind].append(node)
+        return node
+
+    def parse_region(self, pos, end, mode, guard=None, unsafe=UNSAFE_VALUE):
+        """Parses text[pos:end] into a list of literal strings and nodes."""
+        text = self.text
+        parts = []
+        literal_start = i = pos
+        while i < end:
+            char = text[i]
+            if char == '{':
+                node, next_i = self.parse_brace(i, end, mode, guard, unsafe)
+            elif char == '[' and mode == FULL:
+                node, next_i = self.parse_bracket(i, end, guard)
+            else:
+                if char in ']|}' and mode == FULL: raise TemplateNotCompilable()
+                if char == '}' and mode != VARS: raise TemplateNotCompilable()
+                if char == '[' and mode == TABLE: raise TemplateNotCompilable()
+                i += 1
+                continue
+            if node is None:
+                i += 1
+                continue
+            if literal_start < i: parts.append(text[literal_start:i])
+            parts.append(node)
+            literal_start = i = next_i
+        if literal_start < end: parts.append(text[literal_start:end])
+        return parts
+
+    def parse_brace(self, i, end, mode, guard, unsafe):
+        """Parses the {...} tag starting at i. Returns (node, end_index)."""
+        text = self.text
+
+        # Variables
+        match = ASSIGN_PATTERN.match(text, i, end)
+        if match:
+            if UNSAFE_ASSIGNMENT.search(match.group(3)): raise TemplateNotCompilable()
+            node = self.new_node("assign", guard, unsafe)
+            node.data = (match.group(1), match.group(3))
+            node.pieces = (match.group(0),)
+            return node, match.end()
+        match = RECALL_PATTERN.match(text, i, end)
+        if match:
+            node = self.new_node("recall", guard, unsafe)
+            node.data = match.group(1)
+            node.pieces = (match.group(0),)
+            return node, match.end()
+        if text.startswith('{$', i): raise TemplateNotCompilable()
+        if mode == VARS: return None, i + 1
+
+        # Math functions (their contents are resolved as a separate template)
+        match = MATH_FUNCTION_PATTERN.match(text, i, end)
+        if match:
+            node = self.new_node("function", guard, unsafe)
+            contents = self.parse_region(match.start(2), match.end(2), VARS, guard, UNSAFE_FUNCTION_VALUE)
+            node.data = (match.group(1), contents)
+            node.pieces = (text[i:match.start(2)], contents, text[match.end(2):match.end()])
+            return node, match.end()
+        if MATH_FUNCTION_PATTERN.match(text, i): raise TemplateNotCompilable()
+
+        # Dice and ranges
+        match = DICE_PATTERN.match(text, i, end)
+        if match:
+            node = self.new_node("dice", guard, unsafe)
+            node.data = match.groups()
+            node.pieces = (match.group(0),)
+            return node, match.end()
+        match = RANGE_PATTERN.match(text, i, end)
+        if match:
+            node = self.new_node("range", guard, unsafe)
+            node.data = match.groups()
+            node.pieces = (match.group(0),)
+            return node, match.end()
+
+        # Plain arithmetic, which may hold any of the tags above
+        if mode == ARITH: raise TemplateNotCompilable()
+        return self.parse_arithmetic(i, end, guard, unsafe)
+
+    def parse_arithmetic(self, i, end, guard, unsafe):
+        text = self.text
+        node = self.new_node("arithmetic", guard, unsafe)
+        parts = []
+        literal_start = j = i + 1
+        while j < end:
+            char = text[j]
+            if char == '}':
+                if literal_start < j: parts.append(text[literal_start:j])
+                if not parts: raise TemplateNotCompilable()
+                for part in parts:
+                    if part.__class__ is str and not ARITHMETIC_TEXT_PATTERN.match(part):
+                        raise TemplateNotCompilable()
+                node.data = parts
+                node.pieces = ('{', parts, '}')
+                return node, j + 1
+            if char == '{':
+                if literal_start < j: parts.append(text[literal_start:j])
+                child, j = self.parse_brace(j, end, ARITH, guard, unsafe)
+                parts.append(child)
+                literal_start = j
+                continue
+            j += 1
+        raise TemplateNotCompilable()
+
+    def parse_bracket(self, i, end, guard):
+        """Parses the [...] tag starting at i. Returns (node, end_index)."""
+        text = self.text
+        if text.startswith('[|', i):
+            return self.parse_pick(i, end, guard)
+
+        if text.startswith('[@', i) or text.startswith('[!', i):
+            close = text.find(']', i + 2, end)
+            if close == -1 or '\n' in text[i + 2:close]: raise TemplateNotCompilable()
+            node = self.new_node("table", guard)
+            contents = self.parse_region(i + 2, close, TABLE, guard)
+            node.data = (text[i + 1], contents)
+            node.pieces = (text[i:i + 2], contents, ']')
+            return node, close + 1
+
+        for kind, pattern in LOGIC_PATTERNS:
+            match = pattern.match(text, i, end)
+            if not match: continue
+            node = self.new_node(kind, guard)
+            condition = self.parse_region(match.start(1), match.end(1), MATH, guard)
+            if kind.startswith("while"):
+                body = self.parse_region(match.start(2), match.end(2), MATH, guard)
+                node.data = (condition, body)
+                node.pieces = (text[i:match.start(1)], condition, text[match.end(1):match.start(2)],
+                               body, text[match.end(2):match.end()])
+            else:
+                then_branch = self.parse_region(match.start(2), match.end(2), FULL, (node, 0))
+                else_branch = self.parse_region(match.start(3), match.end(3), FULL, (node, 1))
+                node.data = (condition, then_branch, else_branch)
+                node.pieces = (text[i:match.start(1)], condition, text[match.end(1):match.start(2)],
+                               then_branch, text[match.end(2):match.start(3)],
+                               else_branch, text[match.end(3):match.end()])
+            return node, match.end()
+
+        raise TemplateNotCompilable()
+
+    def parse_pick(self, i, end, guard):
+        """Parses an in-line [|A|B|] pick, following the resolver's '||' rule."""
+        text = self.text
+        node = self.new_node("pick", guard)
+        options = []
+        parts = []
+        literal_start = j = i + 2
+        while j < end:
+            char = text[j]
+            if char == '|':
+                if literal_start < j: parts.append(text[literal_start:j])
+                run_end = j
+                while run_end < end and text[run_end] == '|': run_end += 1
+                bars = run_end - j
+                closes = run_end < end and text[run_end] == ']'
+                if closes:
+                    # '||' pairs are skipped, so only an odd run can close.
+                    if bars % 2 == 0: raise TemplateNotCompilable()
+                    bars -= 1
+                for _ in range(bars):
+                    options.append(parts)
+                    parts = []
+                if closes:
+                    options.append(parts)
+                    pieces = ['[|']
+                    for index, option in enumerate(options):
+                        if index: pieces.append('|')
+                        pieces.append(option)
+                    pieces.append('|]')
+                    node.data = options
+                    node.pieces = tuple(pieces)
+                    return node, run_end + 1
+                literal_start = j = run_end
+                continue
+            if char == '{':
+                child, next_j = self.parse_brace(j, end, FULL, guard, UNSAFE_VALUE)
+            elif char == '[':
+                child, next_j = self.parse_bracket(j, end, guard)
+            elif char in ']}':
+                raise TemplateNotCompilable()
+            else:
+                j += 1
+                continue
+            if literal_start < j: parts.append(text[literal_start:j])
+            parts.append(child)
+            literal_start = j = next_j
+        raise TemplateNotCompilable()
+
+# --- 4. Compile Cache ---
+
+_TEMPLATE_CACHE = {}
+_TEMPLATE_CACHE_LIMIT = 50000
+_MISSING = object()
+
+def compile_template(text):
+    """
+    Returns the CompiledTemplate for text, or None if it has to be resolved by
+    the rescanning resolver. Results are cached by template text.
+    """
+    template = _TEMPLATE_CACHE.get(text, _MISSING)
+    if template is _MISSING:
+        try:
+            template = TemplateParser(text).parse()
+        except TemplateNotCompilable:
+            template = None
+        if len(_TEMPLATE_CACHE) >= _TEMPLATE_CACHE_LIMIT:
+            _TEMPLATE_CACHE.clear()
+        _TEMPLATE_CACHE[text] = template
+    return template
+
+# --- 5. Constant Folding ---
+
+def fold_constants(template, helpers):
+    """
+    Evaluates the math functions and arithmetic in template that have nothing
+    to roll, and keeps each value on its node. The renderer still fills the
+    values in during their own phase, so a hand-over part-way through sees
+    exactly the text it did before.
+    """
+    template.folded = True
+    folded = 0
+    for node in template.phases["function"]:
+        func_name, contents = node.data
+        if len(contents) > 1 or (contents and contents[0].__class__ is not str): continue
+        literal = contents[0] if contents else ""
+        if not FOLDABLE_CONTENTS.match(literal): continue
+        # Anything that draws a random number isn't constant after all
+        state = random.getstate()
+        value = helpers['evaluate_math_function'](func_name, literal, {}, helpers)
+        if random.getstate() != state:
+            random.setstate(state)
+            continue
+        if node.unsafe.search(value): continue
+        node.constant = value
+        folded += 1
+
+    for node in template.phases["arithmetic"]:
+        pieces = []
+        for part in node.data:
+            if part.__class__ is str: pieces.append(part)
+            elif part.constant is not None: pieces.append(part.constant)
+            else: break
+        else:
+            value = helpers['evaluate_arithmetic']("".join(pieces))
+            if value is not None:
+                node.constant = value
+                folded += 1
+
+    if folded == template.node_count:
+        values = [None] * template.node_count
+        for kind in ("function", "arithmetic"):
+            for node in template.phases[kind]:
+                values[node.nid] = node.constant
+        template.static_text = materialize_parts(template.parts, values)
+
+def static_entry_text(text, helpers):
+    """Returns what text always resolves to if it has nothing to roll, otherwise None."""
+    template = compile_template(text)
+    if template is None or helpers['get_tag_registry'](helpers).has_custom_tags(text):
+        return None
+    if not template.node_count:
+        return text
+    if not template.folded:
+        fold_constants(template, helpers)
+    return template.static_text
+
+def fold_table_constants(tables, helpers):
+    """
+    Compiles and folds every entry of the parsed tables once, and records on
+    each table which entries always resolve to the same text, so table calls
+    can use that text without resolving the entry again.
+    """
+    for table in tables.values():
+        if getattr(table, 'static_texts', None) is None and hasattr(table, 'texts'):
+            fold_table_entries(table, helpers)
+
+def fold_table_entries(table, helpers):
+    """Finds the static entries of one CompiledTable. Returns {entry text: resolved text}."""
+    static_texts = {}
+    for text in table.texts:
+        static = static_entry_text(text, helpers)
+        if static is not None:
+            static_texts[text] = static
+    table.static_texts = static_texts
+    return static_texts
+
+# --- 6. Renderer ---
+
+def materialize_parts(parts, values):
+    """Joins parts back into text, using resolved values where there are any."""
+    out = []
+    for part in parts:
+        if part.__class__ is str:
+            out.append(part)
+            continue
+        value = values[part.nid]
+        if value is None:
+            for piece in part.pieces:
+                out.append(piece if piece.__class__ is str else materialize_parts(piece, values))
+        elif value.__class__ is int:
+            # A decided [if]/[ifnot]: the chosen branch takes the tag's place.
+            out.append(materialize_parts(part.data[value + 1], values))
+        else:
+            out.append(value)
+    return "".join(out)
+
+def render_template(text, tables, helpers, recursion_depth=0):
+    """
+    Resolves all tags in text by walking its compiled template.
+    Gives the same result as resolve_table_tags_legacy for the same seed.
+    """
+    template = compile_template(text)
+    if template is None:
+        return helpers['resolve_table_tags_legacy'](text, tables, helpers, recursion_depth)
+    # Tags added by a custom ruleset are only known to the rescanning resolver
+    if helpers['get_tag_registry'](helpers).has_custom_tags(text):
+        return helpers['resolve_table_tags_legacy'](text, tables, helpers, recursion_depth)
+    if not template.node_count:
+        return text
+    if not template.folded:
+        fold_constants(template, helpers)
+    if template.static_text is not None:
+        return template.static_text
+
+    values = [None] * template.node_count
+    phases = template.phases
+
+    def hand_over():
+        partial_text = materialize_parts(template.parts, values)
+        return helpers['resolve_table_tags_legacy'](partial_text, tables, helpers, recursion_depth)
+
+    def is_dead(node):
+        guard = node.guard
+        return guard is not None and values[guard[0].nid] != guard[1]
+
+    # --- Math and variables ---
+    if phases["assign"] or phases["recall"]:
+        variables = helpers['get_variable_store'](helpers)
+        for node in phases["assign"]:
+            var_name, raw_value_exp = node.data
+            resolved_value = helpers['resolve_simple_math'](raw_value_exp, helpers.get('dice_engine'))
+            variables[var_name] = resolved_value
+            values[node.nid] = resolved_value
+            if node.unsafe.search(resolved_value): return hand_over()
+        for node in phases["recall"]:
+            var_name = node.data
+            if var_name in variables:
+                value = str(variables[var_name])
+            else:
+                value = f"[Error: Variable '{var_name}' not defined]"
+            values[node.nid] = value
+            if node.unsafe.search(value): return hand_over()
+
+    # The resolver replaces every function tag in one pass before it looks at
+    # the results, so an unsafe result only hands over once all are done.
+    unsafe_function = False
+    for node in phases["function"]:
+        if node.constant is not None:
+            values[node.nid] = node.constant
+            continue
+        func_name, contents = node.data
+        value = helpers['evaluate_math_function'](func_name, materialize_parts(contents, values), tables, helpers)
+        values[node.nid] = value
+        if node.unsafe.search(value): unsafe_function = True
+    if unsafe_function: return hand_over()
+
+    dice_engine = helpers.get('dice_engine')
+    for node in phases["dice"]:
+        value = helpers['roll_dice_expression'](*node.data, dice_engine)
+        values[node.nid] = value
+        if node.unsafe.search(value): return hand_over()
+
+    for node in phases["range"]:
+        values[node.nid] = helpers['roll_range'](*node.data)
+
+    for node in phases["arithmetic"]:
+        if node.constant is not None:
+            values[node.nid] = node.constant
+            continue
+        value = helpers['evaluate_arithmetic'](materialize_parts(node.data, values))
+        if value is None: return hand_over()
+        values[node.nid] = value
+
+    # --- Logic gates ---
+    for kind, negate in (("while", False), ("whilenot", True)):
+        for node in phases[kind]:
+            condition, body = node.data
+            value = helpers['run_logic_loop'](negate, materialize_parts(condition, values),
+                                              materialize_parts(body, values), tables, helpers, recursion_depth)
+            values[node.nid] = value
+            if UNSAFE_RESULT.search(value): return hand_over()
+
+    for kind, negate in (("if", False), ("ifnot", True)):
+        for node in phases[kind]:
+            result = helpers['evaluate_custom_condition'](materialize_parts(node.data[0], values), helpers.get('variables'))
+            values[node.nid] = 0 if bool(result) != negate else 1
+
+    # --- Table calls ---
+    for node in phases["table"]:
+        if is_dead(node): continue
+        operator, contents = node.data
+        value = helpers['resolve_table_call'](operator, materialize_parts(contents, values),
+                                              tables, helpers, recursion_depth)
+        values[node.nid] = value
+        if UNSAFE_RESULT.search(value): return hand_over()
+
+    # --- In-line picks, last opened first ---
+    for node in reversed(phases["pick"]):
+        if is_dead(node): continue
+        content = "|".join([materialize_parts(option, values) for option in node.data])
+        # An empty result can merge two '|' into a '||' pair and move the close.
+        if helpers['find_inline_pick_close'](content + "|]", 0) != len(content): return hand_over()
+        values[node.nid] = helpers['pick_inline_option'](content)
+
+    return materialize_parts(template.parts, values)
@@ -0,0 +1,98 @@
+import random
+import re
+import unittest
+
+from RPG_Pad_Engine import COMMON_A_AN_EXCEPTIONS, AAnResolver, GenerationEngine, resolve_a_an_modifier
+
+def regex_resolve_a_an(text):
+    """The resolver AAnResolver replaced: re.sub, scanning the rest of the text for each '\\a'."""
+    VOWELS = "AEIOUaeiou"
+
+    def final_substitute(match):
+        text_after_a = match.string[match.end():]
+        i = 0
+        while i < len(text_after_a):
+            char = text_after_a[i]
+            if char.isspace():
+                i += 1
+                continue
+            if char == '<':
+                tag_end = text_after_a.find('>', i)
+                i = tag_end + 1 if tag_end != -1 else i + 1
+                continue
+            first_char = char
+            break
+        else:
+            first_char = ''
+        return "an" if first_char and first_char in VOWELS else "a"
+
+    return re.sub(r'\\a', final_substitute, text)
+
+class VowelRuleTests(unittest.TestCase):
+    CASES = [
+        ("\\a apple", "an apple"),
+        ("\\a Apple and \\a pear", "an Apple and a pear"),
+        ("\\a ELF", "an ELF"),
+        ("\\a Orc, \\a umbrella", "an Orc, an umbrella"),
+        ("\\a <b>apple</b>", "an <b>apple</b>"),
+        ("\\a <i> <b>Ogre", "an <i> <b>Ogre"),
+        ("\\a 'orc'", "a 'orc'"),
+        ("\\a \"elf\"", "a \"elf\""),
+        ("\\a (elf)", "a (elf)"),
+        ("\\a 8-foot elf", "a 8-foot elf"),
+        ("\\a\n\n  igloo.", "an\n\n  igloo."),
+        ("\\a < apple", "an < apple"),
+        ("\\a", "a"),
+        ("\\a\\a egg", "aan egg"),
+        ("no modifier at all", "no modifier at all"),
+    ]
+
+    def test_cases(self):
+        for text, expected in self.CASES:
+            with self.subTest(text=text):
+                self.assertEqual(regex_resolve_a_an(text), expected)
+                self.assertEqual(resolve_a_an_modifier(text), expected)
+
+    def test_matches_regex_resolver(self):
+        pieces = ["\\a", "\\a ", " ", "\n", "<b>", "</b>", "<", ">", "apple", "Egg", "orc", "Unit", "hour", "pear",
+                  "'", "\"", ",", ".", "(", "8", "é", "\\", "a", "x"]
+        rng = random.Random(4)
+        for _ in range(5000):
+            text = "".join(rng.choice(pieces) for _ in range(rng.randint(1, 10)))
+            with self.subTest(text=text):
+                self.assertEqual(resolve_a_an_modifier(text), regex_resolve_a_an(text))
+
+class ExceptionTests(unittest.TestCase):
+    def test_exceptions_override_the_vowel_rule(self):
+        resolve = AAnResolver(["a unicorn", "an hour*", "a one"])
+        self.assertEqual(resolve("\\a unicorn and \\a Unicorn"), "a unicorn and a Unicorn")
+        self.assertEqual(resolve("\\a hour, \\a hourly bell, \\a <b>Hours</b>"), "an hour, an hourly bell, an <b>Hours</b>")
+        self.assertEqual(resolve("\\a one"), "a one")
+        # Without '*' only the whole word matches
+        self.assertEqual(resolve("\\a unicorns, \\a ones"), "an unicorns, an ones")
+        # Everything else still follows the vowel rule
+        self.assertEqual(resolve("\\a apple, \\a honest man"), "an apple, a honest man")
+
+    def test_longer_exception_wins(self):
+        resolve = AAnResolver(["a uni*", "an unin*"])
+        self.assertEqual(resolve("\\a unit, \\a uninvited guest"), "a unit, an uninvited guest")
+
+    def test_common_exceptions(self):
+        resolve = AAnResolver(COMMON_A_AN_EXCEPTIONS)
+        self.assertEqual(resolve("\\a honest \\a European \\a usual \\a umbrella"), "an honest a European a usual an umbrella")
+
+    def test_bad_exception(self):
+        with self.assertRaises(ValueError):
+            AAnResolver(["the hour"])
+        with self.assertRaises(ValueError):
+            AAnResolver(["an"])
+
+    def test_engine_exceptions(self):
+        engine = GenerationEngine.from_ruleset("Core v4")
+        engine.set_a_an_exceptions(["an hour"])
+        self.assertEqual(engine.resolve_a_an("\\a hour"), "an hour")
+        engine.set_a_an_exceptions(None)
+        self.assertEqual(engine.resolve_a_an("\\a hour"), "a hour")
+
+if __name__ == "__main__":
+    unittest.main()
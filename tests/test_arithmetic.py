@@ -0,0 +1,56 @@
+import random
+import unittest
+
+from RPG_Pad_Engine import GenerationEngine
+
+FUNCS = GenerationEngine.from_ruleset("Core v4").ruleset_funcs
+
+def eval_arithmetic(expression):
+    """What {...} arithmetic printed when it was handed to eval()."""
+    result = eval(expression, {"__builtins__": None}, {})
+    if result == int(result):
+        return str(int(result))
+    return f"{result:.8f}".rstrip('0').rstrip('.')
+
+def random_expression(rng, depth=0):
+    if depth > 3 or rng.random() < 0.3:
+        return rng.choice(["0", "1", "2", "7", "10", "3.5", ".25", "100"])
+    kind = rng.random()
+    if kind < 0.15:
+        return rng.choice(["-", "+"]) + random_expression(rng, depth + 1)
+    if kind < 0.3:
+        return "(" + random_expression(rng, depth + 1) + ")"
+    operator = rng.choice(["+", "-", "*", "/", "//", "**"])
+    if operator == "**":
+        # Keep powers small, as eval() would happily compute huge ones
+        return random_expression(rng, depth + 1) + " ** " + rng.choice(["2", "3", "0.5"])
+    return random_expression(rng, depth + 1) + f" {operator} " + random_expression(rng, depth + 1)
+
+class ArithmeticTests(unittest.TestCase):
+    def test_matches_eval(self):
+        rng = random.Random(11)
+        for _ in range(3000):
+            expression = random_expression(rng)
+            try:
+                expected = eval_arithmetic(expression)
+            except Exception:
+                expected = None
+            with self.subTest(expression=expression):
+                self.assertEqual(FUNCS['evaluate_arithmetic'](expression), expected)
+
+    def test_precedence(self):
+        evaluate = FUNCS['evaluate_arithmetic']
+        self.assertEqual(evaluate("2 + 3 * 4"), "14")
+        self.assertEqual(evaluate("-2 ** 2"), "-4")
+        self.assertEqual(evaluate("2 ** 3 ** 2"), "512")
+        self.assertEqual(evaluate("7 // 2 * 2"), "6")
+        self.assertEqual(evaluate("10 / 4"), "2.5")
+
+    def test_rejects_anything_but_arithmetic(self):
+        evaluate = FUNCS['evaluate_arithmetic']
+        for expression in ["__import__('os')", "abc", "1 +", "(1", "1)", "2 ** 99999999", "1 / 0", "", "1\n+2"]:
+            with self.subTest(expression=expression):
+                self.assertIsNone(evaluate(expression))
+
+if __name__ == "__main__":
+    unittest.main()
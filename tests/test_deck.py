@@ -0,0 +1,62 @@
+import random
+import unittest
+
+from RPG_Pad_Engine import GenerationEngine
+
+FUNCS = GenerationEngine.from_ruleset("Core v4").ruleset_funcs
+
+def make_table(entries, reset=False):
+    rows = [{'text': text, 'weight': weight} for text, weight in entries]
+    if reset:
+        rows.insert(0, {'text': "__RESET__", 'weight': 1})
+    return FUNCS['compile_table'](rows)
+
+def expanded_draws(entries, seed, count):
+    """The old deck: every entry repeated by its weight, then random.choice and list.remove."""
+    random.seed(seed)
+    cards = [text for text, weight in entries for _ in range(weight)]
+    draws = []
+    for _ in range(count):
+        pick = random.choice(cards)
+        cards.remove(pick)
+        draws.append(pick)
+    return draws
+
+class DeckTests(unittest.TestCase):
+    ENTRIES = [("a", 3), ("b", 1), ("c", 5), ("a", 2), ("d", 1), ("e", 4)]
+
+    def test_draws_match_expanded_deck(self):
+        total = sum(weight for _, weight in self.ENTRIES)
+        for seed in range(50):
+            deck = FUNCS['Deck'](make_table(self.ENTRIES))
+            random.seed(seed)
+            draws = [deck.draw() for _ in range(total)]
+            with self.subTest(seed=seed):
+                self.assertEqual(draws, expanded_draws(self.ENTRIES, seed, total))
+                self.assertEqual(deck.remaining, 0)
+
+    def test_reset_puts_every_card_back(self):
+        deck = FUNCS['Deck'](make_table(self.ENTRIES))
+        random.seed(3)
+        for _ in range(10):
+            deck.draw()
+        deck.reset()
+        self.assertEqual(deck.remaining, sum(weight for _, weight in self.ENTRIES))
+        random.seed(4)
+        drawn = sorted(deck.draw() for _ in range(deck.remaining))
+        self.assertEqual(drawn, sorted(text for text, weight in self.ENTRIES for _ in range(weight)))
+
+    def test_deck_tags(self):
+        tables = FUNCS['parse_tables']("Table: D\na\nb\nTable: R\nReset:\nx\n")
+        helpers = FUNCS.copy()
+        helpers['variables'] = {}
+        helpers['deck_state'] = {}
+        random.seed(1)
+        resolve = helpers['resolve_table_tags']
+        self.assertEqual(sorted(resolve("[!D]|[!D]", tables, helpers).split("|")), ["a", "b"])
+        self.assertEqual(resolve("[!D]", tables, helpers), "[Error: Deck depleted]")
+        # A Reset: deck is shuffled again on every call
+        self.assertEqual(resolve("[!R] [!R] [!R]", tables, helpers), "x x x")
+
+if __name__ == "__main__":
+    unittest.main()
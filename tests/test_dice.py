@@ -0,0 +1,69 @@
+import random
+import unittest
+from collections import Counter
+from itertools import product
+
+from RPG_Pad_Engine import GenerationEngine
+
+FUNCS = GenerationEngine.from_ruleset("Core v4").ruleset_funcs
+
+def roll_tag(engine, text, seed):
+    helpers = engine.ruleset_funcs.copy()
+    helpers['variables'] = {}
+    helpers['deck_state'] = {}
+    random.seed(seed)
+    if engine.dice_engine is not None:
+        engine.dice_engine.seed(seed)
+    return helpers['resolve_table_tags'](text, {}, helpers)
+
+class DiceSumDistributionTests(unittest.TestCase):
+    def test_matches_brute_force(self):
+        for count, sides in [(1, 6), (2, 6), (3, 4), (4, 3), (2, 1), (5, 2)]:
+            totals = Counter(sum(roll) for roll in product(range(1, sides + 1), repeat=count))
+            expected = [totals[total] for total in range(count, count * sides + 1)]
+            with self.subTest(count=count, sides=sides):
+                self.assertEqual(FUNCS['dice_sum_distribution'](count, sides), expected)
+
+    def test_counts_every_roll(self):
+        for count, sides in [(10, 6), (40, 20), (100, 2)]:
+            ways = FUNCS['dice_sum_distribution'](count, sides)
+            with self.subTest(count=count, sides=sides):
+                self.assertEqual(len(ways), count * (sides - 1) + 1)
+                self.assertEqual(sum(ways), sides ** count)
+
+class DiceEngineTests(unittest.TestCase):
+    def test_seeded_rolls_repeat(self):
+        for use_numpy in (False, None):
+            first = FUNCS['DiceEngine'](seed=7, use_numpy=use_numpy)
+            second = FUNCS['DiceEngine'](seed=7, use_numpy=use_numpy)
+            with self.subTest(use_numpy=use_numpy):
+                self.assertEqual(first.roll_sums(50, 6, 20), second.roll_sums(50, 6, 20))
+                self.assertEqual(first.roll_sum(3, 6), second.roll_sum(3, 6))
+
+    def test_rolls_stay_in_range(self):
+        dice = FUNCS['DiceEngine'](seed=1, use_numpy=False)
+        for count, sides in [(1, 6), (5, 8), (40, 6), (2000, 3)]:
+            with self.subTest(count=count, sides=sides):
+                for total in dice.roll_sums(count, sides, 200):
+                    self.assertTrue(count <= total <= count * sides)
+
+    def test_zero_dice(self):
+        dice = FUNCS['DiceEngine'](seed=1, use_numpy=False)
+        self.assertEqual(dice.roll_sums(0, 6, 3), [0, 0, 0])
+
+    def test_fast_dice_stays_with_its_engine(self):
+        plain = GenerationEngine.from_ruleset("Core v4")
+        expected = [roll_tag(plain, "{40d6} {3d8}", seed) for seed in range(10)]
+
+        fast = GenerationEngine.from_ruleset("Core v4")
+        fast.use_fast_dice()
+        other = GenerationEngine.from_ruleset("Core v4")
+        self.assertEqual([roll_tag(other, "{40d6} {3d8}", seed) for seed in range(10)], expected)
+        fast_rolls = [roll_tag(fast, "{40d6} {3d8}", seed) for seed in range(10)]
+        self.assertEqual(fast_rolls, [roll_tag(fast, "{40d6} {3d8}", seed) for seed in range(10)])
+
+        fast.use_fast_dice(False)
+        self.assertEqual([roll_tag(fast, "{40d6} {3d8}", seed) for seed in range(10)], expected)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import random
+import unittest
+
+from RPG_Pad_Engine import GenerationEngine
+
+ENGINE = GenerationEngine.from_ruleset("Core v4")
+
+def distribution(script, start_table="Main", **options):
+    return ENGINE.output_distribution(ENGINE.parse_script(script), start_table, **options)
+
+class OutputDistributionTests(unittest.TestCase):
+    def test_weighted_table_is_exact(self):
+        result = distribution("Table: Main\n3:red\nblue\nTable: Other\nx\n")
+        self.assertTrue(result.exact)
+        self.assertAlmostEqual(result.probabilities["red"], 0.75)
+        self.assertAlmostEqual(result.probabilities["blue"], 0.25)
+        self.assertEqual(result.interval("red"), (result.probabilities["red"],) * 2)
+
+    def test_nested_calls_and_dice(self):
+        result = distribution("Table: Main\n[@Coin] {1d2}\nTable: Coin\nheads\ntails\n")
+        self.assertTrue(result.exact)
+        self.assertEqual(len(result), 4)
+        for probability in result.probabilities.values():
+            self.assertAlmostEqual(probability, 0.25)
+
+    def test_dice_sums(self):
+        result = distribution("Table: Main\n{2d6}\n")
+        self.assertTrue(result.exact)
+        for total in range(2, 13):
+            self.assertAlmostEqual(result.probabilities[str(total)], (6 - abs(total - 7)) / 36)
+
+    def test_unclosed_pick_is_plain_text(self):
+        # '||' never closes a pick, so every run prints the text as it is
+        result = distribution("Table: Main\n[|a||]\n")
+        self.assertTrue(result.exact)
+        self.assertEqual(result.probabilities, {"[|a||]": 1.0})
+
+    def test_empty_pick_options_are_sampled(self):
+        result = distribution("Table: Main\n[|a|[|x||]|]\n", samples=300, seed=2)
+        self.assertFalse(result.exact)
+        self.assertEqual(set(result.probabilities), {"a", "[|a|", "[|a|x"})
+
+    def test_large_dice_pool_does_not_overflow(self):
+        result = distribution("Table: Main\n{500d6}\n", max_outcomes=10000)
+        self.assertTrue(result.exact)
+        self.assertEqual(len(result), 500 * 5 + 1)
+        self.assertAlmostEqual(sum(result.probabilities.values()), 1.0)
+        self.assertAlmostEqual(result.probabilities["1750"], max(result.probabilities.values()))
+        # 6 ** -500 is below the smallest float
+        self.assertEqual(result.probabilities["500"], 0.0)
+
+    def test_huge_dice_pool_is_sampled(self):
+        state = random.getstate()
+        result = distribution("Table: Main\n{50000d2}\n", samples=20, max_seconds=5)
+        self.assertFalse(result.exact)
+        self.assertTrue(result.reason)
+        self.assertEqual(result.samples, 20)
+        self.assertAlmostEqual(sum(result.probabilities.values()), 1.0)
+        low, high = result.interval(next(iter(result.probabilities)))
+        self.assertLess(low, high)
+        self.assertEqual(random.getstate(), state)
+
+    def test_variables_are_sampled(self):
+        result = distribution('Table: Main\n{$x = "{1d2}"}{$x}\n', samples=200, seed=3)
+        self.assertFalse(result.exact)
+        self.assertEqual(set(result.probabilities), {"11", "22"})
+        again = distribution('Table: Main\n{$x = "{1d2}"}{$x}\n', samples=200, seed=3)
+        self.assertEqual(again.probabilities, result.probabilities)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import csv
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from RPG_Pad_Store import EXPORT_COLUMNS, ResultDatabase, script_hash
+
+SCRIPT = "Table: Main\n\\a apple\n\\a pear\n"
+
+def resolve_a_an(text):
+    return text.replace("\\a apple", "an apple").replace("\\a pear", "a pear")
+
+class ResultDatabaseTests(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "results.db")
+
+    def record(self, database, raw_results, seed=5, fast_dice=False, first_index=0):
+        return list(database.record(raw_results, SCRIPT, "Main", seed, resolve_a_an, fast_dice, first_index))
+
+    def test_record_yields_resolved_text(self):
+        with ResultDatabase(self.path) as database:
+            self.assertEqual(self.record(database, ["\\a apple", "\\a pear"]), ["an apple", "a pear"])
+
+    def test_csv_round_trip(self):
+        raw = ["\\a apple", "\\a pear", "\\a apple, \"quoted\"\nsecond line"]
+        with ResultDatabase(self.path) as database:
+            self.record(database, raw)
+            stream = io.StringIO(newline="")
+            self.assertEqual(database.export(stream, "csv"), 3)
+        rows = list(csv.reader(io.StringIO(stream.getvalue(), newline="")))
+        self.assertEqual(rows[0], EXPORT_COLUMNS)
+        self.assertEqual([row[EXPORT_COLUMNS.index("raw_text")] for row in rows[1:]], raw)
+        self.assertEqual([row[EXPORT_COLUMNS.index("text")] for row in rows[1:]], [resolve_a_an(text) for text in raw])
+        self.assertEqual({row[0] for row in rows[1:]}, {script_hash(SCRIPT)})
+
+    def test_jsonl_round_trip(self):
+        with ResultDatabase(self.path) as database:
+            self.record(database, ["\\a pear", "é ünïcode"], fast_dice=True, first_index=10)
+            stream = io.StringIO()
+            database.export(stream, "jsonl")
+        records = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual([record["run_index"] for record in records], [10, 11])
+        self.assertEqual([record["text"] for record in records], ["a pear", "é ünïcode"])
+        self.assertEqual(records[0]["seed"], "5")
+        self.assertIs(records[0]["fast_dice"], True)
+        self.assertEqual(sorted(records[0]), sorted(EXPORT_COLUMNS))
+
+    def test_recording_again_replaces_runs(self):
+        with ResultDatabase(self.path) as database:
+            self.record(database, ["\\a apple", "\\a pear"])
+            self.record(database, ["\\a pear", "\\a pear"])
+            self.assertEqual(database.count(), (2, 2))
+            self.assertEqual([row[-1] for row in database.rows()], ["a pear", "a pear"])
+            self.record(database, ["\\a pear"], seed=6)
+            self.assertEqual(database.count(), (3, 2))
+        # Still there after reopening
+        with ResultDatabase(self.path) as database:
+            self.assertEqual(database.count(), (3, 2))
+            self.assertEqual(len(list(database.rows(start_table="Main"))), 3)
+            self.assertEqual(list(database.rows(start_table="Other")), [])
+
+    def test_identical_results_share_a_text(self):
+        with ResultDatabase(self.path) as database:
+            self.record(database, ["\\a apple"] * 50)
+            self.assertEqual(database.count(), (50, 1))
+
+    def test_unknown_format(self):
+        with ResultDatabase(self.path) as database:
+            with self.assertRaises(ValueError):
+                database.export(io.StringIO(), "xml")
+
+if __name__ == "__main__":
+    unittest.main()
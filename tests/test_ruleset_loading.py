@@ -0,0 +1,114 @@
+import os
+import random
+import shutil
+import sys
+import tempfile
+import unittest
+
+from RPG_Pad_Engine import DEFAULT_RULES_DIR, GenerationEngine, load_ruleset, read_script, rule_bytecode_path
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def write_file(folder, name, text):
+    with open(os.path.join(folder, name), "w", encoding="utf-8") as f:
+        f.write(text)
+
+class RulesetLoadingTests(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.rules_dir = directory.name
+
+    def make_ruleset(self, name, files):
+        folder = os.path.join(self.rules_dir, name)
+        os.mkdir(folder)
+        for file_name, text in files.items():
+            write_file(folder, file_name, text)
+        return folder
+
+    def write_bytecode(self):
+        # The ruleset index and .rule bytecode are only written when Python writes bytecode
+        self.addCleanup(setattr, sys, "dont_write_bytecode", sys.dont_write_bytecode)
+        sys.dont_write_bytecode = False
+
+    def rewrite(self, file_path, text):
+        # A later mtime, as an editor saving the file would give it
+        stat = os.stat(file_path)
+        write_file(os.path.dirname(file_path), os.path.basename(file_path), text)
+        os.utime(file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 2000000000))
+
+    def test_lazy_load_matches_eager_load(self):
+        self.write_bytecode()
+        folder = os.path.join(self.rules_dir, "Core copy")
+        shutil.copytree(os.path.join(DEFAULT_RULES_DIR, "Core v4"), folder, ignore=shutil.ignore_patterns("__pycache__"))
+        eager, errors = load_ruleset(folder, lazy=False)
+        self.assertEqual(errors, [])
+        lazy, errors = load_ruleset(folder, reload=True)
+        self.assertEqual(errors, [])
+
+        # Nothing is executed until a name is looked up
+        self.assertEqual(dict.__len__(lazy), 0)
+        self.assertEqual(sorted(lazy), sorted(eager))
+        self.assertIn('parse_tables', lazy)
+        for name in eager:
+            with self.subTest(name=name):
+                self.assertEqual(getattr(lazy[name], "__qualname__", None), getattr(eager[name], "__qualname__", None))
+                self.assertEqual(getattr(lazy[name], "__module__", None), getattr(eager[name], "__module__", None))
+        self.assertEqual(lazy.pending, {})
+
+        script = read_script(os.path.join(BASE_DIR, "Tavern_Menu.txt"))
+        outputs = []
+        for funcs in (eager, lazy):
+            engine = GenerationEngine(funcs, folder)
+            tables = engine.parse_script(script)
+            random.seed(8)
+            outputs.append([engine.generate_raw_one(tables, "Menu") for _ in range(5)])
+        self.assertEqual(outputs[0], outputs[1])
+
+    def test_lazy_load_sees_changed_files(self):
+        self.write_bytecode()
+        folder = self.make_ruleset("Lazy", {"first_rules.py": "def first():\n    return 1\n",
+                                             "second_rules.py": "def second():\n    return 2\n"})
+        load_ruleset(folder)
+        self.rewrite(os.path.join(folder, "second_rules.py"), "def second():\n    return 3\n\ndef third():\n    return 4\n")
+        funcs, errors = load_ruleset(folder)
+        self.assertEqual(errors, [])
+        # The unchanged file is deferred; the changed one was executed again
+        self.assertIn('first', funcs.pending)
+        self.assertEqual((funcs['first'](), funcs['second'](), funcs['third']()), (1, 3, 4))
+
+    def test_rule_bytecode_cache(self):
+        self.write_bytecode()
+        folder = self.make_ruleset("Rules", {"greeting.rule": "def greeting():\n    return 'old'\n"})
+        rule_path = os.path.join(folder, "greeting.rule")
+        funcs, errors = load_ruleset(folder)
+        self.assertEqual(errors, [])
+        self.assertEqual(funcs['greeting'](), "old")
+        self.assertTrue(os.path.isfile(rule_bytecode_path(rule_path)))
+
+        # Same size, new contents: the cached bytecode must not be used
+        self.rewrite(rule_path, "def greeting():\n    return 'new'\n")
+        funcs, errors = load_ruleset(folder, reload=True)
+        self.assertEqual(errors, [])
+        self.assertEqual(funcs['greeting'](), "new")
+
+        # A different size is noticed even if the mtime is unchanged
+        stat = os.stat(rule_path)
+        write_file(folder, "greeting.rule", "def greeting():\n    return 'newer'\n")
+        os.utime(rule_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        funcs, errors = load_ruleset(folder, reload=True)
+        self.assertEqual(funcs['greeting'](), "newer")
+
+    def test_sibling_imports_stay_in_their_ruleset(self):
+        uses_shared = "from shared_rules import VALUE\ndef shared_value():\n    return VALUE\n"
+        first = self.make_ruleset("First", {"shared_rules.py": "VALUE = 'first'\n", "user_rules.py": uses_shared})
+        second = self.make_ruleset("Second", {"shared_rules.py": "VALUE = 'second'\n", "user_rules.py": uses_shared})
+        first_funcs, errors = load_ruleset(first)
+        self.assertEqual(errors, [])
+        second_funcs, errors = load_ruleset(second)
+        self.assertEqual(errors, [])
+        self.assertEqual(first_funcs['shared_value'](), "first")
+        self.assertEqual(second_funcs['shared_value'](), "second")
+
+if __name__ == "__main__":
+    unittest.main()
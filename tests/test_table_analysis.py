@@ -0,0 +1,85 @@
+import unittest
+
+from RPG_Pad_Engine import GenerationEngine
+
+FUNCS = GenerationEngine.from_ruleset("Core v4").ruleset_funcs
+
+def analyze(script, start_table=None):
+    return FUNCS['analyze_tables'](FUNCS['parse_tables'](script), start_table)
+
+class CycleTests(unittest.TestCase):
+    def test_self_recursive_table(self):
+        # Half of the rolls call the table again: 2 rolls on average
+        ending = analyze("Table: A\n[@A]\nend\n")
+        self.assertEqual(ending.cycles, [["A"]])
+        self.assertEqual(ending.unbounded_cycles(), [])
+        self.assertAlmostEqual(ending.expected_rolls["A"], 2.0)
+        self.assertIn("A -> A  (ends on average)", ending.format())
+
+        endless = analyze("Table: A\nmore [@A]\n")
+        self.assertEqual(endless.unbounded_cycles(), [["A"]])
+        self.assertEqual(endless.expected_rolls["A"], float('inf'))
+        self.assertIn("UNBOUNDED", endless.format())
+
+    def test_two_table_cycle(self):
+        # A always calls B, which calls A back half the time: A = 1 + B, B = 1 + A / 2
+        ending = analyze("Table: A\n[@B]\nTable: B\n[@A]\nstop\n")
+        self.assertEqual(ending.cycles, [["A", "B"]])
+        self.assertEqual(ending.unbounded_cycles(), [])
+        self.assertAlmostEqual(ending.expected_rolls["A"], 4.0)
+        self.assertAlmostEqual(ending.expected_rolls["B"], 3.0)
+        self.assertAlmostEqual(ending.sub_rolls("A"), 3.0)
+
+        endless = analyze("Table: A\n[@B]\nTable: B\n[@A]\nTable: C\n[@A]\n")
+        self.assertEqual(endless.unbounded_cycles(), [["A", "B"]])
+        # A table calling into the cycle is unbounded too, but not part of it
+        self.assertEqual(endless.expected_rolls["C"], float('inf'))
+
+    def test_no_cycles(self):
+        analysis = analyze("Table: A\n[@B] [@B]\nTable: B\nx\n")
+        self.assertEqual(analysis.cycles, [])
+        self.assertAlmostEqual(analysis.sub_rolls("A"), 2.0)
+
+    def test_components_come_callees_first(self):
+        graph = {"A": ["B"], "B": ["C", "A"], "C": ["D"], "D": []}
+        components = [sorted(component) for component in FUNCS['strongly_connected_tables'](graph)]
+        self.assertEqual(components, [["D"], ["C"], ["A", "B"]])
+
+class ExpectedTotalsTests(unittest.TestCase):
+    def test_linear_solve(self):
+        # X = 1 + 0.5 Y + 2 Z, Y = 1 + 0.25 X, Z = 3
+        calls = {"X": {"Y": 0.5, "Z": 2.0}, "Y": {"X": 0.25}, "Z": {}}
+        components = FUNCS['strongly_connected_tables']({name: list(callees) for name, callees in calls.items()})
+        totals = FUNCS['expected_totals'](components, calls, {"X": 1.0, "Y": 1.0, "Z": 3.0})
+        self.assertAlmostEqual(totals["Z"], 3.0)
+        self.assertAlmostEqual(totals["X"], 7.5 / 0.875)
+        self.assertAlmostEqual(totals["Y"], 1 + 0.25 * totals["X"])
+
+    def test_counted_and_rolled_calls(self):
+        analysis = analyze("Table: Main\n[@3 Coin] [@{1d4} Coin] [@{2--6} Coin]\nTable: Coin\nh\nt\n")
+        self.assertAlmostEqual(analysis.sub_rolls("Main"), 3 + 2.5 + 4)
+
+    def test_weights_and_picks(self):
+        analysis = analyze("Table: Main\n3:[@Coin]\nx\n[|[@Coin]|y|]\nTable: Coin\nh\n")
+        self.assertAlmostEqual(analysis.sub_rolls("Main"), (3 + 0.5) / 5)
+
+class TableReportTests(unittest.TestCase):
+    def test_undefined_and_unreachable_tables(self):
+        analysis = analyze("Table: Main\n[@Missing] [@Used]\nTable: Used\nx [@Missing]\nTable: Spare\ny\n")
+        self.assertEqual(analysis.undefined, {"Missing": ["Main", "Used"]})
+        self.assertEqual(analysis.unreachable, ["Spare"])
+        self.assertEqual(analysis.reachable, {"Main", "Used"})
+        report = analysis.format()
+        self.assertIn("Missing  (called from Main, Used)", report)
+        self.assertIn("Unreachable from 'Main':\n  Spare", report)
+
+    def test_start_table_changes_reachability(self):
+        analysis = analyze("Table: Main\n[@Used]\nTable: Used\nx\nTable: Spare\n[@Used]\n", "Spare")
+        self.assertEqual(analysis.unreachable, ["Main"])
+
+    def test_dynamic_calls_are_listed(self):
+        analysis = analyze("Table: Main\n[@{$which}]\n")
+        self.assertEqual(analysis.dynamic, {"Main": ["[@{$which}]"]})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import random
+import unittest
+
+from RPG_Pad_Engine import GenerationEngine
+
+FUNCS = GenerationEngine.from_ruleset("Core v4").ruleset_funcs
+
+def echo(name):
+    return lambda match, tables, helpers, depth: f"<{name}>"
+
+def register_shout_tags(registry):
+    registry.register("shout", r'\[shout\s+"([^"]*)"\]',
+                      lambda match, tables, helpers, depth: match.group(1).upper() + "!",
+                      priority=45, openers=["[shout"], ignore_case=True)
+
+class TagRegistryTests(unittest.TestCase):
+    def test_highest_priority_tag_wins(self):
+        registry = FUNCS['TagRegistry']()
+        registry.register("late", r'<b>', echo("late"), priority=50, openers=["<b"])
+        registry.register("early", r'<a>', echo("early"), priority=10, openers=["<a"])
+        tag, match = registry.find_action("x <b> y <a>")
+        self.assertEqual(tag.name, "early")
+        self.assertEqual(tag.apply("x <b> y <a>", match, {}, {}, 0), "x <b> y <early>")
+        self.assertEqual(registry.find_action("x <b>")[0].name, "late")
+        self.assertIsNone(registry.find_action("nothing here"))
+
+    def test_same_name_replaces(self):
+        registry = FUNCS['TagRegistry']()
+        registry.register("tag", r'<a>', echo("old"), priority=10, openers=["<a"])
+        registry.register("tag", r'<a>', echo("new"), priority=20, openers=["<a"])
+        self.assertEqual([tag.name for tag in registry.tags], ["tag"])
+        tag, match = registry.find_action("<a>")
+        self.assertEqual(tag.apply("<a>", match, {}, {}, 0), "<new>")
+
+    def test_openers(self):
+        registry = FUNCS['TagRegistry']()
+        FUNCS['register_core_tags'](registry)
+        self.assertEqual(registry.present("[IF \"1\", \"a\", \"b\"]"), {"if"})
+        self.assertEqual(registry.present("[ifnot \"1\", \"a\", \"b\"]"), {"if", "ifnot"})
+        self.assertEqual(registry.present("[@Table] [|a|b|]"), {"table", "pick"})
+        self.assertEqual(registry.present("plain [text]"), set())
+        self.assertTrue(registry.all_core)
+
+        registry.register("anywhere", r'~', echo("anywhere"), priority=5)
+        self.assertIn("anywhere", registry.present("plain"))
+        self.assertFalse(registry.all_core)
+        self.assertTrue(registry.has_custom_tags("plain"))
+
+    def test_custom_ruleset_tags(self):
+        helpers = FUNCS.copy()
+        helpers.pop('tag_registry', None)
+        helpers['register_shout_tags'] = register_shout_tags
+        helpers['variables'] = {}
+        helpers['deck_state'] = {}
+        tables = FUNCS['parse_tables']("Table: Name\nbob\n")
+        random.seed(1)
+        text = helpers['resolve_table_tags']('[Shout "hi [|a|a|]"] [@Name]', tables, helpers)
+        # shout (priority 45) runs before the inline pick inside it (priority 60)
+        self.assertEqual(text, "HI A! bob")
+        self.assertNotIn("shout", [tag.name for tag in FUNCS['get_tag_registry'](FUNCS).tags])
+
+if __name__ == "__main__":
+    unittest.main()
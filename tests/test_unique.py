@@ -0,0 +1,62 @@
+import unittest
+
+from RPG_Pad_Engine import BloomFilter, GenerationEngine, SeenSet, UniqueStats, unique_results
+
+SCRIPT = "Table: Main\nRoll {1--1000000} and {2d6}\n"
+
+class SeenFilterTests(unittest.TestCase):
+    def test_seen_set(self):
+        seen = SeenSet()
+        self.assertTrue(seen.add("a"))
+        self.assertTrue(seen.add("b"))
+        self.assertFalse(seen.add("a"))
+        self.assertEqual(len(seen), 2)
+
+    def test_bloom_filter_never_misses_a_repeat(self):
+        bloom = BloomFilter(5000, 0.001)
+        new = sum(bloom.add(f"result {i}") for i in range(5000))
+        self.assertGreater(new, 4980)
+        self.assertFalse(any(bloom.add(f"result {i}") for i in range(5000)))
+
+    def test_bloom_filter_false_positive_rate(self):
+        bloom = BloomFilter(5000, 0.01)
+        for i in range(5000):
+            bloom.add(f"result {i}")
+        full = bytes(bloom.bits)
+        false_positives = 0
+        for i in range(2000):
+            false_positives += not bloom.add(f"other {i}")
+            bloom.bits[:] = full
+        self.assertLess(false_positives / 2000, 0.03)
+
+class UniqueResultsTests(unittest.TestCase):
+    def test_skips_repeats_in_order(self):
+        stats = UniqueStats()
+        results = list(unique_results(iter("abacbdcea"), 4, stats=stats))
+        self.assertEqual(results, ["a", "b", "c", "d"])
+        self.assertEqual((stats.attempts, stats.unique, stats.collisions), (6, 4, 2))
+        self.assertFalse(stats.exhausted)
+
+    def test_gives_up_when_results_run_out(self):
+        stats = UniqueStats()
+        results = list(unique_results(iter(["x", "y"] + ["x"] * 100), 10, max_retries=5, stats=stats))
+        self.assertEqual(results, ["x", "y"])
+        self.assertTrue(stats.exhausted)
+        self.assertEqual(stats.attempts, 8)
+        self.assertIn("stopped early", stats.summary())
+
+    def test_no_results_wanted(self):
+        self.assertEqual(list(unique_results(iter("abc"), 0)), [])
+
+class BatchWindowTests(unittest.TestCase):
+    def test_window_keeps_results_and_order(self):
+        engine = GenerationEngine.from_ruleset("Core v4")
+        expected = list(engine.generate_batch(SCRIPT, "Main", 40, master_seed=9))
+        self.assertEqual(list(engine.generate_batch(SCRIPT, "Main", 40, master_seed=9, workers=2)), expected)
+        self.assertEqual(list(engine.generate_batch(SCRIPT, "Main", 40, master_seed=9, workers=2, window=7)), expected)
+
+        windowed = engine.generate_batch(SCRIPT, "Main", 40, master_seed=9, workers=2, window=5)
+        self.assertEqual(list(unique_results(windowed, 10)), list(unique_results(iter(expected), 10)))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import random
+import unittest
+
+from RPG_Pad_Engine import GenerationEngine
+
+FUNCS = GenerationEngine.from_ruleset("Core v4").ruleset_funcs
+
+class VariableStoreTests(unittest.TestCase):
+    def test_numbers_follow_the_values(self):
+        variables = FUNCS['VariableStore']({'a': "3", 'b': "gold"})
+        self.assertEqual(variables.number_of('a'), 3.0)
+        self.assertIsNone(variables.number_of('b'))
+        self.assertIsNone(variables.number_of('missing'))
+
+        variables['a'] = "4.5"
+        variables.update(b="-2")
+        variables.setdefault('c', "7")
+        variables.setdefault('c', "8")
+        self.assertEqual((variables.number_of('a'), variables.number_of('b'), variables.number_of('c')), (4.5, -2.0, 7.0))
+        self.assertEqual(variables['c'], "7")
+
+        del variables['a']
+        self.assertIsNone(variables.number_of('a'))
+        self.assertNotIn('a', variables.numbers)
+
+    def test_number_of_text(self):
+        variables = FUNCS['VariableStore']({'a': "12"})
+        self.assertEqual(variables.number("12"), 12.0)
+        self.assertEqual(variables.number("0.25"), 0.25)
+        self.assertIsNone(variables.number("twelve"))
+
+    def test_plain_dict_is_upgraded(self):
+        helpers = {'variables': {'hp': "10"}}
+        variables = FUNCS['get_variable_store'](helpers)
+        self.assertIsInstance(variables, FUNCS['VariableStore'])
+        self.assertIs(helpers['variables'], variables)
+        self.assertEqual(variables.number_of('hp'), 10.0)
+
+class SubstituteVariablesTests(unittest.TestCase):
+    PIECES = ['{$a = "1"}', '{$b = "x"}', '{$a = ""}', '{$c = "{$a}"}', '{$b = "$a"}',
+              '{$a}', '{$b}', '{$c}', '{$d}', '{$', '{', '}', '$', 'a', ' ', '"', '=']
+
+    def test_sweep_matches_stepwise(self):
+        rng = random.Random(11)
+        for _ in range(3000):
+            text = "".join(rng.choice(self.PIECES) for _ in range(rng.randint(1, 8)))
+            swept = FUNCS['VariableStore']()
+            stepped = FUNCS['VariableStore']()
+            with self.subTest(text=text):
+                self.assertEqual(FUNCS['substitute_variables'](text, swept),
+                                 FUNCS['substitute_variables_stepwise'](text, stepped))
+                self.assertEqual(dict(swept), dict(stepped))
+
+if __name__ == "__main__":
+    unittest.main()